@@ -1,6 +1,43 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-from .models import FriendShip, User
+from core.admin import LargeTableAdmin
+from tweets.purge import soft_delete_user
 
-admin.site.register(User)
-admin.site.register(FriendShip)
+from .models import Block, FriendShip, Mute, User
+
+
+@admin.register(User)
+class UserAdmin(LargeTableAdmin, BaseUserAdmin):
+    list_display = ("id", "username", "email", "is_staff", "is_active", "deleted_at")
+    list_filter = ("is_staff", "is_active")
+    # Exact matches use the unique index on username; the default icontains scans the table.
+    search_fields = ("username__exact",)
+    actions = ["soft_delete_selected"]
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    @admin.action(description="選択したユーザーを削除（バックグラウンドで完全削除）", permissions=["delete"])
+    def soft_delete_selected(self, request, queryset):
+        for user in queryset.filter(deleted_at__isnull=True):
+            soft_delete_user(user)
+
+    def delete_model(self, request, obj):
+        soft_delete_user(obj)
+
+
+@admin.register(FriendShip)
+class FriendShipAdmin(LargeTableAdmin):
+    list_display = ("id", "follower", "following")
+    list_select_related = ("follower", "following")
+    raw_id_fields = ("follower", "following")
+
+
+@admin.register(Mute, Block)
+class ExclusionAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "target", "created_at")
+    list_select_related = ("user", "target")
+    raw_id_fields = ("user", "target")
@@ -0,0 +1,79 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Value
+
+from core.cache import namespace
+
+from .models import Block, Mute
+
+MUTED, BLOCKING, BLOCKED_BY = range(3)
+
+
+def _sorted_ids(ids):
+    return array("q", sorted(set(ids)))
+
+
+def _contains(ids, value):
+    i = bisect_left(ids, value)
+    return i < len(ids) and ids[i] == value
+
+
+class Exclusions:
+    """Accounts a user has muted, is blocking, or is blocked by, as sorted id arrays.
+
+    Arrays of 8-byte ids stay small in the cache however long the lists get,
+    and membership is a binary search, so filtering a page costs the same for
+    someone who mutes ten accounts as for someone who mutes ten thousand.
+    """
+
+    def __init__(self, muted=(), blocking=(), blocked_by=()):
+        self.muted = _sorted_ids(muted)
+        self.blocking = _sorted_ids(blocking)
+        self.blocked_by = _sorted_ids(blocked_by)
+
+    def __bool__(self):
+        return bool(self.muted or self.blocking or self.blocked_by)
+
+    def is_muted(self, user_id):
+        return _contains(self.muted, user_id)
+
+    def is_blocking(self, user_id):
+        return _contains(self.blocking, user_id)
+
+    def blocks(self, user_id):
+        """Whether either side has blocked the other."""
+        return _contains(self.blocking, user_id) or _contains(self.blocked_by, user_id)
+
+    def hides(self, user_id):
+        """Whether tweets by ``user_id`` are left out of the user's timelines."""
+        return self.is_muted(user_id) or self.blocks(user_id)
+
+    def hidden_ids(self):
+        return set(self.muted) | set(self.blocking) | set(self.blocked_by)
+
+
+def _load(user_id):
+    rows = (
+        Mute.objects.filter(user_id=user_id)
+        .values_list("target_id", Value(MUTED))
+        .union(
+            Block.objects.filter(user_id=user_id).values_list("target_id", Value(BLOCKING)),
+            Block.objects.filter(target_id=user_id).values_list("user_id", Value(BLOCKED_BY)),
+            all=True,
+        )
+    )
+    ids = ([], [], [])
+    for other_id, kind in rows:
+        ids[kind].append(other_id)
+    return Exclusions(*ids)
+
+
+def get_exclusions(user_id):
+    """``Exclusions`` of ``user_id``, loaded in one query and cached until a mute or block changes."""
+    return namespace("exclusions").get_or_set(user_id, lambda: _load(user_id), settings.EXCLUSIONS_CACHE_TIMEOUT)
+
+
+def forget_exclusions(*user_ids):
+    namespace("exclusions").delete_many(user_ids)
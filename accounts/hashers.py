@@ -0,0 +1,162 @@
+import asyncio
+import base64
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher
+from django.utils.crypto import constant_time_compare
+from django.utils.encoding import force_bytes
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_warming_pid = None
+# Results computed ahead by prehash() for the rest of the request: {(password, encoded): matches, password: hash}.
+_prehashed = ContextVar("prehashed", default=None)
+
+
+def get_pool():
+    """Process pool shared by all threads of this worker, or ``None`` when hashing runs inline.
+
+    The pool is created on first use in each process. A pool inherited across a
+    fork has lost its management thread, so a child never reuses its parent's.
+    """
+    global _pool, _pool_pid
+    if settings.PASSWORD_HASHING_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            _pool = None
+        if _pool is None:
+            _pool_pid = os.getpid()
+            # "spawn" so children never inherit the parent's threads, locks or DB connections.
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def warm_up_in_background():
+    """Start this process's pool on a background thread, once per process.
+
+    Called as each worker takes its first request (after any fork), so the
+    process start-up is paid off the request path before the first login.
+    """
+    global _warming_pid
+    if settings.PASSWORD_HASHING_WORKERS <= 0 or _warming_pid == os.getpid():
+        return
+    with _pool_lock:
+        if _warming_pid == os.getpid():
+            return
+        _warming_pid = os.getpid()
+    hasher = get_hasher()
+    if isinstance(hasher, OffloadedPBKDF2PasswordHasher):
+        threading.Thread(target=hasher.warm_up, name="password-hashing-warm-up", daemon=True).start()
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def _derive(digest_name, password, salt, iterations):
+    return hashlib.pbkdf2_hmac(digest_name, password, salt, iterations)
+
+
+def _submit(pool, password, salt, iterations, digest):
+    return pool.submit(_derive, digest().name, force_bytes(password), force_bytes(salt), iterations)
+
+
+class OffloadedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """Django's PBKDF2-SHA256 (same ``pbkdf2_sha256`` hashes) with the key derivation run in a process pool.
+
+    Each web process has a pool of ``PASSWORD_HASHING_WORKERS`` processes, so a
+    burst of logins queues up behind them instead of taking every CPU the web
+    workers need; the request only waits on the result.
+    """
+
+    def warm_up(self):
+        """Start this process's pool now; spawning one takes longer than a hash. Never call before a fork.
+
+        Web workers do this through ``warm_up_in_background``.
+        """
+        pool = get_pool()
+        if pool is not None:
+            list(pool.map(abs, range(settings.PASSWORD_HASHING_WORKERS)))
+
+    def encode(self, password, salt, iterations=None):
+        prehashed = _prehashed.get()
+        if prehashed and password in prehashed:
+            # A fresh hash with its own salt, which is all an encode of a login's password is used for.
+            return prehashed.pop(password)
+        pool = get_pool()
+        if pool is None:
+            return super().encode(password, salt, iterations)
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        derived = _submit(pool, password, salt, iterations, self.digest).result()
+        return self._format(derived, salt, iterations)
+
+    def verify(self, password, encoded):
+        prehashed = _prehashed.get()
+        if prehashed and (password, encoded) in prehashed:
+            return prehashed.pop((password, encoded))
+        return super().verify(password, encoded)
+
+    async def aencode(self, password, salt, iterations=None):
+        """``encode`` that awaits the pool instead of blocking a thread on it."""
+        pool = get_pool()
+        if pool is None:
+            return await sync_to_async(self.encode, thread_sensitive=False)(password, salt, iterations)
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        derived = await asyncio.wrap_future(_submit(pool, password, salt, iterations, self.digest))
+        return self._format(derived, salt, iterations)
+
+    async def averify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = await self.aencode(password, decoded["salt"], decoded["iterations"])
+        return constant_time_compare(encoded, encoded_2)
+
+    def _format(self, derived, salt, iterations):
+        hash = base64.b64encode(derived).decode("ascii").strip()
+        return "%s$%d$%s$%s" % (self.algorithm, iterations, salt, hash)
+
+
+async def prehash(username, password):
+    """Run the hash a login of ``username`` needs on the event loop, ahead of Django's synchronous authenticate().
+
+    The result is remembered for the rest of the request (a context variable,
+    which ``sync_to_async`` carries into its thread), so the login form's own
+    check takes it instead of hashing again. An unknown username gets the dummy
+    hash ModelBackend makes to keep the timing the same. Returns a token for
+    ``forget_prehash``.
+    """
+    hasher = get_hasher()
+    prehashed = {}
+    if isinstance(hasher, OffloadedPBKDF2PasswordHasher) and username and password:
+        User = get_user_model()
+        encoded = (
+            await User._default_manager.filter(**{User.USERNAME_FIELD: username})
+            .values_list("password", flat=True)
+            .afirst()
+        )
+        if encoded is None:
+            prehashed[password] = await hasher.aencode(password, hasher.salt())
+        elif encoded.startswith(hasher.algorithm + "$"):
+            prehashed[(password, encoded)] = await hasher.averify(password, encoded)
+    return _prehashed.set(prehashed)
+
+
+def forget_prehash(token):
+    _prehashed.reset(token)
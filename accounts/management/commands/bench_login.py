@@ -0,0 +1,65 @@
+import os
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from accounts.hashers import OffloadedPBKDF2PasswordHasher, shutdown_pool
+from core.bench import Timer
+
+ROW = "{:>10}: {:7.1f} logins/s / {:>2} cores = {:6.1f} logins/s/core  p50 {:6.1f} ms  p95 {:6.1f} ms"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password-check throughput per core and latency, hashing inline and in process pools of "
+        "several sizes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument("--threads", type=int, default=16, help="Concurrent request threads.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            nargs="+",
+            default=sorted({1, 2, os.cpu_count() or 1}),
+            help="Hashing pool sizes to compare.",
+        )
+
+    def handle(self, *args, **options):
+        cores = os.cpu_count() or 1
+        encoded = make_password("bench-password")
+        runs = [("inline", 0, min(options["threads"], cores))]
+        runs += [("pool({})".format(workers), workers, min(workers, cores)) for workers in options["workers"]]
+        for label, workers, used in runs:
+            with override_settings(PASSWORD_HASHING_WORKERS=workers):
+                shutdown_pool()
+                # Start the processes before timing; spawning is a one-off cost per web worker.
+                OffloadedPBKDF2PasswordHasher().warm_up()
+                latencies, seconds = self.run(encoded, options["logins"], options["threads"])
+                shutdown_pool()
+            rate = options["logins"] / seconds
+            self.stdout.write(
+                ROW.format(
+                    label,
+                    rate,
+                    used,
+                    rate / used,
+                    statistics.median(latencies),
+                    statistics.quantiles(latencies, n=20)[-1],
+                )
+            )
+        self.stdout.write("cores: {}".format(cores))
+
+    def run(self, encoded, logins, threads):
+        def login(_):
+            with Timer() as timer:
+                assert check_password("bench-password", encoded)
+            return timer.seconds * 1000
+
+        with Timer() as total, ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = list(executor.map(login, range(logins)))
+        return latencies, total.seconds
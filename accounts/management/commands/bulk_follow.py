@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from accounts.services import BulkFollowError, bulk_follow
+
+
+class Command(BaseCommand):
+    help = "Make a user follow a list of accounts, given as arguments or one username per line in a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="The user who follows.")
+        parser.add_argument("usernames", nargs="*", help="Accounts to follow.")
+        parser.add_argument("--file", help="File with one username per line ('-' for stdin).")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"], deleted_at__isnull=True)
+        except User.DoesNotExist:
+            raise CommandError("unknown user {}".format(options["username"]))
+        usernames = list(options["usernames"])
+        if options["file"] == "-":
+            usernames += sys.stdin.read().splitlines()
+        elif options["file"]:
+            with open(options["file"], encoding="utf-8") as f:
+                usernames += f.read().splitlines()
+        try:
+            followed, already, unknown = bulk_follow(user, usernames)
+        except BulkFollowError as e:
+            raise CommandError(e.errors)
+        self.stdout.write(
+            "followed {}, already following {}, unknown {}".format(len(followed), len(already), len(unknown))
+        )
+        for name in unknown:
+            self.stdout.write("  unknown: {}".format(name))
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.13 on 2026-10-19 16:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0007_user_deleted_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="friendship",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
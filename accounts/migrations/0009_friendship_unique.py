@@ -0,0 +1,34 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:59
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicates(apps, schema_editor):
+    """Keep the oldest row of every (follower, following) pair so the constraint can be added."""
+    FriendShip = apps.get_model("accounts", "FriendShip")
+    duplicated = (
+        FriendShip.objects.values("follower", "following")
+        .annotate(keep=Min("pk"), rows=Count("pk"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for pair in list(duplicated):
+        FriendShip.objects.filter(follower=pair["follower"], following=pair["following"]).exclude(
+            pk=pair["keep"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0008_friendship_created_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="friendship",
+            constraint=models.UniqueConstraint(fields=("follower", "following"), name="unique_friendship"),
+        ),
+    ]
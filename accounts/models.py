@@ -4,11 +4,57 @@ from django.db import models
 
 class User(AbstractUser):
     email = models.EmailField()
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the username cache drop the old name when it is changed (see accounts/signals.py).
+        instance._loaded_username = instance.__dict__.get("username")
+        return instance
 
 
 class FriendShip(models.Model):
     following = models.ForeignKey(User, related_name="follower_friendships", on_delete=models.CASCADE)
     follower = models.ForeignKey(User, related_name="following_friendships", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["follower", "following"], name="unique_friendship"),
+        ]
 
     def __str__(self):
         return "{} {}".format(self.following, self.follower)
+
+
+class Mute(models.Model):
+    """``user`` no longer sees tweets by ``target`` in their timelines."""
+
+    user = models.ForeignKey(User, related_name="mutes", on_delete=models.CASCADE)
+    target = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "target"], name="unique_mute"),
+        ]
+
+    def __str__(self):
+        return "{} mutes {}".format(self.user, self.target)
+
+
+class Block(models.Model):
+    """Like a mute, in both directions, and neither account can follow the other."""
+
+    user = models.ForeignKey(User, related_name="blocks", on_delete=models.CASCADE)
+    target = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "target"], name="unique_block"),
+        ]
+
+    def __str__(self):
+        return "{} blocks {}".format(self.user, self.target)
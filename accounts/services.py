@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from core.cache import namespace
+from notifications.models import Notification
+from notifications.tasks import record_notification
+from outbox.services import Type, emit_many
+from tweets import ranking
+
+from .exclusions import forget_exclusions, get_exclusions
+from .models import Block, FriendShip, Mute, User
+
+
+class BulkFollowError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def resolve_username(username):
+    """User named ``username`` whose account has not been deleted, or ``None``; from the cache when possible.
+
+    Only the pk and username are cached; the returned instance defers every
+    other field. Unknown names are remembered for USERNAME_NEGATIVE_CACHE_TIMEOUT
+    seconds so repeated hits on a bad URL stay off the database.
+    """
+    users = namespace("usernames")
+    row = users.get_or_set(
+        username,
+        lambda: User.objects.filter(username=username, deleted_at__isnull=True).values_list("pk", "username").first(),
+        settings.USERNAME_CACHE_TIMEOUT,
+    )
+    if row is None:
+        users.set(username, None, settings.USERNAME_NEGATIVE_CACHE_TIMEOUT)
+        return None
+    pk, username = row
+    return User.from_db("default", ["id", "username", "deleted_at"], [pk, username, None])
+
+
+def forget_username(*usernames):
+    users = namespace("usernames")
+    for username in usernames:
+        if username:
+            users.delete(username)
+
+
+def follow_counts(user_id):
+    """``(following, followers)`` of ``user_id``, from the cache when possible."""
+    counts = namespace("counts")
+    return (
+        counts.get_or_set(
+            "following:{}".format(user_id), lambda: FriendShip.objects.filter(follower_id=user_id).count()
+        ),
+        counts.get_or_set(
+            "followers:{}".format(user_id), lambda: FriendShip.objects.filter(following_id=user_id).count()
+        ),
+    )
+
+
+def forget_follow_counts(follower_id, following_id):
+    counts = namespace("counts")
+    counts.delete("following:{}".format(follower_id))
+    counts.delete("followers:{}".format(following_id))
+
+
+def lock_follows(follower_id):
+    """Lock ``follower_id``'s user row until the transaction ends; everything that adds follows by them takes it."""
+    list(User.objects.select_for_update().filter(pk=follower_id).values_list("pk"))
+
+
+def bulk_follow(user, usernames):
+    """Make ``user`` follow every active account in ``usernames``; returns ``(followed, already, unknown)``.
+
+    The names are resolved in one query. Under ``lock_follows`` the pairs that
+    already exist are read and only the rest inserted, in one statement, so a
+    concurrent import or follow from the profile page is neither duplicated nor
+    announced twice. Events, notification tasks and cached counts are written
+    for the inserted rows in one batch each.
+    """
+    if not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+        raise BulkFollowError({"usernames": ["ユーザー名の配列を指定してください。"]})
+    names = list(dict.fromkeys(name.strip().lstrip("@") for name in usernames if name.strip()))
+    if not names:
+        raise BulkFollowError({"usernames": ["ユーザー名を1件以上指定してください。"]})
+    if len(names) > settings.BULK_FOLLOW_MAX:
+        raise BulkFollowError(
+            {"usernames": ["一度にフォローできるのは{}人までです。".format(settings.BULK_FOLLOW_MAX)]}
+        )
+
+    exclusions = get_exclusions(user.pk)
+    found = {
+        name: pk
+        for name, pk in User.objects.filter(username__in=names, deleted_at__isnull=True, is_active=True)
+        .exclude(pk=user.pk)
+        .values_list("username", "pk")
+        # Blocked accounts are reported as unknown rather than revealing the block.
+        if not exclusions.blocks(pk)
+    }
+    with transaction.atomic():
+        lock_follows(user.pk)
+        existing = set(
+            FriendShip.objects.filter(follower=user, following_id__in=found.values()).values_list(
+                "following_id", flat=True
+            )
+        )
+        new = {name: pk for name, pk in found.items() if pk not in existing}
+        FriendShip.objects.bulk_create([FriendShip(follower=user, following_id=pk) for pk in new.values()])
+        emit_many(Type.FOLLOW_CREATED, [{"follower_id": user.pk, "following_id": pk} for pk in new.values()])
+        record_notification.enqueue_many(
+            [
+                {
+                    "recipient_id": pk,
+                    "verb": Notification.Verb.FOLLOW,
+                    "actor_id": user.pk,
+                    "actor_username": user.username,
+                }
+                for pk in new.values()
+            ]
+        )
+    if new:
+        counts = namespace("counts")
+        counts.delete_many(["following:{}".format(user.pk)] + ["followers:{}".format(pk) for pk in new.values()])
+        ranking.forget(user.pk)
+    followed = [name for name in names if name in new]
+    already = [name for name in names if name in found and name not in new]
+    unknown = [name for name in names if name not in found]
+    return followed, already, unknown
+
+
+def mute(user, target):
+    """Hide ``target``'s tweets from ``user``'s timelines; returns False if they were already muted."""
+    _, created = Mute.objects.get_or_create(user=user, target=target)
+    forget_exclusions(user.pk)
+    ranking.forget(user.pk)
+    return created
+
+
+def unmute(user, target):
+    deleted, _ = Mute.objects.filter(user=user, target=target).delete()
+    forget_exclusions(user.pk)
+    ranking.forget(user.pk)
+    return bool(deleted)
+
+
+def block(user, target):
+    """Block ``target``: both stop seeing each other's tweets and any follow between them is removed."""
+    with transaction.atomic():
+        _, created = Block.objects.get_or_create(user=user, target=target)
+        pairs = list(
+            FriendShip.objects.filter(
+                Q(follower=user, following=target) | Q(follower=target, following=user)
+            ).values_list("pk", "follower_id", "following_id")
+        )
+        if pairs:
+            FriendShip.objects.filter(pk__in=[pk for pk, _, _ in pairs]).delete()
+            emit_many(
+                Type.FOLLOW_DELETED,
+                [{"follower_id": follower_id, "following_id": following_id} for _, follower_id, following_id in pairs],
+            )
+    forget_exclusions(user.pk, target.pk)
+    ranking.forget(user.pk, target.pk)
+    namespace("counts").delete_many(
+        [key.format(pk) for pk in (user.pk, target.pk) for key in ("following:{}", "followers:{}")]
+    )
+    return created
+
+
+def unblock(user, target):
+    deleted, _ = Block.objects.filter(user=user, target=target).delete()
+    forget_exclusions(user.pk, target.pk)
+    ranking.forget(user.pk, target.pk)
+    return bool(deleted)
@@ -0,0 +1,33 @@
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import namespace
+
+from . import hashers
+from .models import User
+from .services import forget_username
+
+
+@receiver(post_save, sender=User)
+def forget_saved_username(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login; everything else may rename, create or (soft) delete the user.
+    if update_fields is not None and not {"username", "deleted_at", "is_active"} & set(update_fields):
+        return
+    loaded = getattr(instance, "_loaded_username", None)
+    forget_username(loaded, instance.username)
+    if loaded is not None and loaded != instance.username:
+        # Cached tweets carry their author's username.
+        namespace("tweets").invalidate()
+    instance._loaded_username = instance.username
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_username(sender, instance, **kwargs):
+    forget_username(getattr(instance, "_loaded_username", None), instance.username)
+
+
+@receiver(request_started)
+def start_hashing_pool(sender, **kwargs):
+    # Not at start-up: a preloading server forks its workers after that, and a pool can't follow a fork.
+    hashers.warm_up_in_background()
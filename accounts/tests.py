@@ -1,11 +1,30 @@
+import asyncio
+import json
+import threading
+from io import StringIO
+from unittest.mock import patch
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth import SESSION_KEY, get_user_model
-from django.test import TestCase
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from tweets.models import Tweet
+from core.querybudget import QueryBudgetMixin
+from outbox.models import OutboxEvent
+from taskqueue.models import Task
+from tweets.models import Like, PurgeJob, Tweet
+from tweets.purge import soft_delete_user
 
-from .models import FriendShip
+from . import hashers, services
+from .exclusions import get_exclusions
+from .hashers import OffloadedPBKDF2PasswordHasher, shutdown_pool
+from .models import Block, FriendShip, Mute
+from .views import FollowerListView
 
 User = get_user_model()
 
@@ -37,6 +56,19 @@ class TestSignupView(TestCase):
         self.assertTrue(User.objects.filter(username=valid_data["username"]).exists())
         self.assertIn(SESSION_KEY, self.client.session)
 
+    def test_num_queries(self):
+        valid_data = {
+            "username": "testuser",
+            "email": "test@test.com",
+            "password1": "testpassword",
+            "password2": "testpassword",
+        }
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        # unique check, insert, session create (4), last_login, session save (3)
+        with self.assertNumQueries(10):
+            self.client.post(self.url, valid_data)
+
     def test_failure_post_with_empty_form(self):
         invalid_data = {
             "username": "",
@@ -193,6 +225,62 @@ class TestSignupView(TestCase):
         self.assertIn("確認用パスワードが一致しません。", form.errors["password2"])
 
 
+class TestOffloadedPasswordHasher(TestCase):
+    def tearDown(self):
+        shutdown_pool()
+
+    def test_matches_django_pbkdf2(self):
+        expected = PBKDF2PasswordHasher().encode("testpassword", "somesalt", 1000)
+        for workers in (0, 1):
+            with override_settings(PASSWORD_HASHING_WORKERS=workers):
+                shutdown_pool()
+                self.assertEqual(OffloadedPBKDF2PasswordHasher().encode("testpassword", "somesalt", 1000), expected)
+
+    async def test_averify(self):
+        hasher = OffloadedPBKDF2PasswordHasher()
+        encoded = hasher.encode("testpassword", "somesalt", 1000)
+        for workers in (0, 1):
+            with override_settings(PASSWORD_HASHING_WORKERS=workers):
+                self.assertTrue(await hasher.averify("testpassword", encoded))
+                self.assertFalse(await hasher.averify("wrongpassword", encoded))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_first_request_warms_the_pool_in_the_background(self):
+        with patch.object(hashers, "_warming_pid", None), patch.object(
+            OffloadedPBKDF2PasswordHasher, "warm_up", autospec=True
+        ) as warm_up:
+            for _ in range(2):
+                self.client.get(reverse("accounts:login"))
+            for thread in threading.enumerate():
+                if thread.name == "password-hashing-warm-up":
+                    thread.join()
+        warm_up.assert_called_once()
+
+    def test_bench_login_command(self):
+        out = StringIO()
+        call_command("bench_login", "--logins", "2", "--threads", "1", "--workers", "1", stdout=out)
+        self.assertIn("pool(1)", out.getvalue())
+        self.assertIn("logins/s/core", out.getvalue())
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_forked_child_starts_its_own_pool(self):
+        pool = hashers.get_pool()
+        self.assertIs(hashers.get_pool(), pool)
+        # as if the pool had been started by the process this one was forked from
+        with patch.object(hashers, "_pool_pid", -1):
+            child_pool = hashers.get_pool()
+        self.assertIsNot(child_pool, pool)
+        self.assertEqual(child_pool.submit(abs, -1).result(), 1)
+        pool.shutdown()
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_verify_existing_hash(self):
+        encoded = PBKDF2PasswordHasher().encode("testpassword", "somesalt")
+        self.assertTrue(check_password("testpassword", encoded))
+        self.assertFalse(check_password("wrongpassword", encoded))
+        self.assertTrue(make_password("testpassword").startswith("pbkdf2_sha256$"))
+
+
 class TestLoginView(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -223,6 +311,43 @@ class TestLoginView(TestCase):
         )
         self.assertIn(SESSION_KEY, self.client.session)
 
+    def test_num_queries(self):
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        # password hash looked up ahead of the form, user, session create (4), last_login, session save (3)
+        with self.assertNumQueries(10):
+            self.client.post(self.url, {"username": "testuser", "password": "testpassword"})
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    async def test_hashes_are_awaited_on_the_event_loop(self):
+        self.addCleanup(shutdown_pool)
+        submitted = []
+        submit = hashers._submit
+
+        def record(*args):
+            try:
+                asyncio.get_running_loop()
+                submitted.append("event loop")
+            except RuntimeError:
+                submitted.append("thread")
+            return submit(*args)
+
+        async def login(username, password):
+            # urlencoded: AsyncClient's multipart bodies don't parse in this Django version
+            return await self.async_client.post(
+                self.url,
+                urlencode({"username": username, "password": password}),
+                content_type="application/x-www-form-urlencoded",
+            )
+
+        with patch.object(hashers, "_submit", side_effect=record):
+            response = await login("testuser", "testpassword")
+            self.assertEqual(response.status_code, 302)
+            self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+            self.assertEqual((await login("testuser", "wrong")).status_code, 200)
+            self.assertEqual((await login("nobody", "testpassword")).status_code, 200)
+        self.assertEqual(submitted, ["event loop"] * 3)
+
     def test_failure_post_with_not_exists_user(self):
         invalid_data = {
             "username": "tastser",
@@ -268,6 +393,33 @@ class TestLogoutView(TestCase):
         )
         self.assertNotIn(SESSION_KEY, self.client.session)
 
+    def test_num_queries(self):
+        # session, user, session flush (2)
+        with self.assertNumQueries(4):
+            self.client.post(reverse("accounts:logout"))
+
+
+class TestAccountDeleteView(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        Tweet.objects.create(user=self.user, content="Hello!")
+
+    def test_success_post(self):
+        response = self.client.post(reverse("accounts:delete"))
+        self.assertRedirects(response, reverse(settings.LOGOUT_REDIRECT_URL), status_code=302, target_status_code=200)
+        self.assertNotIn(SESSION_KEY, self.client.session)
+        self.assertFalse(Tweet.objects.exists())
+        self.assertTrue(PurgeJob.objects.filter(object_id=self.user.pk).exists())
+        self.assertFalse(self.client.login(username="testuser", password="testpassword"))
+
+    def test_deleted_user_profile_is_not_found(self):
+        self.client.post(reverse("accounts:delete"))
+        other = User.objects.create_user(username="otheruser", password="testpassword")
+        self.client.force_login(other)
+        response = self.client.get(reverse("accounts:user_profile", kwargs={"username": "testuser"}))
+        self.assertEqual(response.status_code, 404)
+
 
 class TestUserProfileView(TestCase):
     def setUp(self):
@@ -288,6 +440,30 @@ class TestUserProfileView(TestCase):
         context = response.context
         self.assertQuerysetEqual(context["tweet_list"], Tweet.objects.filter(user=self.user))
 
+    def test_num_queries(self):
+        other = User.objects.create_user(username="otheruser")
+        Tweet.objects.create(user=other, content="Hi!")
+        # session, user, mutes and blocks, tweets, following/follower counts, is_following, liked tweet ids
+        with self.assertNumQueries(8):
+            self.client.get(reverse("accounts:user_profile", kwargs={"username": self.user.username}))
+        # viewing someone else costs one more query to resolve them
+        with self.assertNumQueries(8):
+            self.client.get(reverse("accounts:user_profile", kwargs={"username": other.username}))
+        # the target user and the follow counts are cached now
+        with self.assertNumQueries(5):
+            self.client.get(reverse("accounts:user_profile", kwargs={"username": other.username}))
+
+    def test_cached_counts_follow_follows(self):
+        other = User.objects.create_user(username="otheruser")
+        url = reverse("accounts:user_profile", kwargs={"username": other.username})
+        self.assertEqual(self.client.get(url).context["follower_count"], 0)
+        self.client.post(reverse("accounts:follow", kwargs={"username": other.username}))
+        self.assertEqual(self.client.get(url).context["follower_count"], 1)
+        own = reverse("accounts:user_profile", kwargs={"username": self.user.username})
+        self.assertEqual(self.client.get(own).context["following_count"], 1)
+        self.client.post(reverse("accounts:unfollow", kwargs={"username": other.username}))
+        self.assertEqual(self.client.get(url).context["follower_count"], 0)
+
 
 # class TestUserProfileEditView(TestCase):
 
@@ -316,6 +492,18 @@ class TestFollowView(TestCase):
         )
         self.assertTrue(FriendShip.objects.filter(follower=self.user1, following=self.user2).exists())
 
+    def test_num_queries(self):
+        # session, user, target user, mutes and blocks, exists, savepoint, follower lock, insert, outbox event,
+        # release, notification task
+        with self.assertNumQueries(11):
+            self.client.post(reverse("accounts:follow", kwargs={"username": self.user2.username}))
+        # following yourself is rejected without looking the user up again
+        with self.assertNumQueries(2):
+            self.client.post(reverse("accounts:follow", kwargs={"username": self.user1.username}))
+        # the target's username is cached now: session, user, exists
+        with self.assertNumQueries(3):
+            self.client.post(reverse("accounts:follow", kwargs={"username": self.user2.username}))
+
     def test_failure_post_with_not_exist_user(self):
         response = self.client.post(reverse("accounts:follow", kwargs={"username": "empty.user"}))
         self.assertEqual(response.status_code, 404)
@@ -327,6 +515,86 @@ class TestFollowView(TestCase):
         self.assertEqual(FriendShip.objects.count(), 0)
 
 
+class TestBulkFollow(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.others = [User.objects.create_user(username="user{}".format(i)) for i in range(5)]
+        self.url = reverse("accounts:bulk_follow")
+
+    def post(self, usernames):
+        return self.client.post(self.url, json.dumps({"usernames": usernames}), content_type="application/json")
+
+    def test_follow_many(self):
+        FriendShip.objects.create(follower=self.user, following=self.others[0])
+        response = self.post(["user0", "@user1", "user2", "user2", "nobody", "testuser", ""])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"followed": ["user1", "user2"], "already_following": ["user0"], "unknown": ["nobody", "testuser"]},
+        )
+        self.assertEqual(FriendShip.objects.filter(follower=self.user).count(), 3)
+        self.assertEqual(OutboxEvent.objects.filter(event_type="follow.created").count(), 2)
+        self.assertEqual(Task.objects.filter(name="notifications.record").count(), 2)
+
+    def test_rows_followed_concurrently_are_not_announced(self):
+        lock = services.lock_follows
+        profile_page = Client()
+        profile_page.force_login(self.user)
+
+        def follow_first(follower_id):
+            # a follow from the profile page, committed after the names were resolved
+            profile_page.post(reverse("accounts:follow", kwargs={"username": "user1"}))
+            lock(follower_id)
+
+        with patch.object(services, "lock_follows", side_effect=follow_first):
+            response = self.post(["user0", "user1"])
+        self.assertEqual(response.json()["followed"], ["user0"])
+        self.assertEqual(response.json()["already_following"], ["user1"])
+        self.assertEqual(FriendShip.objects.filter(follower=self.user).count(), 2)
+        # one announcement each: the profile page's and the import's
+        self.assertEqual(OutboxEvent.objects.filter(event_type="follow.created").count(), 2)
+        self.assertEqual(Task.objects.filter(name="notifications.record").count(), 2)
+
+    def test_profile_follow_takes_the_follow_lock(self):
+        with patch("accounts.views.lock_follows", wraps=services.lock_follows) as lock:
+            self.client.post(reverse("accounts:follow", kwargs={"username": "user1"}))
+        lock.assert_called_once_with(self.user.pk)
+
+    def test_queries_do_not_grow_with_the_list(self):
+        # session, user, mutes and blocks, resolve names, savepoint, follower lock, existing rows, insert,
+        # outbox events, notification tasks, release
+        with self.assertNumQueries(11):
+            self.post(["user0", "user1"])
+        # the mutes and blocks are cached now
+        with self.assertNumQueries(10):
+            self.post(["user{}".format(i) for i in range(5)])
+
+    def test_counts_are_refreshed(self):
+        self.client.get(reverse("accounts:user_profile", kwargs={"username": "user1"}))
+        self.post(["user1"])
+        response = self.client.get(reverse("accounts:user_profile", kwargs={"username": "user1"}))
+        self.assertEqual(response.context["follower_count"], 1)
+
+    def test_invalid_input(self):
+        self.assertEqual(self.post("user1").status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+        with self.settings(BULK_FOLLOW_MAX=2):
+            self.assertEqual(self.post(["user0", "user1", "user2"]).status_code, 400)
+        self.assertEqual(self.client.post(self.url, "{", content_type="application/json").status_code, 400)
+        self.assertFalse(FriendShip.objects.exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command("bulk_follow", "testuser", "user0", "user1", "nobody", stdout=out)
+        self.assertIn("followed 2, already following 0, unknown 1", out.getvalue())
+
+    def test_duplicate_pairs_are_rejected(self):
+        FriendShip.objects.create(follower=self.user, following=self.others[0])
+        with self.assertRaises(IntegrityError):
+            FriendShip.objects.create(follower=self.user, following=self.others[0])
+
+
 class TestUnfollowView(TestCase):
     def setUp(self):
         self.user1 = User.objects.create_user(username="testuser1", password="testpassword")
@@ -344,6 +612,14 @@ class TestUnfollowView(TestCase):
         )
         self.assertFalse(FriendShip.objects.filter(follower=self.user1, following=self.user2).exists())
 
+    def test_num_queries(self):
+        # session, user, target user, savepoint, delete, outbox event, release
+        with self.assertNumQueries(7):
+            self.client.post(reverse("accounts:unfollow", kwargs={"username": self.user2.username}))
+        # target cached, nothing deleted so no event
+        with self.assertNumQueries(5):
+            self.client.post(reverse("accounts:unfollow", kwargs={"username": self.user2.username}))
+
     def test_failure_post_with_self(self):
         response = self.client.post(reverse("accounts:unfollow", kwargs={"username": self.user1.username}))
         self.assertEqual(response.status_code, 400)
@@ -355,6 +631,82 @@ class TestUnfollowView(TestCase):
         self.assertTrue(FriendShip.objects.count(), 1)
 
 
+class TestMuteAndBlock(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.other = User.objects.create_user(username="otheruser")
+        Tweet.objects.create(user=self.other, content="hello")
+
+    def post(self, name, username="otheruser"):
+        return self.client.post(reverse("accounts:" + name, kwargs={"username": username}))
+
+    def test_mute_and_unmute(self):
+        self.assertRedirects(self.post("mute"), reverse("accounts:user_profile", kwargs={"username": "otheruser"}))
+        self.post("mute")
+        self.assertEqual(Mute.objects.filter(user=self.user, target=self.other).count(), 1)
+        self.assertTrue(get_exclusions(self.user.pk).is_muted(self.other.pk))
+        response = self.client.get(reverse("accounts:user_profile", kwargs={"username": "otheruser"}))
+        self.assertContains(response, "ミュートを解除")
+        # muting only affects timelines
+        self.assertContains(response, "hello")
+
+        self.post("unmute")
+        self.assertFalse(Mute.objects.exists())
+        self.assertFalse(get_exclusions(self.user.pk))
+
+    def test_cannot_target_yourself(self):
+        for name in ("mute", "unmute", "block", "unblock"):
+            self.assertEqual(self.post(name, "testuser").status_code, 400)
+        self.assertEqual(self.post("mute", "nobody").status_code, 404)
+
+    def test_block_removes_follows_both_ways(self):
+        FriendShip.objects.create(follower=self.user, following=self.other)
+        FriendShip.objects.create(follower=self.other, following=self.user)
+        self.post("block")
+        self.assertFalse(FriendShip.objects.exists())
+        self.assertEqual(OutboxEvent.objects.filter(event_type="follow.deleted").count(), 2)
+        self.assertTrue(get_exclusions(self.user.pk).is_blocking(self.other.pk))
+        self.assertTrue(get_exclusions(self.other.pk).blocks(self.user.pk))
+        self.assertFalse(get_exclusions(self.other.pk).is_blocking(self.user.pk))
+
+        response = self.client.get(reverse("accounts:user_profile", kwargs={"username": "otheruser"}))
+        self.assertContains(response, "ブロックしているため")
+        self.assertNotContains(response, "hello")
+        self.assertEqual(response.context["following_count"], 0)
+
+        self.post("follow")
+        self.assertFalse(FriendShip.objects.exists())
+        self.client.force_login(self.other)
+        self.post("follow", "testuser")
+        self.assertFalse(FriendShip.objects.exists())
+        response = self.client.post(
+            reverse("accounts:bulk_follow"), json.dumps({"usernames": ["testuser"]}), content_type="application/json"
+        )
+        self.assertEqual(response.json()["unknown"], ["testuser"])
+
+        self.client.force_login(self.user)
+        self.post("unblock")
+        self.assertFalse(Block.objects.exists())
+        self.assertFalse(get_exclusions(self.other.pk))
+
+    def test_exclusions_are_loaded_in_one_query_and_cached(self):
+        targets = User.objects.bulk_create([User(username="target{}".format(i)) for i in range(3)])
+        Mute.objects.bulk_create([Mute(user=self.user, target=target) for target in targets])
+        Block.objects.create(user=self.user, target=self.other)
+        Block.objects.create(user=targets[0], target=self.user)
+        with self.assertNumQueries(1):
+            exclusions = get_exclusions(self.user.pk)
+        with self.assertNumQueries(0):
+            get_exclusions(self.user.pk)
+        self.assertEqual(list(exclusions.muted), sorted(target.pk for target in targets))
+        self.assertEqual(list(exclusions.blocking), [self.other.pk])
+        self.assertEqual(list(exclusions.blocked_by), [targets[0].pk])
+        self.assertTrue(exclusions.hides(targets[2].pk))
+        self.assertFalse(exclusions.hides(self.user.pk))
+        self.assertEqual(exclusions.hidden_ids(), {self.other.pk} | {target.pk for target in targets})
+
+
 class TestFollowingListView(TestCase):
     def test_success_get(self):
         self.user = User.objects.create_user(username="testuser", password="testpassword")
@@ -362,6 +714,13 @@ class TestFollowingListView(TestCase):
         response = self.client.get(reverse("accounts:following_list", kwargs={"username": self.user.username}))
         self.assertEqual(response.status_code, 200)
 
+    def test_num_queries(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("accounts:following_list", kwargs={"username": self.user.username}))
+            b"".join(response.streaming_content)
+
 
 class TestFollowerListView(TestCase):
     def test_success_get(self):
@@ -369,3 +728,143 @@ class TestFollowerListView(TestCase):
         self.client.login(username="testuser", password="testpassword")
         response = self.client.get(reverse("accounts:follower_list", kwargs={"username": self.user.username}))
         self.assertEqual(response.status_code, 200)
+
+    def test_num_queries(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("accounts:follower_list", kwargs={"username": self.user.username}))
+            b"".join(response.streaming_content)
+
+
+class TestStreamingListView(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.url = reverse("accounts:follower_list", kwargs={"username": self.user.username})
+
+    def test_rows_are_streamed_in_chunks(self):
+        followers = [User.objects.create_user(username="follower{}".format(i)) for i in range(5)]
+        FriendShip.objects.bulk_create([FriendShip(follower=user, following=self.user) for user in followers])
+        with patch.object(FollowerListView, "chunk_size", 2):
+            response = self.client.get(self.url)
+            self.assertTrue(response.streaming)
+            chunks = [chunk.decode() for chunk in response.streaming_content]
+        # page head, three chunks of rows (2, 2, 1), page tail
+        self.assertEqual(len(chunks), 5)
+        self.assertIn("<h1>FollowerList</h1>", chunks[0])
+        self.assertEqual([chunk.count("follower") for chunk in chunks[1:4]], [4, 4, 2])
+        self.assertIn("</html>", chunks[-1])
+        self.assertNotIn("streaming rows", "".join(chunks))
+
+    def test_head_is_sent_before_the_list_is_read(self):
+        response = self.client.get(self.url)
+        content = iter(response.streaming_content)
+        with self.assertNumQueries(0):
+            self.assertIn(b"<h1>FollowerList</h1>", next(content))
+        with self.assertNumQueries(1):
+            self.assertIn("フォローされているユーザーはいません".encode(), next(content))
+        self.assertIn(b"</html>", b"".join(content))
+
+
+BY_USERNAME = '"accounts_user"."username" ='
+
+
+class TestUsernameResolver(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.other = User.objects.create_user(username="otheruser")
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_warm_cache_skips_the_user_query_on_every_route(self):
+        for name in ("user_profile", "following_list", "follower_list"):
+            url = reverse("accounts:" + name, kwargs={"username": self.other.username})
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertFalse([q for q in queries if BY_USERNAME in q["sql"]], name)
+        for name in ("follow", "unfollow"):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(reverse("accounts:" + name, kwargs={"username": self.other.username}))
+            self.assertFalse([q for q in queries if BY_USERNAME in q["sql"]], name)
+
+    def test_unknown_username_is_cached(self):
+        url = reverse("accounts:user_profile", kwargs={"username": "nobody"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        # session, user
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        User.objects.create_user(username="nobody")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_rename_and_delete_invalidate(self):
+        old_url = reverse("accounts:user_profile", kwargs={"username": "otheruser"})
+        self.assertEqual(self.client.get(old_url).status_code, 200)
+        other = User.objects.get(pk=self.other.pk)
+        other.username = "renamed"
+        other.save()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        new_url = reverse("accounts:user_profile", kwargs={"username": "renamed"})
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+        soft_delete_user(other)
+        self.assertEqual(self.client.get(new_url).status_code, 404)
+
+
+class TestAdmin(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="testpassword")
+        self.user = User.objects.create_user(username="testuser")
+        FriendShip.objects.create(follower=self.user, following=self.admin)
+        self.client.login(username="admin", password="testpassword")
+
+    def test_changelists(self):
+        response = self.client.get(reverse("admin:accounts_friendship_changelist"))
+        self.assertEqual(len(response.context["cl"].result_list), 1)
+        response = self.client.get(reverse("admin:accounts_user_changelist"), {"q": "testuser"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.user])
+
+    def test_delete_action_soft_deletes(self):
+        self.client.post(
+            reverse("admin:accounts_user_changelist"),
+            {"action": "soft_delete_selected", "_selected_action": [self.user.pk]},
+        )
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.deleted_at)
+        self.assertFalse(self.user.is_active)
+
+
+class TestQueryBudgets(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.others = []
+
+    def other(self, i):
+        while len(self.others) <= i:
+            self.others.append(User.objects.create_user(username="user{}".format(len(self.others))))
+        return self.others[i]
+
+    def test_profile(self):
+        def seed(size):
+            for i in range(Tweet.objects.count(), size):
+                tweet = Tweet.objects.create(user=self.user, content="tweet {}".format(i))
+                Like.objects.create(user=self.other(i), tweet=tweet)
+
+        url = reverse("accounts:user_profile", kwargs={"username": self.user.username})
+        self.assertQueriesDoNotScale("accounts:user_profile", url, seed)
+
+    def test_following_list(self):
+        def seed(size):
+            for i in range(FriendShip.objects.count(), size):
+                FriendShip.objects.create(follower=self.user, following=self.other(i))
+
+        url = reverse("accounts:following_list", kwargs={"username": self.user.username})
+        self.assertQueriesDoNotScale("accounts:following_list", url, seed)
+
+    def test_follower_list(self):
+        def seed(size):
+            for i in range(FriendShip.objects.count(), size):
+                FriendShip.objects.create(follower=self.other(i), following=self.user)
+
+        url = reverse("accounts:follower_list", kwargs={"username": self.user.username})
+        self.assertQueriesDoNotScale("accounts:follower_list", url, seed)
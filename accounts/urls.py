@@ -9,9 +9,15 @@ urlpatterns = [
     path("signup/", views.SignupView.as_view(), name="signup"),
     path("login/", views.LoginView.as_view(), name="login"),
     path("logout/", views.LogoutView.as_view(), name="logout"),
+    path("delete/", views.AccountDeleteView.as_view(), name="delete"),
+    path("bulk_follow/", views.BulkFollowView.as_view(), name="bulk_follow"),
     path("<str:username>/", views.UserProfileView.as_view(), name="user_profile"),
     path("<str:username>/follow/", views.FollowView.as_view(), name="follow"),
     path("<str:username>/unfollow/", views.UnFollowView.as_view(), name="unfollow"),
+    path("<str:username>/mute/", views.MuteView.as_view(), name="mute"),
+    path("<str:username>/unmute/", views.UnmuteView.as_view(), name="unmute"),
+    path("<str:username>/block/", views.BlockView.as_view(), name="block"),
+    path("<str:username>/unblock/", views.UnblockView.as_view(), name="unblock"),
     path("<str:username>/following_list/", views.FollowingListView.as_view(), name="following_list"),
     path("<str:username>/follower_list/", views.FollowerListView.as_view(), name="follower_list"),
 ]
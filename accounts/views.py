@@ -1,19 +1,60 @@
+import json
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import authenticate, login
+from django.contrib.auth import login, logout
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponseBadRequest
-from django.shortcuts import get_object_or_404, redirect
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import redirect
 from django.urls import reverse_lazy
-from django.views.generic import CreateView, ListView, TemplateView, View
+from django.utils.cache import add_never_cache_headers
+from django.utils.decorators import method_decorator
+from django.views.generic import CreateView, TemplateView, View
 
+from core.loaders import get_loader
+from core.pagecache import anonymous_page_cache
+from core.streaming import StreamingListView
+from notifications.models import Notification
+from notifications.tasks import record_notification
+from outbox.services import Type, emit
+from tweets import ranking
 from tweets.models import Like, Tweet
+from tweets.purge import soft_delete_user
 
+from . import hashers
+from .exclusions import get_exclusions
 from .forms import LoginForm, SignupForm
 from .models import FriendShip, User
+from .services import (
+    BulkFollowError,
+    block,
+    bulk_follow,
+    follow_counts,
+    forget_follow_counts,
+    lock_follows,
+    mute,
+    resolve_username,
+    unblock,
+    unmute,
+)
+
+
+def get_user_or_404(request, username):
+    loader = get_loader(request)
+    user = loader.peek(User, username=username)
+    if user is None:
+        user = resolve_username(username)
+        if user is not None:
+            loader.prime(user)
+    if user is None or user.deleted_at is not None:
+        raise Http404("No User matches the given query.")
+    return user
 
 
+@method_decorator(anonymous_page_cache, name="dispatch")
 class SignupView(CreateView):
     form_class = SignupForm
     template_name = "accounts/signup.html"
@@ -21,32 +62,72 @@ class SignupView(CreateView):
 
     def form_valid(self, form):
         response = super().form_valid(form)
-        username = form.cleaned_data["username"]
-        password = form.cleaned_data["password1"]
-        user = authenticate(self.request, username=username, password=password)
-        login(self.request, user)
+        # The form has just hashed and saved the password; logging in directly avoids hashing it a second time.
+        login(self.request, self.object, backend="django.contrib.auth.backends.ModelBackend")
         return response
 
 
+@method_decorator(anonymous_page_cache, name="dispatch")
 class LoginView(auth_views.LoginView):
+    """Django's login view with async handlers, so under ASGI the password hash never holds a thread.
+
+    ``post`` awaits the hash in the hashing pool first (``hashers.prehash``);
+    the form then validates and logs in as usual, taking the remembered result.
+    """
+
     form_class = LoginForm
     template_name = "accounts/login.html"
+    http_method_names = ["get", "post", "head", "options"]
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Skips auth's dispatch(), whose decorators can't wrap a coroutine in this Django version: CSRF is
+        # checked by the middleware and the other two are applied here.
+        request.sensitive_post_parameters = "__ALL__"
+        response = await View.dispatch(self, request, *args, **kwargs)
+        add_never_cache_headers(response)
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        return await sync_to_async(super().get)(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        token = await hashers.prehash(request.POST.get("username"), request.POST.get("password"))
+        try:
+            return await sync_to_async(super().post)(request, *args, **kwargs)
+        finally:
+            hashers.forget_prehash(token)
 
 
 class LogoutView(auth_views.LogoutView):
     pass
 
 
+class AccountDeleteView(LoginRequiredMixin, TemplateView):
+    template_name = "accounts/delete.html"
+
+    def post(self, request, *args, **kwargs):
+        soft_delete_user(request.user)
+        logout(request)
+        messages.success(request, "アカウントを削除しました")
+        return redirect(settings.LOGOUT_REDIRECT_URL)
+
+
 class UserProfileView(LoginRequiredMixin, TemplateView):
     template_name = "accounts/profile.html"
 
     def get_context_data(self, **kwargs):
-        user = get_object_or_404(User, username=self.kwargs["username"])
+        user = get_user_or_404(self.request, self.kwargs["username"])
         context = super().get_context_data(**kwargs)
-        context["tweet_list"] = Tweet.objects.select_related("user").prefetch_related("liked_tweet").filter(user=user)
+        exclusions = get_exclusions(self.request.user.pk)
+        context["is_muted"] = exclusions.is_muted(user.pk)
+        context["is_blocking"] = exclusions.is_blocking(user.pk)
+        context["is_blocked"] = exclusions.blocks(user.pk)
+        if context["is_blocked"]:
+            context["tweet_list"] = Tweet.objects.none()
+        else:
+            context["tweet_list"] = Tweet.objects.select_related("user").filter(user=user)
         context["tweet_user"] = user
-        context["following_count"] = FriendShip.objects.filter(follower=user).count()
-        context["follower_count"] = FriendShip.objects.filter(following=user).count()
+        context["following_count"], context["follower_count"] = follow_counts(user.pk)
         context["is_following"] = FriendShip.objects.filter(following=user, follower=self.request.user).exists()
         liked_list = Like.objects.filter(user=self.request.user).values_list("tweet_id", flat=True)
         context["liked_list"] = liked_list
@@ -55,47 +136,129 @@ class UserProfileView(LoginRequiredMixin, TemplateView):
 
 class FollowView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
-        following = get_object_or_404(User, username=self.kwargs["username"])
+        following = get_user_or_404(self.request, self.kwargs["username"])
 
         if request.user == following:
             return HttpResponseBadRequest("自分自身を対象にできません")
 
+        if get_exclusions(request.user.pk).blocks(following.pk):
+            messages.warning(request, "ブロックしているユーザーはフォローできません")
+            return redirect("tweets:home")
+
         if FriendShip.objects.filter(follower=request.user, following=following).exists():
             messages.warning(request, "あなたはすでにフォローしています")
             return redirect("tweets:home")
 
-        FriendShip.objects.create(follower=request.user, following=following)
+        try:
+            with transaction.atomic():
+                lock_follows(request.user.pk)
+                FriendShip.objects.create(follower=request.user, following=following)
+                emit(Type.FOLLOW_CREATED, follower_id=request.user.pk, following_id=following.pk)
+        except IntegrityError:
+            # A concurrent request followed first.
+            messages.warning(request, "あなたはすでにフォローしています")
+            return redirect("tweets:home")
+        forget_follow_counts(request.user.pk, following.pk)
+        ranking.forget(request.user.pk)
+        record_notification.enqueue(
+            recipient_id=following.pk,
+            verb=Notification.Verb.FOLLOW,
+            actor_id=request.user.pk,
+            actor_username=request.user.username,
+        )
         messages.success(request, "フォローしました")
         return redirect("tweets:home")
 
 
+class BulkFollowView(LoginRequiredMixin, View):
+    """Follow many accounts at once (JSON body ``{"usernames": [...]}``), e.g. when moving from another service."""
+
+    def post(self, request, *args, **kwargs):
+        try:
+            usernames = json.loads(request.body).get("usernames")
+        except (ValueError, AttributeError):
+            return JsonResponse({"errors": {"__all__": ["JSONの形式が正しくありません。"]}}, status=400)
+        try:
+            followed, already, unknown = bulk_follow(request.user, usernames)
+        except BulkFollowError as e:
+            return JsonResponse({"errors": e.errors}, status=400)
+        return JsonResponse({"followed": followed, "already_following": already, "unknown": unknown})
+
+
 class UnFollowView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
-        following = get_object_or_404(User, username=self.kwargs["username"])
+        following = get_user_or_404(self.request, self.kwargs["username"])
 
         if request.user == following:
             return HttpResponseBadRequest("自分自身を対象にできません")
 
-        FriendShip.objects.filter(follower=request.user, following=following).delete()
+        with transaction.atomic():
+            deleted, _ = FriendShip.objects.filter(follower=request.user, following=following).delete()
+            if deleted:
+                emit(Type.FOLLOW_DELETED, follower_id=request.user.pk, following_id=following.pk)
+        forget_follow_counts(request.user.pk, following.pk)
+        ranking.forget(request.user.pk)
         messages.success(request, "フォローを外しました")
         return redirect("tweets:home")
 
 
-class FollowerListView(LoginRequiredMixin, ListView):
+class MuteView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        target = get_user_or_404(self.request, self.kwargs["username"])
+        if request.user == target:
+            return HttpResponseBadRequest("自分自身を対象にできません")
+        mute(request.user, target)
+        messages.success(request, "ミュートしました")
+        return redirect("accounts:user_profile", target.username)
+
+
+class UnmuteView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        target = get_user_or_404(self.request, self.kwargs["username"])
+        if request.user == target:
+            return HttpResponseBadRequest("自分自身を対象にできません")
+        unmute(request.user, target)
+        messages.success(request, "ミュートを解除しました")
+        return redirect("accounts:user_profile", target.username)
+
+
+class BlockView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        target = get_user_or_404(self.request, self.kwargs["username"])
+        if request.user == target:
+            return HttpResponseBadRequest("自分自身を対象にできません")
+        block(request.user, target)
+        messages.success(request, "ブロックしました")
+        return redirect("accounts:user_profile", target.username)
+
+
+class UnblockView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        target = get_user_or_404(self.request, self.kwargs["username"])
+        if request.user == target:
+            return HttpResponseBadRequest("自分自身を対象にできません")
+        unblock(request.user, target)
+        messages.success(request, "ブロックを解除しました")
+        return redirect("accounts:user_profile", target.username)
+
+
+class FollowerListView(LoginRequiredMixin, StreamingListView):
     model = User
     template_name = "accounts/follower_list.html"
+    rows_template_name = "accounts/follower_rows.html"
     context_object_name = "follower_friendships"
 
     def get_queryset(self):
-        user = get_object_or_404(User, username=self.kwargs["username"])
+        user = get_user_or_404(self.request, self.kwargs["username"])
         return FriendShip.objects.select_related("follower").filter(following=user)
 
 
-class FollowingListView(LoginRequiredMixin, ListView):
+class FollowingListView(LoginRequiredMixin, StreamingListView):
     model = User
     template_name = "accounts/following_list.html"
+    rows_template_name = "accounts/following_rows.html"
     context_object_name = "following_friendships"
 
     def get_queryset(self):
-        user = get_object_or_404(User, username=self.kwargs["username"])
+        user = get_user_or_404(self.request, self.kwargs["username"])
         return FriendShip.objects.select_related("following").filter(follower=user)
@@ -0,0 +1,97 @@
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+CURSOR_VAR = "cursor"
+
+
+def estimated_count(model):
+    """Approximate row count of ``model``'s table without scanning it.
+
+    PostgreSQL and MySQL keep planner statistics; elsewhere (SQLite) the largest
+    primary key is read from the index, which over-counts deleted rows.
+    """
+    connection = connections[router.db_for_read(model)]
+    table = model._meta.db_table
+    query = {
+        "postgresql": "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+        "mysql": (
+            "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s"
+        ),
+    }.get(connection.vendor)
+    if query:
+        with connection.cursor() as cursor:
+            cursor.execute(query, [table])
+            row = cursor.fetchone()
+        if row and row[0] is not None and row[0] >= 0:
+            return row[0]
+    return model._base_manager.using(connection.alias).aggregate(top=Max("pk"))["top"] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list.model)
+
+
+class CursorChangeList(ChangeList):
+    """Changelist that pages by primary key (``?cursor=<pk>``) instead of OFFSET and never counts rows."""
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        queryset = self.queryset
+        self.cursor = request.GET.get(CURSOR_VAR)
+        if self.cursor:
+            try:
+                queryset = queryset.filter(pk__lt=int(self.cursor))
+            except ValueError:
+                raise IncorrectLookupParameters
+        rows = list(queryset[: self.list_per_page + 1])
+        self.result_list = rows[: self.list_per_page]
+        self.next_cursor = self.result_list[-1].pk if len(rows) > self.list_per_page else None
+        self.next_url = self.get_query_string({CURSOR_VAR: self.next_cursor}) if self.next_cursor else None
+        self.first_url = self.get_query_string(remove=[CURSOR_VAR]) if self.cursor else None
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        filtered = self.has_active_filters or bool(self.query)
+        self.estimated_count = None if filtered else self.paginator.count
+        self.result_count = len(self.result_list) if filtered else self.estimated_count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or self.next_cursor)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base admin for tables too big to COUNT(*) or OFFSET through.
+
+    Rows are listed newest first and paged with a primary-key cursor; column
+    sorting is off because the cursor relies on that order. Subclasses should
+    use ``raw_id_fields`` for foreign keys, ``list_select_related`` for the
+    columns they display, and only filter or search on indexed columns.
+    """
+
+    change_list_template = "admin/cursor_change_list.html"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ("-pk",)
+    sortable_by = ()
+
+    def get_changelist(self, request, **kwargs):
+        return CursorChangeList
+
+    def get_deleted_objects(self, objs, request):
+        # The default walks every cascade to list it on the confirmation page, which
+        # reads millions of rows here; list just the selected objects instead.
+        objs = list(objs)
+        perms_needed = set() if self.has_delete_permission(request) else {self.opts.verbose_name}
+        return [str(obj) for obj in objs], {self.opts.verbose_name_plural: len(objs)}, perms_needed, []
@@ -0,0 +1,26 @@
+import time
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.db import connection
+
+
+@contextmanager
+def temporary_database():
+    """Run a benchmark against a throwaway copy of the schema (the test database), never the real one."""
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    # SQLite keeps an in-memory test database alive between uses; start every run empty.
+    call_command("flush", verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self.started
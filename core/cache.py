@@ -0,0 +1,252 @@
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+# One local tier per LOCATION and process, shared by every thread (django.core.cache.caches is per thread).
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class LocalTier:
+    """Bounded LRU of pickled values, each trusted for at most ``ttl`` seconds."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        # Striped locks for single-flight recomputation within the process.
+        self.flight_locks = [threading.Lock() for _ in range(64)]
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                self.stats["expirations"] += 1
+                return _MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        ttl = self.ttl if timeout is None else min(timeout, self.ttl)
+        if ttl <= 0:
+            self.delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def delete(self, key):
+        with self.lock:
+            return self.entries.pop(key, None) is not None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def flight_lock(self, key):
+        return self.flight_locks[hash(key) % len(self.flight_locks)]
+
+
+class TieredCache(BaseCache):
+    """Per-process LRU in front of a shared cache.
+
+    Reads are answered from the process-local tier when possible and from the
+    shared backend (``OPTIONS["SHARED"]``, another ``CACHES`` alias) otherwise.
+    Writes and deletes go to both tiers. Other processes keep their local copy
+    for at most ``LOCAL_TIMEOUT`` seconds, which bounds how stale a value can
+    be after it is changed elsewhere; use ``namespace()`` to invalidate a whole
+    group of keys at once.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = options.get("SHARED", "shared")
+        self.lease_timeout = options.get("LEASE_TIMEOUT", 10)
+        with _tiers_lock:
+            if location not in _tiers:
+                _tiers[location] = LocalTier(options.get("LOCAL_MAX_ENTRIES", 1000), options.get("LOCAL_TIMEOUT", 5))
+            self.local = _tiers[location]
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.local.stats["local_hits"] += 1
+            return value
+        value = self.shared.get(key, _MISSING)
+        if value is _MISSING:
+            self.local.stats["misses"] += 1
+            return default
+        self.local.stats["shared_hits"] += 1
+        self.local.set(key, value, None)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        self.shared.set(key, value, timeout)
+        self.local.set(key, value, timeout)
+        self.local.stats["sets"] += 1
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        if not self.shared.add(key, value, timeout):
+            return False
+        self.local.set(key, value, timeout)
+        self.local.stats["sets"] += 1
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.local.delete(key)
+        return self.shared.touch(key, self._timeout(timeout))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.local.stats["deletes"] += 1
+        local = self.local.delete(key)
+        return self.shared.delete(key) or local
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        self.local.stats["deletes"] += len(keys)
+        for key in keys:
+            self.local.delete(key)
+        self.shared.delete_many(keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.local.get(key) is not _MISSING or self.shared.has_key(key)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.local.delete(key)
+        return self.shared.incr(key, delta)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """Return the cached value or compute it, letting only one caller compute at a time.
+
+        Callers in this process wait on a lock; callers in other processes wait
+        for the lease holder to store the value, for up to ``LEASE_TIMEOUT``
+        seconds. ``None`` is cached like any other value.
+        """
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        made_key = self.make_and_validate_key(key, version=version)
+        with self.local.flight_lock(made_key):
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self.local.stats["coalesced"] += 1
+                return value
+            lease_key = made_key + ":lease"
+            leased = self.shared.add(lease_key, 1, self.lease_timeout)
+            if not leased:
+                value = self._wait_for(key, version)
+                if value is not _MISSING:
+                    self.local.stats["coalesced"] += 1
+                    return value
+            try:
+                value = default() if callable(default) else default
+                self.local.stats["computes"] += 1
+                self.set(key, value, timeout, version=version)
+            finally:
+                if leased:
+                    self.shared.delete(lease_key)
+        return value
+
+    def _wait_for(self, key, version):
+        deadline = time.monotonic() + self.lease_timeout
+        made_key = self.make_and_validate_key(key, version=version)
+        while time.monotonic() < deadline:
+            time.sleep(0.02)
+            value = self.shared.get(made_key, _MISSING)
+            if value is not _MISSING:
+                self.local.set(made_key, value, None)
+                return value
+        return _MISSING
+
+    def stats(self):
+        stats = dict(self.local.stats)
+        stats["local_entries"] = len(self.local.entries)
+        stats["local_max_entries"] = self.local.max_entries
+        return stats
+
+    def reset_stats(self):
+        self.local.stats.clear()
+
+
+class Namespace:
+    """A group of keys that can be invalidated together, across processes, by bumping its version."""
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+        self.version_key = "namespace:{}".format(name)
+
+    def version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, time.time_ns(), None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    def key(self, key):
+        return "{}:{}:{}".format(self.name, self.version(), key)
+
+    def get(self, key, default=None):
+        return self.cache.get(self.key(key), default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.cache.set(self.key(key), value, timeout)
+
+    def delete(self, key):
+        return self.cache.delete(self.key(key))
+
+    def delete_many(self, keys):
+        prefix = self.key("")
+        self.cache.delete_many([prefix + str(key) for key in keys])
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT):
+        return self.cache.get_or_set(self.key(key), default, timeout)
+
+    def invalidate(self):
+        """Orphan every key in the namespace; old entries simply expire.
+
+        Versions are timestamps rather than counters so an evicted version key
+        can never bring back a version that is still in use.
+        """
+        self.cache.set(self.version_key, time.time_ns(), None)
+
+
+def namespace(name, alias="default"):
+    return Namespace(caches[alias], name)
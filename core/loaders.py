@@ -0,0 +1,131 @@
+from django.http import Http404
+
+
+class Loader:
+    """Request-scoped identity map with DataLoader-style batch loading.
+
+    Every instance fetched through the loader is remembered under its primary
+    key and each of its unique fields, so asking for the same row again (by
+    ``pk`` or e.g. ``username``) is answered without a query. Foreign keys
+    pointing at already loaded rows are filled in from the map as well.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self._objects = {}
+        self._user_primed = request is None
+
+    @staticmethod
+    def _key(model, field_name, value):
+        return (model._meta.concrete_model._meta.label, field_name, str(value))
+
+    @staticmethod
+    def _field_name(model, lookup):
+        name = model._meta.pk.name if lookup == "pk" else lookup
+        field = model._meta.get_field(name)
+        if not (field.primary_key or field.unique):
+            raise ValueError("{}.{} is not unique and cannot be used as an identity".format(model.__name__, name))
+        return field.attname
+
+    def _prime_request_user(self):
+        if self._user_primed:
+            return
+        self._user_primed = True
+        user = getattr(self.request, "user", None)
+        if user is not None and user.is_authenticated:
+            self.prime(user)
+
+    def _lookup(self, model, field_name, value):
+        self._prime_request_user()
+        return self._objects.get(self._key(model, field_name, value))
+
+    def _attach_related(self, instance):
+        for field in instance._meta.concrete_fields:
+            if not field.is_relation or field.is_cached(instance):
+                continue
+            value = getattr(instance, field.attname)
+            if value is None:
+                continue
+            related = self._objects.get(self._key(field.related_model, field.target_field.attname, value))
+            if related is not None:
+                field.set_cached_value(instance, related)
+
+    def prime(self, instance):
+        """Remember ``instance`` (and any related objects already cached on it)."""
+        opts = instance._meta
+        for field in opts.concrete_fields:
+            if field.primary_key or field.unique:
+                value = getattr(instance, field.attname)
+                if value is not None:
+                    self._objects[self._key(opts.model, field.attname, value)] = instance
+            if field.is_relation and field.is_cached(instance):
+                related = field.get_cached_value(instance)
+                if related is not None:
+                    self.prime(related)
+        return instance
+
+    def forget(self, instance):
+        opts = instance._meta
+        for field in opts.concrete_fields:
+            if field.primary_key or field.unique:
+                self._objects.pop(self._key(opts.model, field.attname, getattr(instance, field.attname)), None)
+
+    def peek(self, model, **lookup):
+        """The already loaded instance for a single unique lookup, or ``None``; never queries."""
+        ((name, value),) = lookup.items()
+        return self._lookup(model, self._field_name(model, name), value)
+
+    def get(self, model, select_related=(), **lookup):
+        """Like ``Model.objects.get(field=value)`` for a single unique field, but at most once per request."""
+        ((name, value),) = lookup.items()
+        field_name = self._field_name(model, name)
+        instance = self._lookup(model, field_name, value)
+        if instance is None:
+            instance = model._default_manager.select_related(*select_related).get(**{field_name: value})
+            self.prime(instance)
+        self._attach_related(instance)
+        return instance
+
+    def get_or_404(self, model, select_related=(), **lookup):
+        try:
+            return self.get(model, select_related=select_related, **lookup)
+        except model.DoesNotExist:
+            raise Http404("No {} matches the given query.".format(model._meta.object_name))
+
+    def load_many(self, model, values, field="pk"):
+        """Return ``{value: instance}`` for ``values``, fetching every missing row in one query."""
+        field_name = self._field_name(model, field)
+        found = {}
+        missing = []
+        for value in values:
+            instance = self._lookup(model, field_name, value)
+            if instance is None:
+                missing.append(value)
+            else:
+                found[value] = instance
+        if missing:
+            for instance in model._default_manager.filter(**{field_name + "__in": missing}):
+                self.prime(instance)
+                found[getattr(instance, field_name)] = instance
+        return found
+
+    def load_related(self, instances, field_name):
+        """Fill the ``field_name`` foreign key on every instance with a single batched fetch."""
+        instances = list(instances)
+        if not instances:
+            return instances
+        field = instances[0]._meta.get_field(field_name)
+        values = {getattr(instance, field.attname) for instance in instances} - {None}
+        related = self.load_many(field.related_model, values, field.target_field.attname)
+        for instance in instances:
+            value = getattr(instance, field.attname)
+            if value in related:
+                field.set_cached_value(instance, related[value])
+        return instances
+
+
+def get_loader(request):
+    loader = getattr(request, "loader", None)
+    if loader is None:
+        loader = request.loader = Loader(request)
+    return loader
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from core import pagecache
+
+
+class Command(BaseCommand):
+    help = "Show hits, misses and bypasses (requests with cookies) of the anonymous page cache per view."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        stats = pagecache.stats()
+        if not stats:
+            self.stdout.write("No page cache traffic recorded yet.")
+            return
+        self.stdout.write(
+            "{:<24} {:>8} {:>8} {:>8} {:>9} {:>9}".format("view", "hit", "miss", "bypass", "hit rate", "of all")
+        )
+        for name, counts in stats.items():
+            hit, miss, bypass = counts[pagecache.HIT], counts[pagecache.MISS], counts[pagecache.BYPASS]
+            cacheable = hit + miss
+            total = cacheable + bypass
+            self.stdout.write(
+                "{:<24} {:>8} {:>8} {:>8} {:>9} {:>9}".format(
+                    name, hit, miss, bypass, percent(hit, cacheable), percent(hit, total)
+                )
+            )
+        if options["reset"]:
+            pagecache.reset()
+
+
+def percent(part, whole):
+    return "{:.1f}%".format(100 * part / whole) if whole else "-"
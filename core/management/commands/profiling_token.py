@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from core.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile header value that forces profiling of a request."
+
+    def handle(self, *args, **options):
+        self.stdout.write("X-Profile: {}".format(make_token()))
@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import STEPS
+
+# Runs in a fresh interpreter so nothing is already imported.
+CHILD = """
+import json, time
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter() - started
+from django.core.wsgi import get_wsgi_application
+from core.warmup import warm_up
+started = time.perf_counter()
+get_wsgi_application()
+application = time.perf_counter() - started
+steps = warm_up()
+print(json.dumps({"setup": setup, "application": application, "steps": steps}))
+"""
+
+
+def parse_importtime(stderr):
+    """``{module: (self_us, cumulative_us)}`` from ``python -X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Report import time per app module and the time of each warm-up step in a fresh process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10, help="Also list the slowest third-party packages.")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "mysite.settings"))
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+
+        # Own time per top-level package: every module's self time, so nothing is counted twice.
+        packages = defaultdict(lambda: [0, 0])
+        for name, (self_us, _) in modules.items():
+            package = packages[name.split(".")[0]]
+            package[0] += self_us
+            package[1] += 1
+        # Apps that live in this project, as opposed to django.contrib and third-party ones.
+        local = sorted(
+            {
+                config.name.split(".")[0]
+                for config in apps.get_app_configs()
+                if config.path.startswith(str(settings.BASE_DIR))
+            },
+            key=lambda name: -packages[name][0],
+        )
+
+        self.stdout.write("django.setup(): {:.1f} ms".format(report["setup"] * 1000))
+        self.stdout.write("get_wsgi_application(): {:.1f} ms".format(report["application"] * 1000))
+        self.stdout.write("Import time per app (own modules):")
+        for name in local:
+            self_us, count = packages[name]
+            self.stdout.write("  {:<16} {:8.1f} ms  {:3} modules".format(name, self_us / 1000, count))
+        others = sorted((name for name in packages if name not in local), key=lambda name: -packages[name][0])
+        self.stdout.write("Slowest other packages:")
+        for name in others[: options["top"]]:
+            self_us, count = packages[name]
+            self.stdout.write("  {:<16} {:8.1f} ms  {:3} modules".format(name, self_us / 1000, count))
+        self.stdout.write("Total imports: {:.1f} ms".format(sum(p[0] for p in packages.values()) / 1000))
+        self.stdout.write("Warm-up:")
+        for step, _ in STEPS:
+            if step not in report["steps"]:
+                self.stdout.write("  {:<16} failed (see the warm-up log)".format(step))
+                continue
+            count, seconds = report["steps"][step]
+            self.stdout.write("  {:<16} {:8.1f} ms  {:3} items".format(step, seconds * 1000, count))
@@ -0,0 +1,29 @@
+import asyncio
+
+from .loaders import Loader
+
+
+class LoaderMiddleware:
+    """Attach a fresh :class:`~core.loaders.Loader` to every request as ``request.loader``.
+
+    Works in both sync and async chains, so async views are not pushed onto a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Makes Django see this instance as a coroutine function (as MiddlewareMixin does).
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        request.loader = Loader(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.loader = Loader(request)
+        return await self.get_response(request)
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CapturedProfile",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("url_name", models.CharField(max_length=200)),
+                ("path", models.CharField(max_length=2000)),
+                ("method", models.CharField(max_length=10)),
+                ("status_code", models.PositiveSmallIntegerField()),
+                ("mode", models.CharField(max_length=16)),
+                ("duration_ms", models.FloatField()),
+                ("stats", models.BinaryField(blank=True)),
+                ("folded", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="capturedprofile",
+            index=models.Index(fields=["url_name", "-created_at"], name="profile_url_name_created"),
+        ),
+    ]
@@ -0,0 +1,11 @@
+from .loaders import get_loader
+
+
+class LoaderObjectMixin:
+    """Resolve ``get_object()`` through the request loader so permission checks and handlers share one fetch."""
+
+    select_related = ()
+
+    def get_object(self, queryset=None):
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        return get_loader(self.request).get_or_404(self.model, select_related=self.select_related, pk=pk)
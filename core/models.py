@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class CapturedProfile(models.Model):
+    url_name = models.CharField(max_length=200)
+    path = models.CharField(max_length=2000)
+    method = models.CharField(max_length=10)
+    status_code = models.PositiveSmallIntegerField()
+    mode = models.CharField(max_length=16)
+    duration_ms = models.FloatField()
+    stats = models.BinaryField(blank=True)
+    folded = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["url_name", "-created_at"], name="profile_url_name_created"),
+        ]
+
+    def __str__(self):
+        return "{} {:.1f}ms".format(self.url_name, self.duration_ms)
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .cache import namespace
+
+HIT, MISS, BYPASS = "hit", "miss", "bypass"
+STATS_KEY = "pagecache:stats:{}:{}"
+PAGES_KEY = "pagecache:pages"
+
+_pending = Counter()
+_pending_lock = threading.Lock()
+
+
+def record(name, outcome):
+    """Count an outcome locally and add the counts to the shared cache every PAGE_CACHE_STATS_FLUSH_EVERY events."""
+    with _pending_lock:
+        _pending[name, outcome] += 1
+        if sum(_pending.values()) < settings.PAGE_CACHE_STATS_FLUSH_EVERY:
+            return
+        pending = dict(_pending)
+        _pending.clear()
+    flush(pending)
+
+
+def flush(pending=None):
+    if pending is None:
+        with _pending_lock:
+            pending = dict(_pending)
+            _pending.clear()
+    for (name, outcome), count in pending.items():
+        # Read-modify-write rather than incr(), which would give the counter the default timeout.
+        # Concurrent flushes can lose a batch; the report is an approximation either way.
+        key = STATS_KEY.format(name, outcome)
+        cache.set(key, (cache.get(key) or 0) + count, None)
+    names = {name for name, _ in pending}
+    known = cache.get(PAGES_KEY) or set()
+    if not names <= known:
+        cache.set(PAGES_KEY, known | names, None)
+
+
+def stats():
+    """``{view name: {outcome: count}}`` as flushed by every process so far."""
+    return {
+        name: {outcome: cache.get(STATS_KEY.format(name, outcome)) or 0 for outcome in (HIT, MISS, BYPASS)}
+        for name in sorted(cache.get(PAGES_KEY) or ())
+    }
+
+
+def reset():
+    for name in cache.get(PAGES_KEY) or ():
+        cache.delete_many([STATS_KEY.format(name, outcome) for outcome in (HIT, MISS, BYPASS)])
+    cache.delete(PAGES_KEY)
+
+
+def is_cacheable(request):
+    # Anything carrying a cookie may be personalised (session, messages, CSRF) and is rendered fresh.
+    return request.method in ("GET", "HEAD") and not request.COOKIES
+
+
+def _bypass(response, name):
+    patch_vary_headers(response, ("Cookie",))
+    patch_cache_control(response, private=True)
+    response["X-Page-Cache"] = BYPASS
+    record(name, BYPASS)
+    return response
+
+
+def _hit(response, name):
+    response["X-Page-Cache"] = HIT
+    record(name, HIT)
+    return response
+
+
+def _store(page_cache, key, response, name):
+    patch_vary_headers(response, ("Cookie",))
+    if response.status_code == 200 and not response.cookies:
+        # Replaces never_cache and the like: the page is the same for every anonymous visitor.
+        for header in ("Cache-Control", "Expires"):
+            if header in response:
+                del response[header]
+        patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PAGE_CACHE_TIMEOUT)
+        page_cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+    response["X-Page-Cache"] = MISS
+    record(name, MISS)
+    return response
+
+
+def _is_rendered_later(response):
+    return hasattr(response, "render") and callable(response.render)
+
+
+def anonymous_page_cache(view_func):
+    """Serve ``view_func`` from a full-page cache to anonymous, cookie-less visitors.
+
+    Cached pages must not embed a CSRF token; use ``{% csrf_slot %}`` (core_tags),
+    which the browser fills from ``core:csrf`` after load. Responses are marked
+    ``Vary: Cookie`` and ``public, s-maxage`` so a reverse proxy can share them
+    between cookie-less visitors as well; everyone else gets ``private``.
+    ``view_func`` may be a coroutine function.
+    """
+
+    if asyncio.iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            name = request.resolver_match.view_name if request.resolver_match else request.path
+            if not is_cacheable(request):
+                return _bypass(await view_func(request, *args, **kwargs), name)
+            page_cache = namespace("pages")
+            key = request.get_full_path()
+            response = page_cache.get(key)
+            if response is not None:
+                return _hit(response, name)
+            request.page_cache_slot = True
+            response = await view_func(request, *args, **kwargs)
+            if _is_rendered_later(response):
+                await sync_to_async(response.render)()
+            return _store(page_cache, key, response, name)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        name = request.resolver_match.view_name if request.resolver_match else request.path
+        if not is_cacheable(request):
+            return _bypass(view_func(request, *args, **kwargs), name)
+        page_cache = namespace("pages")
+        key = request.get_full_path()
+        response = page_cache.get(key)
+        if response is not None:
+            return _hit(response, name)
+        request.page_cache_slot = True
+        response = view_func(request, *args, **kwargs)
+        if _is_rendered_later(response):
+            response.render()
+        return _store(page_cache, key, response, name)
+
+    return wrapper
@@ -0,0 +1,164 @@
+import asyncio
+import cProfile
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+
+from .models import CapturedProfile
+
+HEADER = "HTTP_X_PROFILE"
+SALT = "core.profiling"
+
+
+def make_token():
+    """Value for the ``X-Profile`` request header that forces a profile of that request."""
+    return signing.TimestampSigner(salt=SALT).sign("profile")
+
+
+def has_valid_token(request):
+    token = request.META.get(HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request):
+    return has_valid_token(request) or random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+class StackSampler:
+    """Low-overhead alternative to cProfile: samples one thread's stack on a timer.
+
+    The result is in "folded" format (``frame;frame;frame count`` per line), which
+    flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{}:{}".format(os.path.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return "\n".join("{} {}".format(stack, count) for stack, count in self.samples.most_common())
+
+
+def save(request, response, mode, duration, stats=b"", folded=""):
+    match = request.resolver_match
+    url_name = match.view_name if match else "unresolved"
+    profile = CapturedProfile.objects.create(
+        url_name=url_name,
+        path=request.get_full_path()[:2000],
+        method=request.method,
+        status_code=response.status_code,
+        mode=mode,
+        duration_ms=duration * 1000,
+        stats=stats,
+        folded=folded,
+    )
+    stale = CapturedProfile.objects.filter(url_name=url_name).order_by("-created_at")[
+        settings.PROFILING_KEEP_PER_URL :
+    ]
+    CapturedProfile.objects.filter(pk__in=list(stale.values_list("pk", flat=True))).delete()
+    return profile
+
+
+class Capture:
+    """One profile in progress: cProfile or the stack sampler, started on creation."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.started = time.perf_counter()
+        if mode == "sampling":
+            self.sampler = StackSampler(settings.PROFILING_SAMPLER_INTERVAL)
+            self.sampler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        if self.mode == "sampling":
+            self.sampler.stop()
+        else:
+            self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+
+    def save(self, request, response):
+        if self.mode == "sampling":
+            return save(request, response, self.mode, self.duration, folded=self.sampler.folded())
+        self.profiler.create_stats()
+        return save(request, response, self.mode, self.duration, stats=marshal.dumps(self.profiler.stats))
+
+
+class ProfilingMiddleware:
+    """Profile view dispatch and template rendering for sampled or explicitly requested requests.
+
+    A request is profiled when it carries a valid signed ``X-Profile`` header
+    (see ``manage.py profiling_token``) or falls within ``PROFILING_SAMPLE_RATE``.
+    In an async chain the profile covers the event loop thread, so it also picks
+    up whatever else the loop ran meanwhile.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Makes Django see this instance as a coroutine function (as MiddlewareMixin does).
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not should_profile(request):
+            return self.get_response(request)
+        capture = Capture(settings.PROFILING_MODE)
+        try:
+            response = self.get_response(request)
+        finally:
+            capture.stop()
+        capture.save(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not should_profile(request):
+            return await self.get_response(request)
+        capture = Capture(settings.PROFILING_MODE)
+        try:
+            response = await self.get_response(request)
+        finally:
+            capture.stop()
+        await sync_to_async(capture.save)(request, response)
+        return response
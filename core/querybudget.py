@@ -0,0 +1,79 @@
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BUDGETS_PATH = Path(__file__).with_name("query_budgets.json")
+
+# Literals that differ between otherwise identical queries.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def load_budgets():
+    with open(BUDGETS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def shape(sql):
+    """``sql`` with its literals replaced by ``?``, so the queries of an N+1 loop compare equal."""
+    return _LITERALS.sub("?", sql)
+
+
+def report(queries):
+    """Numbered SQL of ``queries``, with any statement that ran more than once listed first."""
+    repeated = [(count, sql) for sql, count in Counter(shape(query["sql"]) for query in queries).items() if count > 1]
+    lines = ["{}x {}".format(count, sql) for count, sql in sorted(repeated, reverse=True)]
+    if lines:
+        lines.insert(0, "Repeated:")
+        lines.append("All:")
+    lines += ["{:>3}. {}".format(i, query["sql"]) for i, query in enumerate(queries, start=1)]
+    return "\n".join(lines)
+
+
+class QueryBudgetMixin:
+    """TestCase helpers that check a page's query count against ``query_budgets.json``.
+
+    A page is rendered after seeding a small and then a larger dataset. It must
+    issue the same number of queries both times, and no more than its budget.
+    Caches are emptied before each request so both runs start equally cold.
+    """
+
+    sizes = (2, 10)
+
+    def measure(self, url, data=None):
+        for cache in caches.all(initialized_only=True):
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data)
+            if response.streaming:
+                # Streaming pages only run their queries as the body is read.
+                b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        return context.captured_queries
+
+    def assertQueriesDoNotScale(self, name, url, seed, data=None):
+        """``seed(size)`` must grow the rows ``url`` shows to ``size``; ``name`` is the key in the budgets file."""
+        budget = load_budgets()[name]
+        runs = []
+        for size in self.sizes:
+            seed(size)
+            runs.append((size, self.measure(url, data)))
+        (small, small_queries), (large, large_queries) = runs
+        self.assertEqual(
+            len(large_queries),
+            len(small_queries),
+            "{}: {} queries with {} rows but {} with {} rows\n{}".format(
+                name, len(small_queries), small, len(large_queries), large, report(large_queries)
+            ),
+        )
+        self.assertLessEqual(
+            len(large_queries),
+            budget,
+            "{}: {} queries, budget is {} ({})\n{}".format(
+                name, len(large_queries), budget, BUDGETS_PATH.name, report(large_queries)
+            ),
+        )
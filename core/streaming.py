@@ -0,0 +1,46 @@
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+from django.views.generic import ListView
+
+# Stands in for the rows while the page around them is rendered.
+ROWS = mark_safe("<!-- streaming rows -->")
+
+
+class StreamingListView(ListView):
+    """A ListView that sends its page while it is still reading the rows.
+
+    ``template_name`` renders the page with ``{{ rows }}`` where the list goes;
+    everything before it is sent before the query runs. ``rows_template_name``
+    renders ``object_list`` one chunk of ``chunk_size`` rows at a time, read
+    with ``.iterator()``, so neither the rows nor the HTML are ever held in full.
+    It is also rendered once with an empty ``object_list`` when there are no
+    rows, for a ``{% for %}...{% empty %}`` message. Pagination is not supported.
+    """
+
+    rows_template_name = None
+    chunk_size = 500
+
+    def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        context = self.get_context_data(rows=ROWS)
+        head, tail = render_to_string(self.get_template_names(), context, request).split(ROWS)
+        return StreamingHttpResponse(self.stream(head, tail), content_type=self.content_type)
+
+    def render_rows(self, rows):
+        return self.rows_template.render({"object_list": rows}, self.request)
+
+    def stream(self, head, tail):
+        yield head
+        self.rows_template = get_template(self.rows_template_name)
+        chunk = []
+        sent = False
+        for row in self.object_list.iterator(chunk_size=self.chunk_size):
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                yield self.render_rows(chunk)
+                chunk = []
+                sent = True
+        if chunk or not sent:
+            yield self.render_rows(chunk)
+        yield tail
@@ -0,0 +1,31 @@
+from django import template
+from django.template.defaulttags import CsrfTokenNode
+from django.urls import reverse
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def csrf_slot(context):
+    """``{% csrf_token %}`` for pages that may be served from the anonymous page cache.
+
+    On a cached render the hidden input is left empty and filled by a script that
+    fetches a token (and the CSRF cookie) from ``core:csrf``; otherwise this is
+    the usual token.
+    """
+    request = context.get("request")
+    if not getattr(request, "page_cache_slot", False):
+        return CsrfTokenNode().render(context)
+    html = format_html('<input type="hidden" name="csrfmiddlewaretoken" value="" data-csrf-slot>')
+    if context.render_context.get("csrf_slot_script"):
+        return html
+    context.render_context["csrf_slot_script"] = True
+    return html + format_html(
+        "<script>"
+        'fetch("{}", {{credentials: "same-origin"}}).then((response) => response.json()).then((data) => {{'
+        'document.querySelectorAll("[data-csrf-slot]").forEach((input) => {{ input.value = data.token; }});'
+        "}});"
+        "</script>",
+        reverse("core:csrf"),
+    )
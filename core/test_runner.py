@@ -0,0 +1,39 @@
+import shutil
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class CacheClearingMixin:
+    def startTest(self, test):
+        # Cached values would otherwise leak from one test into the next.
+        for cache in caches.all(initialized_only=True):
+            cache.clear()
+        super().startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    """Runs tests against a throwaway shared cache that is emptied before every test, hashing passwords inline."""
+
+    def get_resultclass(self):
+        base = super().get_resultclass() or unittest.TextTestResult
+        return type("CacheClearing" + base.__name__, (CacheClearingMixin, base), {})
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix="test-cache-")
+        shared = {**settings.CACHES["shared"], "LOCATION": self.cache_dir}
+        # Hash inline; the tests that exercise the process pool turn it on themselves.
+        self.cache_settings = override_settings(
+            CACHES={**settings.CACHES, "shared": shared}, PASSWORD_HASHING_WORKERS=0
+        )
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,323 @@
+import marshal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.http import Http404
+from django.template import engines
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import translation
+
+from accounts import hashers
+from tweets.models import TrendingTweet, Tweet
+
+from . import pagecache
+from .cache import Namespace, TieredCache
+from .loaders import Loader
+from .management.commands.startup_time import parse_importtime
+from .models import CapturedProfile
+from .profiling import make_token
+from .querybudget import QueryBudgetMixin, load_budgets, report, shape
+from .warmup import warm_up
+
+User = get_user_model()
+
+
+class TestLoader(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username="testuser1")
+        self.user2 = User.objects.create_user(username="testuser2")
+        self.tweets = [Tweet.objects.create(user=user, content="test") for user in (self.user1, self.user2)]
+        self.loader = Loader()
+
+    def test_same_row_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            user = self.loader.get(User, username="testuser1")
+            self.assertIs(self.loader.get(User, pk=self.user1.pk), user)
+            self.assertIs(self.loader.get(User, username="testuser1"), user)
+
+    def test_foreign_keys_are_filled_from_the_map(self):
+        self.loader.get(User, pk=self.user1.pk)
+        with self.assertNumQueries(1):
+            tweet = self.loader.get(Tweet, pk=self.tweets[0].pk)
+            self.assertEqual(tweet.user.username, "testuser1")
+
+    def test_select_related_objects_are_primed(self):
+        self.loader.get(Tweet, select_related=("user",), pk=self.tweets[1].pk)
+        with self.assertNumQueries(0):
+            self.loader.get(User, username="testuser2")
+
+    def test_load_related_batches(self):
+        tweets = list(Tweet.objects.all())
+        with self.assertNumQueries(1):
+            self.loader.load_related(tweets, "user")
+            self.assertEqual({tweet.user.username for tweet in tweets}, {"testuser1", "testuser2"})
+
+    def test_request_user_is_primed(self):
+        request = RequestFactory().get("/")
+        request.user = self.user1
+        loader = Loader(request)
+        with self.assertNumQueries(0):
+            self.assertIs(loader.get(User, username="testuser1"), self.user1)
+
+    def test_failure_get_or_404(self):
+        with self.assertRaises(Http404):
+            self.loader.get_or_404(User, username="nobody")
+
+    def test_failure_non_unique_lookup(self):
+        with self.assertRaises(ValueError):
+            self.loader.get(Tweet, content="test")
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_unprofiled_by_default(self):
+        self.client.get(reverse("tweets:home"))
+        self.assertFalse(CapturedProfile.objects.exists())
+
+    def test_signed_header_triggers_profile(self):
+        self.client.get(reverse("tweets:home"), HTTP_X_PROFILE=make_token())
+        profile = CapturedProfile.objects.get()
+        self.assertEqual(profile.url_name, "tweets:home")
+        self.assertEqual(profile.status_code, 200)
+        stats = marshal.loads(bytes(profile.stats))
+        self.assertTrue(any(func[2] == "render" for func in stats))
+
+    def test_forged_header_is_ignored(self):
+        self.client.get(reverse("tweets:home"), HTTP_X_PROFILE="profile:forged:signature")
+        self.assertFalse(CapturedProfile.objects.exists())
+
+    def test_sample_rate_and_sampling_mode(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MODE="sampling", PROFILING_SAMPLER_INTERVAL=0.0001):
+            self.client.get(reverse("tweets:home"))
+        profile = CapturedProfile.objects.get()
+        self.assertEqual(profile.mode, "sampling")
+
+    async def test_async_requests_are_profiled(self):
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get(reverse("tweets:new"), **{"X-Profile": make_token()})
+        self.assertEqual(response.status_code, 200)
+        profile = await CapturedProfile.objects.aget()
+        self.assertEqual(profile.url_name, "tweets:new")
+
+    def test_middleware_chain_stays_async(self):
+        # With DEBUG on, Django logs every sync middleware it has to wrap for an async handler.
+        with self.settings(DEBUG=True), self.assertNoLogs("django.request", "DEBUG"):
+            ASGIHandler()
+
+    def test_keeps_only_recent_profiles_per_url(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_KEEP_PER_URL=2):
+            for _ in range(4):
+                self.client.get(reverse("tweets:home"))
+        self.assertEqual(CapturedProfile.objects.filter(url_name="tweets:home").count(), 2)
+
+    def test_staff_can_list_and_download(self):
+        self.client.get(reverse("tweets:home"), HTTP_X_PROFILE=make_token())
+        profile = CapturedProfile.objects.get()
+        self.assertEqual(self.client.get(reverse("core:profile_list")).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("core:profile_list"))
+        self.assertContains(response, "tweets:home")
+        response = self.client.get(reverse("core:profile_download", kwargs={"pk": profile.pk, "format": "prof"}))
+        self.assertEqual(bytes(response.content), bytes(profile.stats))
+        response = self.client.get(reverse("core:profile_download", kwargs={"pk": profile.pk, "format": "txt"}))
+        self.assertContains(response, "function calls")
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0)
+class TestWarmup(TestCase):
+    def test_all_steps_run(self):
+        timings = warm_up()
+        self.assertEqual(list(timings), ["urls", "templates", "databases", "caches"])
+        self.assertGreater(timings["templates"][0], 0)
+
+    def test_leaves_no_pool_or_language_behind(self):
+        hashers.shutdown_pool()
+        with translation.override("en"), self.settings(PASSWORD_HASHING_WORKERS=1):
+            warm_up()
+            self.assertEqual(translation.get_language(), "en")
+        self.assertIsNone(hashers._pool)
+
+    def test_templates_are_cached(self):
+        warm_up()
+        loader = engines["django"].engine.template_loaders[0]
+        self.assertIn("tweets/home.html", {key.split("-")[0] for key in loader.get_template_cache})
+        with self.assertNumQueries(0):
+            ContentType.objects.get_for_model(Tweet)
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   tweets.models\n"
+            "import time:        30 |        150 | tweets\n"
+        )
+        self.assertEqual(parse_importtime(stderr), {"tweets.models": (120, 120), "tweets": (30, 150)})
+
+
+class TestTieredCache(TestCase):
+    def make_cache(self, location, **options):
+        return TieredCache(location, {"OPTIONS": {"SHARED": "shared", **options}})
+
+    def test_local_then_shared_then_miss(self):
+        cache = self.make_cache("test-tiers")
+        cache.set("key", {"a": 1})
+        self.assertEqual(cache.get("key"), {"a": 1})
+        cache.local.clear()
+        self.assertEqual(cache.get("key"), {"a": 1})
+        self.assertEqual(cache.get("key"), {"a": 1})
+        cache.delete("key")
+        self.assertIsNone(cache.get("key"))
+        stats = cache.stats()
+        self.assertEqual((stats["local_hits"], stats["shared_hits"], stats["misses"]), (2, 1, 1))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = self.make_cache("test-lru", LOCAL_MAX_ENTRIES=2, LOCAL_TIMEOUT=60)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+        self.assertEqual(list(cache.local.entries), [cache.make_key("b"), cache.make_key("c")])
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache.local.ttl = 0
+        cache.set("d", "d")
+        self.assertNotIn(cache.make_key("d"), cache.local.entries)
+        self.assertEqual(cache.get("d"), "d")
+
+    def test_namespace_invalidation_reaches_other_processes(self):
+        cache = self.make_cache("test-ns-1")
+        other = self.make_cache("test-ns-2", LOCAL_TIMEOUT=0)
+        namespace = Namespace(cache, "things")
+        namespace.set(1, "old")
+        self.assertEqual(Namespace(other, "things").get(1), "old")
+        namespace.invalidate()
+        self.assertIsNone(namespace.get(1))
+        self.assertIsNone(Namespace(other, "things").get(1))
+
+    def test_get_or_set_computes_once(self):
+        cache = self.make_cache("test-flight")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return None
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: cache.get_or_set("key", compute), range(8)))
+        self.assertEqual(results, [None] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["computes"], 1)
+
+    def test_stats_view(self):
+        User.objects.create_user(username="staff", password="testpassword", is_staff=True)
+        self.client.login(username="staff", password="testpassword")
+        response = self.client.get(reverse("core:cache_stats"))
+        self.assertIn("local_entries", response.json()["default"])
+
+
+class TestPageCache(TestCase):
+    def setUp(self):
+        # Drop counts other tests left in this process's unflushed buffer.
+        pagecache.flush()
+        pagecache.reset()
+
+    def test_anonymous_pages_are_cached(self):
+        for name in ("welcome:welcome", "accounts:login", "accounts:signup"):
+            url = reverse(name)
+            self.assertEqual(self.client.get(url)["X-Page-Cache"], "miss")
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response["X-Page-Cache"], "hit", name)
+            self.assertIn("Cookie", response["Vary"])
+            self.assertIn("s-maxage", response["Cache-Control"])
+            self.assertIn("public", response["Cache-Control"])
+            self.assertFalse(response.cookies)
+
+    def test_forms_get_the_token_separately(self):
+        client = Client(enforce_csrf_checks=True)
+        User.objects.create_user(username="testuser", password="testpassword")
+        response = client.get(reverse("accounts:login"))
+        self.assertContains(response, "data-csrf-slot")
+        self.assertNotIn("csrftoken", response.cookies)
+        token = client.get(reverse("core:csrf")).json()["token"]
+        response = client.post(
+            reverse("accounts:login"),
+            {"username": "testuser", "password": "testpassword", "csrfmiddlewaretoken": token},
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_requests_with_cookies_bypass_the_cache(self):
+        self.client.get(reverse("accounts:login"))
+        self.client.cookies["csrftoken"] = "x" * 32
+        response = self.client.get(reverse("accounts:login"))
+        self.assertEqual(response["X-Page-Cache"], "bypass")
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotContains(response, "data-csrf-slot")
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value="')
+
+    def test_report(self):
+        url = reverse("welcome:welcome")
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url)
+        pagecache.flush()
+        self.assertEqual(pagecache.stats()["welcome:welcome"], {"hit": 2, "miss": 1, "bypass": 0})
+        out = StringIO()
+        call_command("page_cache_report", "--reset", stdout=out)
+        self.assertIn("66.7%", out.getvalue())
+        self.assertEqual(pagecache.stats(), {})
+
+
+class TestQueryBudget(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        self.client.force_login(self.user)
+
+    def seed(self, size):
+        for i in range(Tweet.objects.count(), size):
+            author = User.objects.create_user(username="author{}".format(i))
+            tweet = Tweet.objects.create(user=author, content="tweet")
+            TrendingTweet.objects.create(rank=i + 1, tweet=tweet, score=1, refreshed_at=tweet.created_at)
+
+    def test_shape_and_report(self):
+        self.assertEqual(
+            shape("SELECT * FROM t WHERE id = 12 AND name = 'it''s'"), "SELECT * FROM t WHERE id = ? AND name = ?"
+        )
+        queries = [{"sql": "SELECT 1 FROM t WHERE id = {}".format(i)} for i in (1, 2)] + [{"sql": "SELECT 2"}]
+        self.assertEqual(
+            report(queries).splitlines(),
+            [
+                "Repeated:",
+                "2x SELECT ? FROM t WHERE id = ?",
+                "All:",
+                "  1. SELECT 1 FROM t WHERE id = 1",
+                "  2. SELECT 1 FROM t WHERE id = 2",
+                "  3. SELECT 2",
+            ],
+        )
+
+    def test_budgets_are_positive(self):
+        for name, budget in load_budgets().items():
+            self.assertIsInstance(budget, int, name)
+            self.assertGreater(budget, 0, name)
+
+    def test_n_plus_one_is_reported(self):
+        # Without select_related every trending row loads its tweet and author separately.
+        with patch.object(QuerySet, "select_related", lambda self, *fields: self):
+            with self.assertRaisesRegex(AssertionError, r"(?s)queries with 2 rows but \d+ with 10 rows.*Repeated:"):
+                self.assertQueriesDoNotScale("tweets:trending", reverse("tweets:trending"), self.seed)
+
+    def test_over_budget_is_reported(self):
+        with patch("core.querybudget.load_budgets", return_value={"tweets:trending": 1}):
+            with self.assertRaisesRegex(AssertionError, "budget is 1"):
+                self.assertQueriesDoNotScale("tweets:trending", reverse("tweets:trending"), self.seed)
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = "core"
+
+urlpatterns = [
+    path("csrf/", views.CsrfTokenView.as_view(), name="csrf"),
+    path("cache/", views.CacheStatsView.as_view(), name="cache_stats"),
+    path("profiles/", views.ProfileListView.as_view(), name="profile_list"),
+    path("profiles/<int:pk>.<str:format>", views.ProfileDownloadView.as_view(), name="profile_download"),
+]
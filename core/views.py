@@ -0,0 +1,77 @@
+import marshal
+import pstats
+from io import StringIO
+
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404
+from django.utils.cache import add_never_cache_headers
+from django.views.generic import ListView, View
+
+from .models import CapturedProfile
+
+
+class StaffRequiredMixin(UserPassesTestMixin):
+    def test_func(self):
+        return self.request.user.is_staff
+
+
+class CacheStatsView(StaffRequiredMixin, View):
+    """Hit/miss/eviction counters of the tiered caches in the process serving the request."""
+
+    def get(self, request, *args, **kwargs):
+        stats = {alias: caches[alias].stats() for alias in caches if hasattr(caches[alias], "stats")}
+        return JsonResponse(stats)
+
+
+class CsrfTokenView(View):
+    """CSRF token (and cookie) for forms on pages served from the anonymous page cache."""
+
+    def get(self, request, *args, **kwargs):
+        response = JsonResponse({"token": get_token(request)})
+        add_never_cache_headers(response)
+        return response
+
+
+class ProfileListView(StaffRequiredMixin, ListView):
+    template_name = "core/profile_list.html"
+    context_object_name = "profiles"
+    paginate_by = 50
+
+    def get_queryset(self):
+        queryset = CapturedProfile.objects.defer("stats", "folded").order_by("-created_at")
+        if url_name := self.request.GET.get("url_name"):
+            queryset = queryset.filter(url_name=url_name)
+        return queryset
+
+
+class ProfileDownloadView(StaffRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        profile = get_object_or_404(CapturedProfile, pk=self.kwargs["pk"])
+        name = "{}-{}".format(profile.url_name.replace(":", "_"), profile.pk)
+        fmt = self.kwargs["format"]
+        if fmt == "prof" and profile.stats:
+            response = HttpResponse(bytes(profile.stats), content_type="application/octet-stream")
+        elif fmt == "folded" and profile.folded:
+            response = HttpResponse(profile.folded, content_type="text/plain; charset=utf-8")
+        elif fmt == "txt" and profile.stats:
+            stream = StringIO()
+            stats = pstats.Stats(_MarshalledStats(profile.stats), stream=stream)
+            stats.sort_stats("cumulative").print_stats(50)
+            return HttpResponse(stream.getvalue(), content_type="text/plain; charset=utf-8")
+        else:
+            return HttpResponse(status=404)
+        response["Content-Disposition"] = 'attachment; filename="{}.{}"'.format(name, fmt)
+        return response
+
+
+class _MarshalledStats:
+    """Adapter so ``pstats.Stats`` can load stats kept in the database instead of a file."""
+
+    def __init__(self, data):
+        self.stats = marshal.loads(bytes(data))
+
+    def create_stats(self):
+        pass
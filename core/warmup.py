@@ -0,0 +1,103 @@
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def load_urls():
+    resolver = get_resolver()
+    # Imports every URLconf and view module and builds the reverse() lookup tables.
+    with translation.override(settings.LANGUAGE_CODE):
+        resolver._populate()
+    return len(resolver.reverse_dict) + sum(len(ns.reverse_dict) for _, ns in resolver.namespace_dict.values())
+
+
+def template_names(engine):
+    dirs = list(engine.dirs)
+    if engine.app_dirs or any("app_directories" in str(loader) for loader in engine.loaders):
+        dirs.extend(get_app_template_dirs("templates"))
+    names = set()
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith((".html", ".txt")):
+                    names.add(os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, "/"))
+    return sorted(names)
+
+
+def compile_templates():
+    """Compile every template once; the cached loader keeps the result for the life of the process."""
+    compiled = 0
+    for engine in engines.all():
+        inner = getattr(engine, "engine", None)
+        if inner is None:
+            continue
+        for name in template_names(inner):
+            inner.get_template(name)
+            compiled += 1
+    return compiled
+
+
+def connect_databases():
+    # Imports the backends and checks the databases are reachable; warm_up() closes the connections again.
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return len(connections.all())
+
+
+def close_connections():
+    """Close what warm-up opened, so a preloading server (gunicorn ``--preload``) never forks shared sockets."""
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def prime_caches():
+    # Content types are looked up when scheduling purges; hashers on every login. The password hashing
+    # pool is left alone: this may run in a master process that forks the workers afterwards, so each
+    # worker starts its own on its first request (accounts.signals.start_hashing_pool).
+    ContentType.objects.get_for_models(*apps.get_models())
+    return len(get_hashers())
+
+
+STEPS = [
+    ("urls", load_urls),
+    ("templates", compile_templates),
+    ("databases", connect_databases),
+    ("caches", prime_caches),
+]
+
+
+def warm_up():
+    """Pay the first-request costs before the worker takes traffic.
+
+    Returns ``{step: (count, seconds)}``. A failing step is logged and skipped so a
+    warm-up problem never keeps the worker from starting.
+    """
+    timings = {}
+    try:
+        for name, step in STEPS:
+            started = time.perf_counter()
+            try:
+                count = step()
+            except Exception:
+                logger.exception("warm-up step %s failed", name)
+                continue
+            timings[name] = (count, time.perf_counter() - started)
+    finally:
+        close_connections()
+    logger.info(
+        "warm-up done: %s", ", ".join("{} {} in {:.1f} ms".format(n, c, s * 1000) for n, (c, s) in timings.items())
+    )
+    return timings
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
 
 application = get_asgi_application()
+
+# Pay URL, template, connection and cache setup here rather than on the first requests.
+if settings.WARMUP_ON_STARTUP:
+    from core.warmup import warm_up
+
+    warm_up()
@@ -37,9 +37,14 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "core.apps.CoreConfig",
     "accounts.apps.AccountsConfig",
     "tweets.apps.TweetsConfig",
     "welcome.apps.WelcomeConfig",
+    "taskqueue.apps.TaskqueueConfig",
+    "notifications.apps.NotificationsConfig",
+    "outbox.apps.OutboxConfig",
+    "stats.apps.StatsConfig",
 ]
 
 MIDDLEWARE = [
@@ -48,8 +53,10 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.LoaderMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "mysite.urls"
@@ -58,8 +65,17 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compiled templates are kept per process (and reloaded by runserver when files change).
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -72,6 +88,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "mysite.wsgi.application"
 
+# Run core.warmup.warm_up() when wsgi.py / asgi.py load the application.
+WARMUP_ON_STARTUP = True
+
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
@@ -103,6 +122,22 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing runs in a bounded process pool (accounts/hashers.py); 0 hashes inline.
+# Django's own PBKDF2PasswordHasher is left out because it uses the same algorithm name.
+# PASSWORD_HASHING_WORKERS is per web process: a host runs (server workers x this) hashing
+# processes, so size it as the cores set aside for hashing divided by the server workers.
+
+PASSWORD_HASHERS = [
+    "accounts.hashers.OffloadedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+PASSWORD_HASHING_WORKERS = 1
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
 
@@ -130,3 +165,127 @@ AUTH_USER_MODEL = "accounts.User"
 LOGIN_URL = "accounts:login"
 LOGIN_REDIRECT_URL = "tweets:home"
 LOGOUT_REDIRECT_URL = "accounts:login"
+
+# Background tasks (see taskqueue/)
+
+TASKQUEUE_CONCURRENCY = 4
+TASKQUEUE_POLL_INTERVAL = 1.0
+TASKQUEUE_LOCK_TIMEOUT = 300
+TASKQUEUE_RETRY_BACKOFF = 2
+TASKQUEUE_MAX_BACKOFF = 3600
+# Succeeded and failed tasks are deleted this long after they finish (manage.py purge_tasks --schedule).
+# Their idempotency keys are released with them, so keep this longer than any key is reused.
+TASKQUEUE_RETENTION = 60 * 60 * 24 * 7
+TASKQUEUE_PURGE_INTERVAL = 60 * 60
+
+# Mutes and blocks (see accounts/exclusions.py); the cached lists are dropped whenever they change.
+
+EXCLUSIONS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Bulk follow import (accounts:bulk_follow)
+
+BULK_FOLLOW_MAX = 1000
+
+# Bulk tweet API
+
+TWEET_BULK_CREATE_MAX = 100
+TWEET_IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Replies (see Tweet.path)
+
+TWEET_REPLY_MAX_DEPTH = 20
+TWEET_THREAD_PAGE_SIZE = 50
+
+# Home timeline (see tweets/timeline.py)
+
+TIMELINE_PAGE_SIZE = 50
+# Extra batches read to refill a page that lost rows to mutes and blocks.
+TIMELINE_MAX_REFILLS = 3
+
+# Ranked home timeline, ?mode=ranked (see tweets/ranking.py)
+
+RANKING_CANDIDATES = 2000
+RANKING_WINDOW_SECONDS = 60 * 60 * 24 * 2
+RANKING_SIZE = 500
+RANKING_HALF_LIFE_SECONDS = 60 * 60 * 6
+RANKING_LIKE_WEIGHT = 1.0
+RANKING_RETWEET_WEIGHT = 1.5
+RANKING_AFFINITY_WEIGHT = 0.5
+RANKING_FOLLOW_BONUS = 1.0
+RANKING_CACHE_TIMEOUT = 60
+
+# "New tweets since" polling (tweets:new)
+
+NEW_TWEETS_MAX_IDS = 100
+NEW_TWEETS_LONG_POLL_TIMEOUT = 25
+NEW_TWEETS_POLL_INTERVAL = 1.0
+
+# Near-duplicate tweet detection (see tweets/duplicates.py)
+
+NEAR_DUPLICATE_MAX_DISTANCE = 5
+NEAR_DUPLICATE_WINDOW_SECONDS = 60 * 60
+NEAR_DUPLICATE_MAX_COPIES = 3
+NEAR_DUPLICATE_MIN_LENGTH = 20
+NEAR_DUPLICATE_MAX_CANDIDATES = 500
+
+# Trending leaderboard
+
+TRENDING_SIZE = 50
+TRENDING_BUCKET_SECONDS = 60 * 5
+TRENDING_WINDOW_SECONDS = 60 * 60
+TRENDING_HALF_LIFE_SECONDS = 60 * 15
+TRENDING_REFRESH_SECONDS = 60
+
+# Background purge of deleted tweets and accounts
+
+PURGE_BATCH_SIZE = 1000
+
+# Request profiling (see core/profiling.py)
+
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_MODE = "cprofile"
+PROFILING_SAMPLER_INTERVAL = 0.001
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_KEEP_PER_URL = 20
+
+
+# Caches (see core/cache.py): a per-process LRU in front of a cache shared by every process.
+# The file-based backend stands in for memcached/Redis in development.
+
+CACHES = {
+    "default": {
+        "BACKEND": "core.cache.TieredCache",
+        "LOCATION": "default",
+        "OPTIONS": {
+            "SHARED": "shared",
+            "LOCAL_MAX_ENTRIES": 1000,
+            "LOCAL_TIMEOUT": 5,
+            "LEASE_TIMEOUT": 10,
+        },
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "var" / "cache",
+    },
+}
+
+TEST_RUNNER = "core.test_runner.TestRunner"
+
+# Username -> user lookups for the account pages (accounts/services.py); unknown names are cached briefly.
+USERNAME_CACHE_TIMEOUT = 60 * 60
+USERNAME_NEGATIVE_CACHE_TIMEOUT = 60
+
+# Full-page cache for anonymous, cookie-less visitors (core/pagecache.py)
+
+PAGE_CACHE_TIMEOUT = 60 * 5
+PAGE_CACHE_STATS_FLUSH_EVERY = 20
+
+# Change-data outbox (see outbox/)
+
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_SETTLE_SECONDS = 2
+
+# Daily per-user stats rolled up from the outbox (see stats/)
+
+STATS_DAYS = 30
+STATS_ROLLUP_INTERVAL = 60
@@ -18,7 +18,11 @@ from django.urls import include, path
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("_core/", include("core.urls")),
     path("accounts/", include("accounts.urls")),
     path("tweets/", include("tweets.urls")),
+    path("notifications/", include("notifications.urls")),
+    path("outbox/", include("outbox.urls")),
+    path("stats/", include("stats.urls")),
     path("", include("welcome.urls")),
 ]
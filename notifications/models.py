@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+from accounts.models import User
+from tweets.models import Tweet
+
+
+class Notification(models.Model):
+    """One row per unread (recipient, verb, target) group, updated in place as events arrive."""
+
+    class Verb(models.TextChoices):
+        LIKE = "like"
+        FOLLOW = "follow"
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
+    verb = models.CharField(max_length=16, choices=Verb.choices)
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    group_key = models.CharField(max_length=64)
+    actor_count = models.PositiveIntegerField(default=0)
+    recent_actors = models.JSONField(default=list, blank=True)
+    is_read = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipient", "group_key"],
+                condition=models.Q(is_read=False),
+                name="unique_unread_notification_group",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["recipient", "-updated_at", "-id"], name="notification_inbox"),
+        ]
+
+    def __str__(self):
+        return "{} {} {}".format(self.recipient, self.verb, self.actor_count)
+
+    @property
+    def summary(self):
+        names = "、".join(actor["username"] for actor in self.recent_actors[:2])
+        others = self.actor_count - min(len(self.recent_actors), 2)
+        if others > 0:
+            names = "{}と他{}人".format(names, others)
+        if self.verb == self.Verb.LIKE:
+            return "{}があなたのツイートにいいねしました".format(names)
+        return "{}があなたをフォローしました".format(names)
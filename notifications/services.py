@@ -0,0 +1,99 @@
+import base64
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification
+
+RECENT_ACTORS = 3
+UNREAD_COUNT_KEY = "notifications:unread:{}"
+
+
+def group_key(verb, tweet_id=None):
+    if verb == Notification.Verb.LIKE:
+        return "like:{}".format(tweet_id)
+    return verb
+
+
+def record(recipient_id, verb, actor_id, actor_username, tweet_id=None):
+    """Fold one like/follow event into the recipient's unread group for it."""
+    if recipient_id == actor_id:
+        return None
+    key = group_key(verb, tweet_id)
+    actor = {"id": actor_id, "username": actor_username}
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                notification = (
+                    Notification.objects.select_for_update()
+                    .filter(recipient_id=recipient_id, group_key=key, is_read=False)
+                    .first()
+                )
+                if notification is None:
+                    notification = Notification.objects.create(
+                        recipient_id=recipient_id,
+                        verb=verb,
+                        tweet_id=tweet_id,
+                        group_key=key,
+                        actor_count=1,
+                        recent_actors=[actor],
+                    )
+                    created = True
+                else:
+                    created = False
+                    recent = [a for a in notification.recent_actors if a["id"] != actor_id]
+                    if len(recent) == len(notification.recent_actors):
+                        notification.actor_count += 1
+                    notification.recent_actors = [actor] + recent[: RECENT_ACTORS - 1]
+                    notification.updated_at = timezone.now()
+                    notification.save(update_fields=["actor_count", "recent_actors", "updated_at"])
+        except IntegrityError:
+            # Another worker created the group first; fold into it on the retry.
+            continue
+        if created:
+            cache.delete(UNREAD_COUNT_KEY.format(recipient_id))
+        return notification
+    return None
+
+
+def unread_count(user_id):
+    key = UNREAD_COUNT_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.set(key, count)
+    return count
+
+
+def mark_all_read(user_id):
+    updated = Notification.objects.filter(recipient_id=user_id, is_read=False).update(is_read=True)
+    cache.set(UNREAD_COUNT_KEY.format(user_id), 0)
+    return updated
+
+
+def encode_cursor(notification):
+    raw = "{}|{}".format(notification.updated_at.isoformat(), notification.pk)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        updated_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(updated_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def inbox_page(user_id, cursor=None, page_size=20):
+    """Return ``(notifications, next_cursor)`` using keyset pagination on (updated_at, id)."""
+    queryset = Notification.objects.filter(recipient_id=user_id).select_related("tweet")
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        updated_at, pk = position
+        queryset = queryset.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, pk__lt=pk))
+    rows = list(queryset.order_by("-updated_at", "-id")[: page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
@@ -0,0 +1,8 @@
+from taskqueue.registry import task
+
+from . import services
+
+
+@task(name="notifications.record")
+def record_notification(recipient_id, verb, actor_id, actor_username, tweet_id=None):
+    services.record(recipient_id, verb, actor_id, actor_username, tweet_id=tweet_id)
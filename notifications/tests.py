@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import FriendShip
+from taskqueue.worker import run_pending
+from tweets.models import Tweet
+
+from . import services
+from .models import Notification
+
+User = get_user_model()
+
+
+class TestRecord(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.tweet = Tweet.objects.create(user=self.author, content="hello")
+        self.fans = [User.objects.create_user(username="fan{}".format(i)) for i in range(5)]
+
+    def like(self, fan):
+        return services.record(self.author.pk, Notification.Verb.LIKE, fan.pk, fan.username, tweet_id=self.tweet.pk)
+
+    def test_likes_are_grouped_into_one_row(self):
+        for fan in self.fans:
+            self.like(fan)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual([a["username"] for a in notification.recent_actors], ["fan4", "fan3", "fan2"])
+        self.assertEqual(notification.summary, "fan4、fan3と他3人があなたのツイートにいいねしました")
+
+    def test_repeated_actor_is_not_counted_twice(self):
+        self.like(self.fans[0])
+        self.like(self.fans[0])
+        self.assertEqual(Notification.objects.get().actor_count, 1)
+
+    def test_own_action_is_ignored(self):
+        services.record(self.author.pk, Notification.Verb.LIKE, self.author.pk, "author", tweet_id=self.tweet.pk)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_read_group_starts_a_new_one(self):
+        self.like(self.fans[0])
+        services.mark_all_read(self.author.pk)
+        self.like(self.fans[1])
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(services.unread_count(self.author.pk), 1)
+
+    def test_unread_count_is_cached(self):
+        self.like(self.fans[0])
+        self.assertEqual(services.unread_count(self.author.pk), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(services.unread_count(self.author.pk), 1)
+
+    def test_inbox_cursor_pagination(self):
+        tweets = [Tweet.objects.create(user=self.author, content=str(i)) for i in range(5)]
+        for tweet in tweets:
+            services.record(self.author.pk, Notification.Verb.LIKE, self.fans[0].pk, "fan0", tweet_id=tweet.pk)
+        first, cursor = services.inbox_page(self.author.pk, page_size=3)
+        second, last_cursor = services.inbox_page(self.author.pk, cursor, page_size=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(last_cursor)
+        self.assertEqual({n.tweet_id for n in first + second}, {t.pk for t in tweets})
+
+
+class TestNotificationViews(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username="testuser1", password="testpassword")
+        self.user2 = User.objects.create_user(username="testuser2", password="testpassword")
+        self.client.login(username="testuser1", password="testpassword")
+
+    def test_like_and_follow_are_notified(self):
+        tweet = Tweet.objects.create(user=self.user2, content="hello")
+        self.client.post(reverse("tweets:like", kwargs={"pk": tweet.pk}))
+        self.client.post(reverse("accounts:follow", kwargs={"username": self.user2.username}))
+        run_pending()
+        self.assertEqual(
+            set(Notification.objects.filter(recipient=self.user2).values_list("verb", flat=True)),
+            {Notification.Verb.LIKE, Notification.Verb.FOLLOW},
+        )
+
+    def test_success_get_inbox(self):
+        FriendShip.objects.create(follower=self.user2, following=self.user1)
+        services.record(self.user1.pk, Notification.Verb.FOLLOW, self.user2.pk, self.user2.username)
+        response = self.client.get(reverse("notifications:inbox"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "testuser2があなたをフォローしました")
+
+    def test_unread_count_and_mark_read(self):
+        services.record(self.user1.pk, Notification.Verb.FOLLOW, self.user2.pk, self.user2.username)
+        response = self.client.get(reverse("notifications:unread_count"))
+        self.assertEqual(response.json(), {"unread_count": 1})
+        self.client.post(reverse("notifications:mark_read"))
+        response = self.client.get(reverse("notifications:unread_count"))
+        self.assertEqual(response.json(), {"unread_count": 0})
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = "notifications"
+
+urlpatterns = [
+    path("", views.InboxView.as_view(), name="inbox"),
+    path("unread_count/", views.UnreadCountView.as_view(), name="unread_count"),
+    path("mark_read/", views.MarkReadView.as_view(), name="mark_read"),
+]
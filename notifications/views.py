@@ -0,0 +1,28 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.views.generic import TemplateView, View
+
+from . import services
+
+
+class InboxView(LoginRequiredMixin, TemplateView):
+    template_name = "notifications/inbox.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        notifications, next_cursor = services.inbox_page(self.request.user.pk, self.request.GET.get("cursor"))
+        context["notification_list"] = notifications
+        context["next_cursor"] = next_cursor
+        return context
+
+
+class UnreadCountView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({"unread_count": services.unread_count(request.user.pk)})
+
+
+class MarkReadView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        services.mark_all_read(request.user.pk)
+        return redirect("notifications:inbox")
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from core.admin import LargeTableAdmin
+
+from .models import OutboxConsumer, OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdmin):
+    list_display = ("id", "event_type", "created_at")
+
+
+@admin.register(OutboxConsumer)
+class OutboxConsumerAdmin(admin.ModelAdmin):
+    list_display = ("name", "position", "updated_at")
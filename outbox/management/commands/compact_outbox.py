@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from outbox import services
+
+
+class Command(BaseCommand):
+    help = "Delete outbox events that every registered consumer has already read."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        deleted = services.compact(options["batch_size"])
+        self.stdout.write("Deleted {} events.".format(deleted))
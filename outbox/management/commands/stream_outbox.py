@@ -0,0 +1,36 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from outbox import services
+
+
+class Command(BaseCommand):
+    help = "Write outbox events as JSON lines, in batches, from where the consumer left off."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumer", default="stream")
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument("--follow", action="store_true", help="Keep polling for new events.")
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument("--compact", action="store_true", help="Delete events every consumer has read.")
+
+    def handle(self, *args, **options):
+        consumer = options["consumer"]
+        position = services.position(consumer)
+        while True:
+            events = services.tail(position, options["batch_size"])
+            for event in events:
+                self.stdout.write(json.dumps(event.as_dict(), ensure_ascii=False))
+            if events:
+                position = events[-1].pk
+                # Acknowledged only after the whole batch is written: a crash replays it rather than losing it.
+                services.ack(consumer, position)
+                if options["compact"]:
+                    services.compact()
+                continue
+            if not options["follow"]:
+                break
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("outbox", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="outboxevent",
+            name="event_type",
+            field=models.CharField(
+                choices=[
+                    ("tweet.created", "Tweet Created"),
+                    ("tweet.deleted", "Tweet Deleted"),
+                    ("like.created", "Like Created"),
+                    ("like.deleted", "Like Deleted"),
+                    ("retweet.created", "Retweet Created"),
+                    ("retweet.deleted", "Retweet Deleted"),
+                    ("follow.created", "Follow Created"),
+                    ("follow.deleted", "Follow Deleted"),
+                    ("user.deleted", "User Deleted"),
+                ],
+                max_length=32,
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """One change, written in the same transaction as the change itself; ``id`` is the stream position."""
+
+    class Type(models.TextChoices):
+        TWEET_CREATED = "tweet.created"
+        TWEET_DELETED = "tweet.deleted"
+        LIKE_CREATED = "like.created"
+        LIKE_DELETED = "like.deleted"
+        RETWEET_CREATED = "retweet.created"
+        RETWEET_DELETED = "retweet.deleted"
+        FOLLOW_CREATED = "follow.created"
+        FOLLOW_DELETED = "follow.deleted"
+        USER_DELETED = "user.deleted"
+
+    event_type = models.CharField(max_length=32, choices=Type.choices)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "{} {}".format(self.pk, self.event_type)
+
+    def as_dict(self):
+        return {
+            "id": self.pk,
+            "type": self.event_type,
+            "payload": self.payload,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class OutboxConsumer(models.Model):
+    """Position of a downstream reader; events at or below every consumer's position can be compacted."""
+
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "{} @ {}".format(self.name, self.position)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import OutboxConsumer, OutboxEvent
+
+Type = OutboxEvent.Type
+
+
+def emit(event_type, **payload):
+    """Append an event; call inside the transaction that makes the change so both commit or neither does."""
+    return OutboxEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def emit_many(event_type, payloads):
+    return OutboxEvent.objects.bulk_create([OutboxEvent(event_type=event_type, payload=p) for p in payloads])
+
+
+def tail(after=0, limit=None):
+    """Events with ``id > after`` in stream order.
+
+    Events younger than OUTBOX_SETTLE_SECONDS are held back: ids are assigned at
+    insert, so a slower transaction can still commit a lower id than one already
+    visible, and a reader that moved past it would never see it.
+    """
+    limit = min(limit or settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_BATCH_SIZE)
+    settled = timezone.now() - timedelta(seconds=settings.OUTBOX_SETTLE_SECONDS)
+    return list(OutboxEvent.objects.filter(pk__gt=after, created_at__lte=settled).order_by("pk")[:limit])
+
+
+def position(consumer):
+    return OutboxConsumer.objects.get_or_create(name=consumer)[0].position
+
+
+def ack(consumer, position):
+    """Move ``consumer`` forward to ``position``; never backwards."""
+    OutboxConsumer.objects.get_or_create(name=consumer)
+    return OutboxConsumer.objects.filter(name=consumer, position__lt=position).update(
+        position=position, updated_at=timezone.now()
+    )
+
+
+def compact(batch_size=None):
+    """Delete events every consumer has read, in batches; returns the number deleted."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    floor = OutboxConsumer.objects.aggregate(floor=Min("position"))["floor"]
+    if not floor:
+        return 0
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(
+                OutboxEvent.objects.filter(pk__lte=floor).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                return deleted
+            deleted += OutboxEvent.objects.filter(pk__in=pks).delete()[0]
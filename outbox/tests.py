@@ -0,0 +1,113 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tweets.models import Tweet
+
+from . import services
+from .models import OutboxConsumer, OutboxEvent
+
+User = get_user_model()
+
+
+@override_settings(OUTBOX_SETTLE_SECONDS=0)
+class TestOutboxWrites(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.other = User.objects.create_user(username="otheruser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+
+    def types(self):
+        return list(OutboxEvent.objects.order_by("pk").values_list("event_type", flat=True))
+
+    def test_every_write_path_emits_an_event(self):
+        self.client.post(reverse("tweets:create"), {"content": "hello"})
+        tweet = Tweet.objects.get()
+        self.client.post(reverse("tweets:like", kwargs={"pk": tweet.pk}))
+        self.client.post(reverse("tweets:unlike", kwargs={"pk": tweet.pk}))
+        self.client.post(reverse("tweets:unlike", kwargs={"pk": tweet.pk}))
+        self.client.post(reverse("accounts:follow", kwargs={"username": "otheruser"}))
+        self.client.post(reverse("accounts:unfollow", kwargs={"username": "otheruser"}))
+        self.client.post(
+            reverse("tweets:bulk_create"),
+            json.dumps({"tweets": [{"content": "a"}, {"content": "b"}]}),
+            content_type="application/json",
+        )
+        self.client.post(reverse("tweets:delete", kwargs={"pk": tweet.pk}))
+        self.assertEqual(
+            self.types(),
+            [
+                "tweet.created",
+                "like.created",
+                "like.deleted",
+                "follow.created",
+                "follow.deleted",
+                "tweet.created",
+                "tweet.created",
+                "tweet.deleted",
+            ],
+        )
+        self.assertEqual(
+            OutboxEvent.objects.first().payload, {"tweet_id": tweet.pk, "user_id": self.user.pk, "content": "hello"}
+        )
+
+    def test_event_is_rolled_back_with_the_change(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Tweet.objects.create(user=self.user, content="x")
+                services.emit(services.Type.TWEET_CREATED, tweet_id=0)
+                raise RuntimeError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+@override_settings(OUTBOX_SETTLE_SECONDS=0, OUTBOX_BATCH_SIZE=2)
+class TestOutboxStream(TestCase):
+    def setUp(self):
+        self.events = [services.emit(services.Type.USER_DELETED, user_id=i) for i in range(5)]
+        self.staff = User.objects.create_user(username="staff", password="testpassword", is_staff=True)
+        self.client.login(username="staff", password="testpassword")
+
+    def test_tail_api_pages_by_cursor(self):
+        response = self.client.get(reverse("outbox:tail"), {"after": self.events[0].pk})
+        data = response.json()
+        self.assertEqual([e["id"] for e in data["events"]], [self.events[1].pk, self.events[2].pk])
+        data = self.client.get(reverse("outbox:tail"), {"after": data["next"]}).json()
+        self.assertEqual([e["id"] for e in data["events"]], [self.events[3].pk, self.events[4].pk])
+        data = self.client.get(reverse("outbox:tail"), {"after": data["next"]}).json()
+        self.assertEqual((data["events"], data["next"]), ([], self.events[4].pk))
+
+    def test_tail_requires_staff(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("outbox:tail")).status_code, 302)
+
+    def test_recent_events_are_held_back(self):
+        with self.settings(OUTBOX_SETTLE_SECONDS=60):
+            self.assertEqual(services.tail(0), [])
+
+    def test_ack_never_moves_backwards(self):
+        self.client.post(
+            reverse("outbox:ack"), json.dumps({"consumer": "search", "position": 3}), content_type="application/json"
+        )
+        services.ack("search", 1)
+        self.assertEqual(services.position("search"), 3)
+
+    def test_stream_command_and_compaction(self):
+        out = StringIO()
+        call_command("stream_outbox", "--consumer", "search", stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line["id"] for line in lines], [e.pk for e in self.events])
+        self.assertEqual(services.position("search"), self.events[-1].pk)
+
+        # a second consumer that has read only part of the stream holds compaction back
+        services.ack("analytics", self.events[1].pk)
+        self.assertEqual(services.compact(), 2)
+        self.assertEqual(OutboxEvent.objects.count(), 3)
+        services.ack("analytics", self.events[-1].pk)
+        call_command("compact_outbox", stdout=StringIO())
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(OutboxConsumer.objects.count(), 2)
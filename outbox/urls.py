@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = "outbox"
+
+urlpatterns = [
+    path("tail/", views.TailView.as_view(), name="tail"),
+    path("ack/", views.AckView.as_view(), name="ack"),
+]
@@ -0,0 +1,34 @@
+import json
+
+from django.http import JsonResponse
+from django.views.generic import View
+
+from core.views import StaffRequiredMixin
+
+from . import services
+
+
+class TailView(StaffRequiredMixin, View):
+    """``?after=<event id>&limit=<n>``: the next events in stream order and the cursor to continue from."""
+
+    def get(self, request, *args, **kwargs):
+        try:
+            after = int(request.GET.get("after", 0))
+            limit = int(request.GET.get("limit", 0)) or None
+        except ValueError:
+            return JsonResponse({"error": "after と limit は整数で指定してください。"}, status=400)
+        events = services.tail(after, limit)
+        return JsonResponse({"events": [e.as_dict() for e in events], "next": events[-1].pk if events else after})
+
+
+class AckView(StaffRequiredMixin, View):
+    """Record how far a consumer has read (JSON body ``{"consumer": ..., "position": ...}``)."""
+
+    def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+            consumer, position = str(data["consumer"]), int(data["position"])
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({"error": "consumer と position を指定してください。"}, status=400)
+        services.ack(consumer, position)
+        return JsonResponse({"consumer": consumer, "position": services.position(consumer)})
@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from core.admin import LargeTableAdmin
+
+from .models import DailyUserStats
+
+
+@admin.register(DailyUserStats)
+class DailyUserStatsAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "day", "tweets", "likes_received", "followers_gained", "followers_lost")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
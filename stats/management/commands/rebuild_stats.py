@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from stats import services
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily stats rollups from the tweet, like and follow tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since", type=date.fromisoformat, default=None, help="First day (YYYY-MM-DD) to rebuild; default all."
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("wrote {} rollup row(s)".format(services.rebuild(options["since"])))
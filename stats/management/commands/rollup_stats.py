@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from stats import services
+from stats.tasks import schedule_rollup
+
+
+class Command(BaseCommand):
+    help = "Fold new outbox events into the daily stats rollups, or start the periodic rollup on the task queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--schedule", action="store_true", help="Enqueue the self-rescheduling rollup task.")
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            schedule_rollup()
+            self.stdout.write("scheduled stats rollup")
+            return
+        self.stdout.write("processed {} event(s)".format(services.process(options["batch_size"])))
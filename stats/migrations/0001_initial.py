@@ -0,0 +1,38 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyUserStats",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("tweets", models.IntegerField(default=0)),
+                ("likes_received", models.IntegerField(default=0)),
+                ("followers_gained", models.IntegerField(default=0)),
+                ("followers_lost", models.IntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="dailyuserstats",
+            constraint=models.UniqueConstraint(fields=("user", "day"), name="unique_daily_user_stats"),
+        ),
+    ]
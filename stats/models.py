@@ -0,0 +1,22 @@
+from django.db import models
+
+from accounts.models import User
+
+
+class DailyUserStats(models.Model):
+    """Per-user activity for one local day, kept up to date from the outbox (see services.py)."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    tweets = models.IntegerField(default=0)
+    likes_received = models.IntegerField(default=0)
+    followers_gained = models.IntegerField(default=0)
+    followers_lost = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="unique_daily_user_stats"),
+        ]
+
+    def __str__(self):
+        return "{} {}".format(self.user_id, self.day)
@@ -0,0 +1,150 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import FriendShip, User
+from outbox.models import OutboxConsumer, OutboxEvent
+from outbox.services import Type, ack, tail
+from tweets.models import Like, Tweet
+
+from .models import DailyUserStats
+
+CONSUMER = "stats"
+COUNTERS = ("tweets", "likes_received", "followers_gained", "followers_lost")
+
+# event type -> (payload key of the user whose stats change, counter, delta)
+EFFECTS = {
+    Type.TWEET_CREATED: ("user_id", "tweets", 1),
+    Type.TWEET_DELETED: ("user_id", "tweets", -1),
+    Type.LIKE_CREATED: ("author_id", "likes_received", 1),
+    Type.LIKE_DELETED: ("author_id", "likes_received", -1),
+    Type.FOLLOW_CREATED: ("following_id", "followers_gained", 1),
+    Type.FOLLOW_DELETED: ("following_id", "followers_lost", 1),
+}
+
+
+def changes(events):
+    """``Counter`` of ``(user_id, day, counter) -> delta`` for a batch of outbox events."""
+    deltas = Counter()
+    for event in events:
+        if event.event_type not in EFFECTS:
+            continue
+        key, counter, delta = EFFECTS[event.event_type]
+        when = event.created_at
+        if event.event_type == Type.TWEET_DELETED:
+            # Take the tweet back off the day it was posted on.
+            when = parse_datetime(event.payload.get("created_at") or "")
+        user_id = event.payload.get(key)
+        if user_id is None or when is None:
+            # Emitted before the payload carried this; rebuild_stats picks such rows up.
+            continue
+        deltas[user_id, timezone.localdate(when), counter] += delta
+    return deltas
+
+
+def apply(deltas):
+    """Add ``deltas`` to the rollup rows, creating the missing ones; returns the number of rows written."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    users = {user_id for user_id, _, _ in deltas}
+    days = {day for _, day, _ in deltas}
+    rows = {(row.user_id, row.day): row for row in DailyUserStats.objects.filter(user_id__in=users, day__in=days)}
+    touched = {}
+    for (user_id, day, counter), delta in deltas.items():
+        row = touched.setdefault((user_id, day), rows.get((user_id, day)) or DailyUserStats(user_id=user_id, day=day))
+        setattr(row, counter, getattr(row, counter) + delta)
+    DailyUserStats.objects.bulk_update([row for row in touched.values() if row.pk], COUNTERS)
+    new = [row for row in touched.values() if not row.pk]
+    if new:
+        # Accounts purged since the event was written have nowhere to keep their stats.
+        alive = set(User._base_manager.filter(pk__in={row.user_id for row in new}).values_list("pk", flat=True))
+        DailyUserStats.objects.bulk_create([row for row in new if row.user_id in alive])
+    return len(touched)
+
+
+def _lock_consumer():
+    OutboxConsumer.objects.get_or_create(name=CONSUMER)
+    return OutboxConsumer.objects.select_for_update().get(name=CONSUMER).position
+
+
+def process(batch_size=None):
+    """Fold the outbox events the ``stats`` consumer hasn't seen into the rollups; returns how many were read.
+
+    Each batch updates the rollups and moves the consumer in one transaction, so
+    an event is counted exactly once even if the job dies halfway.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            events = tail(_lock_consumer(), batch_size)
+            if not events:
+                return processed
+            apply(changes(events))
+            ack(CONSUMER, events[-1].pk)
+        processed += len(events)
+
+
+def rebuild(since=None):
+    """Recompute the rollups from the source tables, from day ``since`` on or entirely; returns the rows written.
+
+    The consumer is only moved up to the newest *settled* event (see
+    ``outbox.services.tail``): a transaction still in flight may hold a lower id
+    that the snapshot cannot see. Newer events that are already visible are in
+    the snapshot too, so their changes are taken back out here and ``process()``
+    adds them again when they settle. Unfollows leave no row behind, so rebuilt
+    days count current followers as ``followers_gained`` and no ``followers_lost``.
+    """
+    sources = [
+        (Tweet.objects.all(), "user_id", "tweets"),
+        (Like.objects.all(), "tweet__user_id", "likes_received"),
+        (FriendShip.objects.all(), "following_id", "followers_gained"),
+    ]
+    with transaction.atomic():
+        _lock_consumer()
+        settled = timezone.now() - timedelta(seconds=settings.OUTBOX_SETTLE_SECONDS)
+        high_water = OutboxEvent.objects.filter(created_at__lte=settled).aggregate(top=Max("pk"))["top"] or 0
+        pending = changes(OutboxEvent.objects.filter(pk__gt=high_water).order_by("pk"))
+        rollups = DailyUserStats.objects.all()
+        if since:
+            rollups = rollups.filter(day__gte=since)
+        rollups.delete()
+        rows = {}
+        for queryset, user_field, counter in sources:
+            if since:
+                queryset = queryset.filter(created_at__date__gte=since)
+            counts = (
+                queryset.annotate(day=TruncDate("created_at"))
+                .values_list(user_field, "day")
+                .annotate(count=Count("pk"))
+                .order_by()
+            )
+            for user_id, day, count in counts.iterator():
+                row = rows.setdefault((user_id, day), DailyUserStats(user_id=user_id, day=day))
+                setattr(row, counter, count)
+        for (user_id, day, counter), delta in pending.items():
+            if since and day < since:
+                # Not rebuilt: process() has not applied these to the kept rows yet either.
+                continue
+            row = rows.setdefault((user_id, day), DailyUserStats(user_id=user_id, day=day))
+            setattr(row, counter, getattr(row, counter) - delta)
+        DailyUserStats.objects.bulk_create(rows.values(), batch_size=1000)
+        ack(CONSUMER, high_water)
+    return len(rows)
+
+
+def daily(user_id, days=None):
+    """Rollups of ``user_id`` for the last ``days`` local days, oldest first, with empty rows for quiet days."""
+    days = days or settings.STATS_DAYS
+    start = timezone.localdate() - timedelta(days=days - 1)
+    rows = {row.day: row for row in DailyUserStats.objects.filter(user_id=user_id, day__gte=start)}
+    return [
+        rows.get(day) or DailyUserStats(user_id=user_id, day=day)
+        for day in (start + timedelta(days=offset) for offset in range(days))
+    ]
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.utils import timezone
+
+from taskqueue.registry import task
+
+from . import services
+
+
+def schedule_rollup(delay=0):
+    slot = int(timezone.now().timestamp() + delay) // settings.STATS_ROLLUP_INTERVAL
+    return rollup_stats.enqueue(idempotency_key="stats.rollup:{}".format(slot), delay=delay)
+
+
+@task(name="stats.rollup")
+def rollup_stats():
+    services.process()
+    schedule_rollup(delay=settings.STATS_ROLLUP_INTERVAL)
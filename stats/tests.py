@@ -0,0 +1,103 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from outbox.models import OutboxEvent
+from outbox.services import position
+from taskqueue.models import Task
+from tweets.models import Tweet
+
+from . import services
+from .models import DailyUserStats
+from .tasks import schedule_rollup
+
+User = get_user_model()
+
+
+@override_settings(OUTBOX_SETTLE_SECONDS=0)
+class TestRollups(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.fan = User.objects.create_user(username="fan", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        for content in ("first", "second"):
+            self.client.post(reverse("tweets:create"), {"content": content})
+        self.tweet = Tweet.objects.first()
+        self.client.force_login(self.fan)
+        self.client.post(reverse("tweets:like", kwargs={"pk": self.tweet.pk}))
+        self.client.post(reverse("accounts:follow", kwargs={"username": "testuser"}))
+
+    def today(self):
+        return DailyUserStats.objects.get(user=self.user, day=timezone.localdate())
+
+    def test_process_counts_each_event_once(self):
+        self.assertEqual(services.process(), OutboxEvent.objects.count())
+        self.assertEqual(services.process(), 0)
+        row = self.today()
+        self.assertEqual((row.tweets, row.likes_received, row.followers_gained, row.followers_lost), (2, 1, 1, 0))
+        self.assertEqual(position(services.CONSUMER), OutboxEvent.objects.latest("pk").pk)
+
+    def test_undo_events(self):
+        services.process()
+        self.client.post(reverse("tweets:unlike", kwargs={"pk": self.tweet.pk}))
+        self.client.post(reverse("accounts:unfollow", kwargs={"username": "testuser"}))
+        self.client.force_login(self.user)
+        self.client.post(reverse("tweets:delete", kwargs={"pk": self.tweet.pk}))
+        services.process(batch_size=1)
+        row = self.today()
+        self.assertEqual((row.tweets, row.likes_received, row.followers_gained, row.followers_lost), (1, 0, 1, 1))
+
+    def test_rebuild_matches_and_moves_the_consumer(self):
+        Tweet.objects.create(user=self.user, content="old")
+        Tweet.objects.filter(content="old").update(created_at=timezone.now() - timedelta(days=3))
+        call_command("rebuild_stats", stdout=StringIO())
+        self.assertEqual(services.process(), 0)
+        row = self.today()
+        self.assertEqual((row.tweets, row.likes_received, row.followers_gained), (2, 1, 1))
+        old = DailyUserStats.objects.get(user=self.user, day=timezone.localdate() - timedelta(days=3))
+        self.assertEqual(old.tweets, 1)
+
+        call_command("rebuild_stats", since=timezone.localdate().isoformat(), stdout=StringIO())
+        self.assertEqual(DailyUserStats.objects.filter(user=self.user).count(), 2)
+
+    def test_rebuild_leaves_unsettled_events_to_process(self):
+        with self.settings(OUTBOX_SETTLE_SECONDS=3600):
+            services.rebuild()
+            self.assertEqual(position(services.CONSUMER), 0)
+        self.assertEqual(services.process(), OutboxEvent.objects.count())
+        row = self.today()
+        self.assertEqual((row.tweets, row.likes_received, row.followers_gained, row.followers_lost), (2, 1, 1, 0))
+
+    def test_schedule(self):
+        schedule_rollup()
+        schedule_rollup()
+        self.assertEqual(Task.objects.filter(name="stats.rollup").count(), 1)
+
+
+@override_settings(OUTBOX_SETTLE_SECONDS=0)
+class TestUserStatsView(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.client.post(reverse("tweets:create"), {"content": "hello"})
+        services.process()
+        self.url = reverse("stats:user", kwargs={"username": "testuser"})
+
+    def test_reads_only_rollups(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if Tweet._meta.db_table in q["sql"]])
+        self.assertEqual(len(response.context["day_list"]), 30)
+        self.assertEqual(response.context["day_list"][-1].tweets, 1)
+        self.assertEqual(response.context["totals"]["tweets"], 1)
+
+    def test_unknown_user(self):
+        self.assertEqual(self.client.get(reverse("stats:user", kwargs={"username": "nobody"})).status_code, 404)
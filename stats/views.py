@@ -0,0 +1,21 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.generic import TemplateView
+
+from accounts.views import get_user_or_404
+
+from . import services
+
+
+class UserStatsView(LoginRequiredMixin, TemplateView):
+    """Daily activity of one user, read from the rollups only."""
+
+    template_name = "stats/user.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        user = get_user_or_404(self.request, self.kwargs["username"])
+        day_list = services.daily(user.pk)
+        context["stats_user"] = user
+        context["day_list"] = day_list
+        context["totals"] = {counter: sum(getattr(row, counter) for row in day_list) for counter in services.COUNTERS}
+        return context
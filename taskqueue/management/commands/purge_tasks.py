@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from taskqueue.tasks import schedule_purge
+from taskqueue.worker import purge_finished
+
+
+class Command(BaseCommand):
+    help = "Delete finished tasks older than TASKQUEUE_RETENTION, or start the periodic purge on the task queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schedule", action="store_true", help="Enqueue the self-rescheduling purge task.")
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            schedule_purge()
+            self.stdout.write("scheduled task purge")
+            return
+        self.stdout.write("deleted {} task(s)".format(purge_finished()))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from taskqueue.worker import Worker, run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks with a thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, help="Number of worker threads.")
+        parser.add_argument("--poll-interval", type=float, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--max-tasks", type=int, help="Exit after running this many tasks.")
+        parser.add_argument("--burst", action="store_true", help="Drain the due tasks and exit.")
+
+    def handle(self, *args, **options):
+        if options["burst"]:
+            finished = run_pending(concurrency=options["concurrency"] or 1)
+            self.stdout.write("ran {} task(s)".format(len(finished)))
+            return
+        worker = Worker(concurrency=options["concurrency"], poll_interval=options["poll_interval"])
+        self.stdout.write("worker started with {} thread(s)".format(worker.concurrency))
+        done = worker.run_forever(max_tasks=options["max_tasks"])
+        self.stdout.write("ran {} task(s)".format(done))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Q, Sum
+
+from taskqueue.models import Task
+
+
+class Command(BaseCommand):
+    help = "Show per-task counts and timing metrics."
+
+    def handle(self, *args, **options):
+        rows = (
+            Task.objects.values("name")
+            .annotate(
+                total=Count("id"),
+                pending=Count("id", filter=Q(status=Task.Status.PENDING)),
+                failed=Count("id", filter=Q(status=Task.Status.FAILED)),
+                retries=Sum("attempts") - Count("id", filter=~Q(attempts=0)),
+                avg_ms=Avg("duration_ms"),
+                max_ms=Max("duration_ms"),
+            )
+            .order_by("name")
+        )
+        self.stdout.write(
+            "{:<50} {:>7} {:>7} {:>7} {:>7} {:>9} {:>9}".format(
+                "task", "total", "pending", "failed", "retries", "avg_ms", "max_ms"
+            )
+        )
+        for row in rows:
+            self.stdout.write(
+                "{name:<50} {total:>7} {pending:>7} {failed:>7} {retries:>7} {avg:>9.1f} {max:>9.1f}".format(
+                    avg=row["avg_ms"] or 0, max=row["max_ms"] or 0, **row
+                )
+            )
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+_registry = {}
+
+
+class UnknownTask(KeyError):
+    pass
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Register ``func`` so that it can be enqueued by name and run by the worker.
+
+    The decorated function keeps working when called directly and gains
+    ``enqueue(**payload)`` and ``enqueue_many(payloads)`` shortcuts.
+    """
+
+    def decorator(func):
+        task_name = name or "{}.{}".format(func.__module__, func.__qualname__)
+        func.task_name = task_name
+        func.max_attempts = max_attempts
+        func.enqueue = lambda **kwargs: enqueue(func, **kwargs)
+        func.enqueue_many = lambda payloads, **kwargs: enqueue_many(func, payloads, **kwargs)
+        _registry[task_name] = func
+        return func
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(name) from None
+
+
+def _task_fields(func, delay, max_attempts):
+    from .models import Task
+
+    task_name = func if isinstance(func, str) else func.task_name
+    get_task(task_name)
+    if max_attempts is None:
+        max_attempts = (
+            getattr(_registry[task_name], "max_attempts", None) or Task._meta.get_field("max_attempts").default
+        )
+    run_at = timezone.now()
+    if delay:
+        run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+    return {"name": task_name, "run_at": run_at, "max_attempts": max_attempts}
+
+
+def enqueue(func, *, idempotency_key=None, delay=None, max_attempts=None, **payload):
+    """Insert a task row; it commits or rolls back together with the caller's transaction.
+
+    When ``idempotency_key`` is given and a task with that key already exists,
+    the existing task is returned instead of queueing a second one.
+    """
+    from .models import Task
+
+    fields = dict(_task_fields(func, delay, max_attempts), payload=payload)
+
+    if idempotency_key is None:
+        return Task.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(idempotency_key=idempotency_key, **fields)
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=idempotency_key)
+
+
+def enqueue_many(func, payloads, *, delay=None, max_attempts=None):
+    """Insert one task per payload with a single INSERT; no idempotency keys."""
+    from .models import Task
+
+    fields = _task_fields(func, delay, max_attempts)
+    return Task.objects.bulk_create([Task(payload=payload, **fields) for payload in payloads])
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.utils import timezone
+
+from .registry import task
+from .worker import purge_finished
+
+
+def schedule_purge(delay=0):
+    slot = int(timezone.now().timestamp() + delay) // settings.TASKQUEUE_PURGE_INTERVAL
+    return purge_tasks.enqueue(idempotency_key="taskqueue.purge:{}".format(slot), delay=delay)
+
+
+@task(name="taskqueue.purge")
+def purge_tasks():
+    purge_finished()
+    schedule_purge(delay=settings.TASKQUEUE_PURGE_INTERVAL)
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Task
+from .registry import UnknownTask, enqueue, task
+from .tasks import schedule_purge
+from .worker import claim, purge_finished, run_pending
+
+calls = []
+
+
+@task(name="tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task(name="tests.flaky", max_attempts=2)
+def flaky():
+    raise RuntimeError("boom")
+
+
+class TestEnqueue(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_success_enqueue(self):
+        queued = record.enqueue(value=1)
+        self.assertEqual(queued.name, "tests.record")
+        self.assertEqual(queued.payload, {"value": 1})
+        self.assertEqual(queued.status, Task.Status.PENDING)
+
+    def test_idempotency_key(self):
+        first = enqueue("tests.record", idempotency_key="once", value=1)
+        second = enqueue("tests.record", idempotency_key="once", value=2)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_failure_enqueue_unknown_task(self):
+        with self.assertRaises(UnknownTask):
+            enqueue("tests.unknown")
+
+    def test_enqueue_rolls_back_with_transaction(self):
+        try:
+            with transaction.atomic():
+                record.enqueue(value=1)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Task.objects.exists())
+
+
+class TestWorker(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_success_run(self):
+        record.enqueue(value=1)
+        record.enqueue(value=2)
+        finished = run_pending()
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertEqual(len(finished), 2)
+        for finished_task in Task.objects.all():
+            self.assertEqual(finished_task.status, Task.Status.SUCCEEDED)
+            self.assertEqual(finished_task.attempts, 1)
+            self.assertIsNotNone(finished_task.duration_ms)
+
+    def test_delayed_task_is_not_run(self):
+        record.enqueue(value=1, delay=60)
+        run_pending()
+        self.assertEqual(calls, [])
+
+    def test_retry_with_backoff(self):
+        queued = flaky.enqueue()
+        run_pending()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.Status.PENDING)
+        self.assertEqual(queued.attempts, 1)
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn("RuntimeError", queued.last_error)
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        run_pending()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.Status.FAILED)
+        self.assertEqual(queued.attempts, 2)
+
+    def test_claim_is_exclusive(self):
+        record.enqueue(value=1)
+        self.assertEqual(len(claim(10)), 1)
+        self.assertEqual(claim(10), [])
+
+    def test_stale_lock_is_reclaimed(self):
+        queued = record.enqueue(value=1)
+        Task.objects.filter(pk=queued.pk).update(
+            status=Task.Status.RUNNING, locked_at=timezone.now() - timedelta(hours=1)
+        )
+        run_pending()
+        self.assertEqual(calls, [1])
+
+    def test_task_stats_command(self):
+        record.enqueue(value=1)
+        run_pending()
+        out = StringIO()
+        call_command("task_stats", stdout=out)
+        self.assertIn("tests.record", out.getvalue())
+
+    def test_purge_finished(self):
+        old, recent, failed, pending = (record.enqueue(value=i) for i in range(4))
+        Task.objects.filter(pk=pending.pk).update(run_at=timezone.now() + timedelta(days=30))
+        run_pending()
+        Task.objects.filter(pk=failed.pk).update(status=Task.Status.FAILED)
+        Task.objects.filter(pk__in=[old.pk, failed.pk]).update(finished_at=timezone.now() - timedelta(days=30))
+        Task.objects.filter(pk=pending.pk).update(created_at=timezone.now() - timedelta(days=30))
+        self.assertEqual(purge_finished(), 2)
+        self.assertEqual(set(Task.objects.values_list("pk", flat=True)), {recent.pk, pending.pk})
+
+    def test_scheduled_purge_reschedules_itself(self):
+        schedule_purge()
+        schedule_purge()
+        self.assertEqual(Task.objects.filter(name="taskqueue.purge").count(), 1)
+        run_pending()
+        self.assertEqual(Task.objects.filter(name="taskqueue.purge", status=Task.Status.PENDING).count(), 1)
+        out = StringIO()
+        call_command("purge_tasks", stdout=out)
+        self.assertEqual(out.getvalue(), "deleted 0 task(s)\n")
@@ -0,0 +1,140 @@
+import logging
+import random
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts`` (exponential, capped, with jitter)."""
+    base = settings.TASKQUEUE_RETRY_BACKOFF
+    delay = min(base * 2 ** max(attempts - 1, 0), settings.TASKQUEUE_MAX_BACKOFF)
+    return delay + random.uniform(0, base)
+
+
+def claim(limit):
+    """Atomically move up to ``limit`` due tasks to RUNNING and return them.
+
+    Each row is claimed with a conditional UPDATE, so concurrent workers never
+    run the same task twice. Tasks left RUNNING by a crashed worker are picked
+    up again once their lock is older than ``TASKQUEUE_LOCK_TIMEOUT``.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASKQUEUE_LOCK_TIMEOUT)
+    candidates = (
+        Task.objects.filter(
+            Q(status=Task.Status.PENDING, run_at__lte=now) | Q(status=Task.Status.RUNNING, locked_at__lt=stale)
+        )
+        .order_by("run_at")
+        .values_list("pk", "status", "locked_at")[: limit * 2]
+    )
+    claimed = []
+    for pk, status, locked_at in candidates:
+        updated = Task.objects.filter(pk=pk, status=status, locked_at=locked_at).update(
+            status=Task.Status.RUNNING, locked_at=now, attempts=F("attempts") + 1
+        )
+        if updated:
+            claimed.append(pk)
+        if len(claimed) >= limit:
+            break
+    return list(Task.objects.filter(pk__in=claimed).order_by("run_at"))
+
+
+def execute(task):
+    """Run one claimed task and record its outcome and timing."""
+    started = time.perf_counter()
+    try:
+        get_task(task.name)(**task.payload)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            task.status = Task.Status.FAILED
+            task.finished_at = timezone.now()
+            logger.error("task %s (%s) failed permanently", task.pk, task.name)
+        else:
+            task.status = Task.Status.PENDING
+            task.run_at = timezone.now() + timedelta(seconds=backoff(task.attempts))
+            logger.warning("task %s (%s) failed, retry %s at %s", task.pk, task.name, task.attempts, task.run_at)
+    else:
+        task.status = Task.Status.SUCCEEDED
+        task.last_error = ""
+        task.finished_at = timezone.now()
+    task.duration_ms = (time.perf_counter() - started) * 1000
+    task.locked_at = None
+    task.save(update_fields=["status", "last_error", "run_at", "finished_at", "duration_ms", "locked_at"])
+    return task
+
+
+def _execute_in_thread(task):
+    close_old_connections()
+    try:
+        return execute(task)
+    finally:
+        connections.close_all()
+
+
+class Worker:
+    def __init__(self, concurrency=None, poll_interval=None):
+        self.concurrency = concurrency or settings.TASKQUEUE_CONCURRENCY
+        self.poll_interval = settings.TASKQUEUE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.executor = None
+
+    def run_once(self):
+        """Claim and run one batch of due tasks; returns the finished tasks."""
+        tasks = claim(self.concurrency)
+        if not tasks:
+            return []
+        if self.concurrency == 1:
+            return [execute(task) for task in tasks]
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="taskqueue")
+        return list(self.executor.map(_execute_in_thread, tasks))
+
+    def run_forever(self, max_tasks=None):
+        done = 0
+        try:
+            while max_tasks is None or done < max_tasks:
+                finished = self.run_once()
+                done += len(finished)
+                if not finished:
+                    time.sleep(self.poll_interval)
+        finally:
+            self.shutdown()
+        return done
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+def run_pending(concurrency=1):
+    """Drain every task that is currently due. Handy in tests and cron jobs."""
+    worker = Worker(concurrency=concurrency)
+    finished = []
+    try:
+        while batch := worker.run_once():
+            finished.extend(batch)
+    finally:
+        worker.shutdown()
+    return finished
+
+
+def purge_finished():
+    """Delete succeeded and failed tasks that finished over TASKQUEUE_RETENTION seconds ago; returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=settings.TASKQUEUE_RETENTION)
+    deleted, _ = Task.objects.filter(
+        status__in=[Task.Status.SUCCEEDED, Task.Status.FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
@@ -1,6 +1,36 @@
 from django.contrib import admin
 
+from core.admin import LargeTableAdmin
+
 from .models import Like, Tweet
+from .purge import soft_delete_tweet
+
+
+@admin.register(Tweet)
+class TweetAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "content", "created_at")
+    list_select_related = ("user",)
+    list_filter = (("created_at", admin.DateFieldListFilter),)
+    search_fields = ("user__username__exact",)
+    raw_id_fields = ("user",)
+    actions = ["soft_delete_selected"]
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    @admin.action(description="選択したツイートを削除（バックグラウンドで完全削除）", permissions=["delete"])
+    def soft_delete_selected(self, request, queryset):
+        for tweet in queryset:
+            soft_delete_tweet(tweet)
+
+    def delete_model(self, request, obj):
+        soft_delete_tweet(obj)
+
 
-admin.site.register(Tweet)
-admin.site.register(Like)
+@admin.register(Like)
+class LikeAdmin(LargeTableAdmin):
+    list_display = ("id", "tweet", "user")
+    list_select_related = ("tweet", "user")
+    raw_id_fields = ("tweet", "user")
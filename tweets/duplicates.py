@@ -0,0 +1,133 @@
+import re
+import unicodedata
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TweetSignature
+
+SHINGLE = 3
+# Six bands of 10-11 bits: two hashes within five bits of each other agree on at least one band.
+BAND_WIDTHS = (11, 11, 11, 11, 10, 10)
+_URL = re.compile(r"https?://\S+")
+_SPACE = re.compile(r"\s+")
+_BIT = np.arange(64, dtype=np.uint64)
+
+MESSAGE = "同じ内容のツイートが短時間に繰り返し投稿されています。"
+
+
+def normalize(text):
+    """Fold the variations bots use to dodge exact matching: width, case, links and spacing."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _URL.sub(" ", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def _mix(x):
+    # splitmix64 finaliser; numpy uint64 arithmetic wraps around like the C original.
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def simhashes(texts):
+    """64-bit SimHash of each text over character 3-gram shingles, computed for the whole batch at once.
+
+    Characters rather than words are shingled because Japanese has no spaces.
+    Returns a ``uint64`` array aligned with ``texts``.
+    """
+    docs = [normalize(text).ljust(SHINGLE) for text in texts]
+    if not docs:
+        return np.zeros(0, dtype=np.uint64)
+    lengths = np.array([len(doc) for doc in docs])
+    codes = np.frombuffer("".join(docs).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # One hash per character position; keep those whose shingle ends inside the same document.
+    gram = _mix(codes[: len(codes) - SHINGLE + 1])
+    for offset in range(1, SHINGLE):
+        gram = _mix(gram ^ codes[offset : len(codes) - SHINGLE + 1 + offset])
+    doc_of = np.repeat(np.arange(len(docs)), lengths)[: len(gram)]
+    valid = np.arange(len(gram)) - starts[doc_of] <= lengths[doc_of] - SHINGLE
+    gram, doc_of = gram[valid], doc_of[valid]
+    shingles = np.bincount(doc_of, minlength=len(docs))
+
+    # Count votes one bit plane at a time: a grams x 64 matrix would need 512 bytes per character.
+    hashes = np.zeros(len(docs), dtype=np.uint64)
+    for bit in _BIT:
+        votes = np.bincount(doc_of, weights=(gram >> bit) & np.uint64(1), minlength=len(docs))
+        hashes |= (votes * 2 > shingles).astype(np.uint64) << bit
+    return hashes
+
+
+def bands(simhash):
+    """Split a 64-bit hash into the values of its BAND_WIDTHS bit ranges."""
+    simhash = int(simhash)
+    values = []
+    for width in BAND_WIDTHS:
+        values.append(simhash & ((1 << width) - 1))
+        simhash >>= width
+    return values
+
+
+def to_signed(simhash):
+    simhash = int(simhash)
+    return simhash - (1 << 64) if simhash >= 1 << 63 else simhash
+
+
+def distance(a, b):
+    return ((int(a) ^ int(b)) & ((1 << 64) - 1)).bit_count()
+
+
+def make_signature(tweet, simhash):
+    return TweetSignature(
+        tweet_id=tweet.pk,
+        user_id=tweet.user_id,
+        simhash=to_signed(simhash),
+        created_at=tweet.created_at or timezone.now(),
+        **{"band{}".format(band): value for band, value in enumerate(bands(simhash))},
+    )
+
+
+def near_duplicates(simhash, since):
+    """``user_id`` of each recent tweet within NEAR_DUPLICATE_MAX_DISTANCE bits of ``simhash``.
+
+    Only rows sharing a band value are read (one index range per band), so the
+    cost follows the size of the matching buckets, not of the table.
+    """
+    same_bucket = reduce(or_, (Q(**{"band{}".format(band): value}) for band, value in enumerate(bands(simhash))))
+    candidates = TweetSignature.objects.filter(same_bucket, created_at__gte=since).values_list("simhash", "user_id")[
+        : settings.NEAR_DUPLICATE_MAX_CANDIDATES
+    ]
+    return [
+        user_id for other, user_id in candidates if distance(other, simhash) <= settings.NEAR_DUPLICATE_MAX_DISTANCE
+    ]
+
+
+def is_spam(text, simhash, user_id, seen=()):
+    """Whether ``text`` repeats a recent tweet by the same user or is one of too many copies overall.
+
+    ``seen`` holds ``(simhash, user_id)`` pairs accepted earlier in the same batch.
+    Texts shorter than NEAR_DUPLICATE_MIN_LENGTH have too few shingles to tell
+    apart and are never rejected.
+    """
+    if len(normalize(text)) < settings.NEAR_DUPLICATE_MIN_LENGTH:
+        return False
+    since = timezone.now() - timedelta(seconds=settings.NEAR_DUPLICATE_WINDOW_SECONDS)
+    authors = near_duplicates(simhash, since)
+    authors += [uid for other, uid in seen if distance(other, simhash) <= settings.NEAR_DUPLICATE_MAX_DISTANCE]
+    return user_id in authors or len(authors) >= settings.NEAR_DUPLICATE_MAX_COPIES
+
+
+def sign(tweets, hashes=None):
+    """Store the signatures of freshly created ``tweets``; ``hashes`` may be passed when already computed."""
+    if hashes is None:
+        hashes = simhashes([tweet.content for tweet in tweets])
+    return TweetSignature.objects.bulk_create(
+        [make_signature(tweet, simhash) for tweet, simhash in zip(tweets, hashes)], ignore_conflicts=True
+    )
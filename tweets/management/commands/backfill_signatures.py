@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tweets import duplicates
+from tweets.models import Tweet, TweetSignature
+
+
+class Command(BaseCommand):
+    help = "Compute near-duplicate signatures for tweets that don't have one yet, a batch at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        after = 0
+        total = 0
+        started = time.perf_counter()
+        while True:
+            # Walk the primary key so each batch is an index range, whatever the table size.
+            tweets = list(
+                Tweet.all_objects.filter(pk__gt=after)
+                .order_by("pk")
+                .only("pk", "user_id", "content", "created_at")[:batch_size]
+            )
+            if not tweets:
+                break
+            after = tweets[-1].pk
+            signed = set(
+                TweetSignature.objects.filter(pk__gte=tweets[0].pk, pk__lte=after).values_list("tweet_id", flat=True)
+            )
+            missing = [tweet for tweet in tweets if tweet.pk not in signed]
+            if missing:
+                duplicates.sign(missing)
+                total += len(missing)
+        self.stdout.write("signed {} tweet(s) in {:.1f} s".format(total, time.perf_counter() - started))
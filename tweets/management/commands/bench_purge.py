@@ -0,0 +1,95 @@
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.bench import Timer, temporary_database
+from tweets import purge
+from tweets.models import Like, Tweet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark deleting an account whose tweets have received many likes, chunked purge vs. plain CASCADE."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--likes", type=int, default=1_000_000, help="Total likes on the account's tweets.")
+        parser.add_argument("--fans", type=int, default=1000, help="Number of distinct users who liked them.")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--skip-cascade", action="store_true", help="Only run the chunked purge.")
+        parser.add_argument(
+            "--trace-memory", action="store_true", help="Report peak Python memory (tracemalloc slows both runs)."
+        )
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            self.stdout.write("== chunked purge ==")
+            self.report(*self.run_chunked(options))
+        if not options["skip_cascade"]:
+            with temporary_database():
+                self.stdout.write("== single CASCADE delete ==")
+                self.report(*self.run_cascade(options))
+
+    def populate(self, options):
+        fans = options["fans"]
+        tweets = max(options["likes"] // fans, 1)
+        author = User.objects.create_user(username="heavy")
+        User.objects.bulk_create([User(username="fan{}".format(i)) for i in range(fans)])
+        Tweet.objects.bulk_create([Tweet(user=author, content="tweet {}".format(i)) for i in range(tweets)])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO {like} (tweet_id, user_id, created_at) SELECT t.id, u.id, %s FROM {tweet} t "
+                "CROSS JOIN {user} u WHERE t.user_id = %s AND u.id <> %s".format(
+                    like=Like._meta.db_table, tweet=Tweet._meta.db_table, user=User._meta.db_table
+                ),
+                [timezone.now(), author.pk, author.pk],
+            )
+        self.stdout.write("populated {} tweets, {} likes".format(tweets, Like.objects.count()))
+        return author
+
+    def run_chunked(self, options):
+        author = self.populate(options)
+        with Timer() as hide:
+            job = purge.soft_delete_user(author)
+        self.start_tracing(options)
+        longest = 0.0
+        started = time.perf_counter()
+        finished = False
+        while not finished:
+            batch_started = time.perf_counter()
+            finished = purge.run_batch(job, options["batch_size"])
+            longest = max(longest, time.perf_counter() - batch_started)
+        total = time.perf_counter() - started
+        peak = self.stop_tracing()
+        self.stdout.write("hidden from timelines in {:.1f} ms".format(hide.seconds * 1000))
+        self.stdout.write("{} batches, {} rows".format(job.batches, job.deleted_rows))
+        return total, longest, peak
+
+    def run_cascade(self, options):
+        author = self.populate(options)
+        self.start_tracing(options)
+        with Timer() as timer, transaction.atomic():
+            author.delete()
+        peak = self.stop_tracing()
+        return timer.seconds, timer.seconds, peak
+
+    def start_tracing(self, options):
+        if options["trace_memory"]:
+            tracemalloc.start()
+
+    def stop_tracing(self):
+        if not tracemalloc.is_tracing():
+            return None
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    def report(self, total, longest, peak):
+        self.stdout.write("total {:.2f} s".format(total))
+        self.stdout.write("longest write transaction {:.1f} ms".format(longest * 1000))
+        if peak is not None:
+            self.stdout.write("peak python memory {:.1f} MiB".format(peak / 2**20))
@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.bench import Timer
+from tweets.ranking import score
+
+
+def build_candidates(count, authors=500, seed=0):
+    """Synthetic candidate columns shaped like what ``ranking.rank`` feeds ``score``."""
+    rng = np.random.default_rng(seed)
+    author = rng.integers(0, authors, count)
+    return {
+        "ages": rng.uniform(0, settings.RANKING_WINDOW_SECONDS, count),
+        "likes": rng.zipf(2.0, count).astype(float) - 1,
+        "retweets": rng.zipf(2.5, count).astype(float) - 1,
+        "affinity": rng.poisson(1.0, authors)[author].astype(float),
+        "followed": rng.random(authors)[author] < 0.8,
+        "muted": rng.random(authors)[author] < 0.01,
+    }
+
+
+def score_loop(ages, likes, retweets, affinity, followed, muted):
+    """``score`` one candidate at a time, as a baseline."""
+    scores = []
+    for age, like, retweet, liked, follows, mute in zip(ages, likes, retweets, affinity, followed, muted):
+        if mute:
+            scores.append(-math.inf)
+            continue
+        engagement = (
+            1.0
+            + settings.RANKING_LIKE_WEIGHT * math.log1p(like)
+            + settings.RANKING_RETWEET_WEIGHT * math.log1p(retweet)
+        )
+        closeness = (
+            1.0 + settings.RANKING_AFFINITY_WEIGHT * math.log1p(liked) + settings.RANKING_FOLLOW_BONUS * follows
+        )
+        scores.append(engagement * closeness * 0.5 ** (age / settings.RANKING_HALF_LIFE_SECONDS))
+    return scores
+
+
+class Command(BaseCommand):
+    help = "Measure ranking score throughput: one NumPy pass against a per-candidate Python loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--candidates", type=int, nargs="+", default=[10000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for count in options["candidates"]:
+            columns = build_candidates(count)
+            plain = {name: column.tolist() for name, column in columns.items()}
+            numpy_s = self.best(lambda: np.argsort(-score(**columns)), options["repeat"])
+            loop_s = self.best(lambda: sorted(score_loop(**plain), reverse=True), options["repeat"])
+            self.stdout.write(
+                "{:>7} candidates: numpy {:7.2f} ms ({:,.0f}/s)  loop {:7.2f} ms ({:,.0f}/s)  speedup {:.1f}x".format(
+                    count, numpy_s * 1000, count / numpy_s, loop_s * 1000, count / loop_s, loop_s / numpy_s
+                )
+            )
+
+    def best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            with Timer() as timer:
+                func()
+            timings.append(timer.seconds)
+        return min(timings)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.utils import timezone
+
+from core.bench import Timer
+from tweets.models import Tweet
+
+User = get_user_model()
+
+# The per-tweet markup home.html used before tweet_card: an include plus {% url %} lookups per row.
+INCLUDE_LOOP = """{% for tweet in tweet_list %}
+<div class="alert alert-success" role="alert">
+    <p>作成者：<a href="{% url 'accounts:user_profile' tweet.user.username %}">{{tweet.user.username}}</a></p>
+    <p>作成日：{{tweet.created_at}}</p>
+    <p>内容：{{tweet.content}}</p>
+    <a href="{% url 'tweets:detail' tweet.pk %}">詳細</a>
+    {% include "tweets/like.html" %}
+</div>
+{% endfor %}"""
+
+CARD_LOOP = """{% load tweet_tags %}{% for tweet in tweet_list %}{% tweet_card tweet %}{% endfor %}"""
+
+
+def build_tweets(count, users=100):
+    """In-memory tweets with authors and like counts, so only rendering is measured."""
+    authors = [User(pk=i + 1, username="user{}".format(i)) for i in range(users)]
+    now = timezone.now()
+    tweets = []
+    for i in range(count):
+        tweet = Tweet(pk=i + 1, content="tweet number {}".format(i), created_at=now - timedelta(seconds=i))
+        tweet.user = authors[i % users]
+        tweet.like_count = i % 3
+        tweets.append(tweet)
+    liked_list = [tweet.pk for tweet in tweets[::4]]
+    return tweets, liked_list
+
+
+class Command(BaseCommand):
+    help = "Compare rendering a tweet list with per-row includes against the tweet_card tag."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        engine = engines["django"]
+        include_loop = engine.from_string(INCLUDE_LOOP)
+        card_loop = engine.from_string(CARD_LOOP)
+        for size in options["sizes"]:
+            tweets, liked_list = build_tweets(size)
+            context = {"tweet_list": tweets, "liked_list": liked_list}
+            include_ms = self.best(include_loop, context, options["repeat"])
+            card_ms = self.best(card_loop, context, options["repeat"])
+            self.stdout.write(
+                "{:>6} tweets: include {:8.1f} ms  card {:8.1f} ms  speedup {:.1f}x".format(
+                    size, include_ms, card_ms, include_ms / card_ms
+                )
+            )
+
+    def best(self, template, context, repeat):
+        timings = []
+        for _ in range(repeat):
+            with Timer() as timer:
+                template.render(context)
+            timings.append(timer.seconds * 1000)
+        return min(timings)
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from tweets.services import purge_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Delete bulk tweet idempotency keys older than TWEET_IDEMPOTENCY_KEY_TTL."
+
+    def handle(self, *args, **options):
+        self.stdout.write("deleted {} key(s)".format(purge_idempotency_keys()))
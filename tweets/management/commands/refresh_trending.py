@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tweets import trending
+from tweets.tasks import schedule_trending_refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute the trending leaderboard now, or start its periodic refresh on the task queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schedule", action="store_true", help="Enqueue the self-rescheduling refresh task.")
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            schedule_trending_refresh()
+            self.stdout.write("scheduled trending refresh")
+            return
+        top = trending.refresh()
+        self.stdout.write("ranked {} tweet(s)".format(len(top)))
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tweets", "0006_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingTweet",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("rank", models.PositiveIntegerField(unique=True)),
+                ("score", models.FloatField()),
+                ("refreshed_at", models.DateTimeField()),
+                (
+                    "tweet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to="tweets.tweet"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["rank"],
+            },
+        ),
+        migrations.CreateModel(
+            name="LikeBucket",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("bucket", models.DateTimeField(db_index=True)),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "tweet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to="tweets.tweet"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="likebucket",
+            constraint=models.UniqueConstraint(fields=("tweet", "bucket"), name="unique_like_bucket"),
+        ),
+    ]
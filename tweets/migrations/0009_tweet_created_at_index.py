@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tweets", "0008_tweet_deleted_at_purgejob"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="tweet",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("tweets", "0009_tweet_created_at_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TweetSignature",
+            fields=[
+                (
+                    "tweet",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="tweets.tweet",
+                    ),
+                ),
+                ("simhash", models.BigIntegerField()),
+                ("band0", models.IntegerField()),
+                ("band1", models.IntegerField()),
+                ("band2", models.IntegerField()),
+                ("band3", models.IntegerField()),
+                ("band4", models.IntegerField()),
+                ("band5", models.IntegerField()),
+                ("created_at", models.DateTimeField()),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="tweetsignature",
+            index=models.Index(fields=["band0", "created_at"], name="signature_band0"),
+        ),
+        migrations.AddIndex(
+            model_name="tweetsignature",
+            index=models.Index(fields=["band1", "created_at"], name="signature_band1"),
+        ),
+        migrations.AddIndex(
+            model_name="tweetsignature",
+            index=models.Index(fields=["band2", "created_at"], name="signature_band2"),
+        ),
+        migrations.AddIndex(
+            model_name="tweetsignature",
+            index=models.Index(fields=["band3", "created_at"], name="signature_band3"),
+        ),
+        migrations.AddIndex(
+            model_name="tweetsignature",
+            index=models.Index(fields=["band4", "created_at"], name="signature_band4"),
+        ),
+        migrations.AddIndex(
+            model_name="tweetsignature",
+            index=models.Index(fields=["band5", "created_at"], name="signature_band5"),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.13 on 2026-10-19 15:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tweets", "0011_like_created_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tweet",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="replies",
+                to="tweets.tweet",
+            ),
+        ),
+        migrations.AddField(
+            model_name="tweet",
+            name="path",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="tweet",
+            name="reply_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
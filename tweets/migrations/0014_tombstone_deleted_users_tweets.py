@@ -0,0 +1,34 @@
+# Generated by Django 4.1.13 on 2026-10-19 18:20
+
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Greatest
+
+
+def tombstone(apps, schema_editor):
+    """Give the tweets of accounts deleted so far the account's deleted_at, as soft_delete_user now does."""
+    Tweet = apps.get_model("tweets", "Tweet")
+    User = apps.get_model("accounts", "User")
+    tweets = Tweet.objects.filter(user__deleted_at__isnull=False, deleted_at__isnull=True)
+    # Tombstoned replies no longer count on their parents.
+    by_amount = defaultdict(list)
+    replies = tweets.filter(parent__isnull=False).values_list("parent_id").annotate(n=Count("pk")).order_by()
+    for parent_id, amount in replies:
+        by_amount[amount].append(parent_id)
+    for amount, parent_ids in by_amount.items():
+        Tweet.objects.filter(pk__in=parent_ids).update(reply_count=Greatest(F("reply_count") - amount, 0))
+    tweets.update(deleted_at=Subquery(User.objects.filter(pk=OuterRef("user_id")).values("deleted_at")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0010_mute_block"),
+        ("tweets", "0013_retweet_counts"),
+    ]
+
+    operations = [
+        migrations.RunPython(tombstone, migrations.RunPython.noop),
+    ]
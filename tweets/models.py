@@ -3,20 +3,149 @@ from django.db import models
 from accounts.models import User
 
 
+class TweetManager(models.Manager):
+    """Hide tombstoned tweets; purge jobs remove them later.
+
+    Deleting an account tombstones its tweets as well (see ``soft_delete_user``),
+    so this needs no join to the account.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Tweet(models.Model):
     content = models.CharField(max_length=150)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # Replies keep their place in the conversation when the tweet they answer is purged.
+    parent = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True, related_name="replies")
+    # Materialized path of a reply: the zero-padded ids from the conversation's first tweet down to the
+    # reply itself, each followed by "/". Empty for tweets that start a conversation (see thread_path).
+    path = models.CharField(max_length=255, blank=True, default="", db_index=True)
+    reply_count = models.PositiveIntegerField(default=0)
+    # Kept in step by the like and retweet views; read these instead of counting rows.
+    like_count = models.PositiveIntegerField(default=0)
+    retweet_count = models.PositiveIntegerField(default=0)
+
+    objects = TweetManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.content
 
+    @property
+    def thread_path(self):
+        return self.path or "{:010d}/".format(self.pk)
+
+    @property
+    def depth(self):
+        return self.thread_path.count("/") - 1
+
+    @property
+    def ancestor_ids(self):
+        return [int(segment) for segment in self.path.split("/")[:-2]]
+
 
 class Like(models.Model):
     tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name="liked_tweet")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="liked_user")
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["tweet", "user"], name="unique_like"),
         ]
+
+
+class Retweet(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="retweets")
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name="retweets")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "tweet"], name="unique_retweet"),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=64)
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_idempotency_key"),
+        ]
+
+
+class LikeBucket(models.Model):
+    """Number of likes a tweet gained during one TRENDING_BUCKET_SECONDS time slot."""
+
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name="+")
+    bucket = models.DateTimeField(db_index=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tweet", "bucket"], name="unique_like_bucket"),
+        ]
+
+
+class TrendingTweet(models.Model):
+    rank = models.PositiveIntegerField(unique=True)
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["rank"]
+
+
+class PurgeJob(models.Model):
+    """Progress of a background purge of a tombstoned tweet or account and everything that depends on it."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+
+    content_type = models.ForeignKey("contenttypes.ContentType", on_delete=models.CASCADE, related_name="+")
+    object_id = models.BigIntegerField()
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    deleted_rows = models.BigIntegerField(default=0)
+    batches = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return "{} #{} [{}]".format(self.content_type, self.object_id, self.status)
+
+
+class TweetSignature(models.Model):
+    """SimHash of a tweet's content, split into six bands for near-duplicate lookup (see duplicates.py)."""
+
+    tweet = models.OneToOneField(Tweet, on_delete=models.CASCADE, primary_key=True, related_name="+")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    simhash = models.BigIntegerField()
+    band0 = models.IntegerField()
+    band1 = models.IntegerField()
+    band2 = models.IntegerField()
+    band3 = models.IntegerField()
+    band4 = models.IntegerField()
+    band5 = models.IntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["band0", "created_at"], name="signature_band0"),
+            models.Index(fields=["band1", "created_at"], name="signature_band1"),
+            models.Index(fields=["band2", "created_at"], name="signature_band2"),
+            models.Index(fields=["band3", "created_at"], name="signature_band3"),
+            models.Index(fields=["band4", "created_at"], name="signature_band4"),
+            models.Index(fields=["band5", "created_at"], name="signature_band5"),
+        ]
@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.utils import timezone
+
+from core.cache import namespace
+from outbox.services import Type, emit
+
+from .models import Like, PurgeJob, Retweet, Tweet
+from .services import release_counts, unlink_reply
+
+# Rows that are counted on another tweet: the column pointing at it, the counter, and which rows still count.
+COUNTERS = {
+    Like: ("tweet_id", "like_count", {}),
+    Retweet: ("tweet_id", "retweet_count", {}),
+    # Tombstoned replies were already taken off their parent by unlink_reply().
+    Tweet: ("parent_id", "reply_count", {"parent__isnull": False, "deleted_at__isnull": True}),
+}
+
+
+def _release_counters(model, ids):
+    """Take the ``model`` rows ``ids`` off the counters of the tweets they point at, before deleting them."""
+    if model not in COUNTERS:
+        return
+    column, field, counted = COUNTERS[model]
+    rows = model._base_manager.filter(pk__in=ids, **counted)
+    counts = dict(rows.values_list(column).annotate(n=models.Count("pk")).order_by())
+    if counts:
+        release_counts(field, counts)
+
+
+def _cascades(model):
+    # Same candidates Django's deletion Collector walks, including hidden ("+") relations.
+    return [
+        field
+        for field in model._meta.get_fields(include_hidden=True)
+        if field.auto_created
+        and not field.concrete
+        and (field.one_to_one or field.one_to_many)
+        and field.on_delete is models.CASCADE
+    ]
+
+
+def _purge_dependents(model, pks, budget):
+    """Delete at most ``budget`` rows that cascade from the ``model`` rows ``pks``.
+
+    Returns ``(deleted, finished)``. Children that have dependents of their own
+    are emptied (recursively, in batches) before they are removed, so no single
+    DELETE has to collect an unbounded tree of rows.
+    """
+    deleted = 0
+    for relation in _cascades(model):
+        child = relation.related_model
+        rows = child._base_manager.filter(**{relation.field.name + "__in": pks})
+        while True:
+            limit = budget - deleted
+            if limit <= 0:
+                return deleted, False
+            ids = list(rows.values_list("pk", flat=True)[:limit])
+            if not ids:
+                break
+            last = len(ids) < limit
+            if _cascades(child):
+                count, finished = _purge_dependents(child, ids, limit)
+                deleted += count
+                if not finished:
+                    return deleted, False
+                if count:
+                    # Their dependents used part of the budget; the rest of the children wait for the next pass.
+                    last = last and len(ids) <= limit - count
+                    ids = ids[: limit - count]
+            if ids:
+                _release_counters(child, ids)
+                count, _ = child._base_manager.filter(pk__in=ids).delete()
+                deleted += count
+            if last:
+                break
+    return deleted, True
+
+
+def run_batch(job, batch_size=None):
+    """Delete one bounded batch for ``job`` in its own short transaction; return True when the purge is done."""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    model = job.content_type.model_class()
+    with transaction.atomic():
+        deleted, finished = _purge_dependents(model, [job.object_id], batch_size)
+        if finished:
+            count, _ = model._base_manager.filter(pk=job.object_id).delete()
+            deleted += count
+        job.deleted_rows += deleted
+        job.batches += 1
+        job.status = PurgeJob.Status.DONE if finished else PurgeJob.Status.RUNNING
+        job.finished_at = timezone.now() if finished else None
+        job.save(update_fields=["deleted_rows", "batches", "status", "finished_at", "updated_at"])
+    return finished
+
+
+def schedule(instance):
+    from .tasks import run_purge
+
+    job = PurgeJob.objects.create(content_type=ContentType.objects.get_for_model(instance), object_id=instance.pk)
+    run_purge.enqueue(job_id=job.pk)
+    return job
+
+
+def soft_delete_tweet(tweet):
+    """Hide ``tweet`` right away and leave the actual deletion to a background purge."""
+    tweet.deleted_at = timezone.now()
+    with transaction.atomic():
+        Tweet.all_objects.filter(pk=tweet.pk).update(deleted_at=tweet.deleted_at)
+        emit(Type.TWEET_DELETED, tweet_id=tweet.pk, user_id=tweet.user_id, created_at=tweet.created_at.isoformat())
+        unlink_reply(tweet)
+        job = schedule(tweet)
+    namespace("tweets").delete(tweet.pk)
+    if tweet.parent_id:
+        namespace("tweets").delete(tweet.parent_id)
+    return job
+
+
+def soft_delete_user(user):
+    """Deactivate ``user``, hide their tweets immediately and purge the account in the background."""
+    user.deleted_at = timezone.now()
+    user.is_active = False
+    with transaction.atomic():
+        user.save(update_fields=["deleted_at", "is_active"])
+        # Tombstone the tweets too, so reads filter on the tweet row alone instead of joining the account.
+        tweets = Tweet.all_objects.filter(user=user, deleted_at__isnull=True)
+        _release_counters(Tweet, tweets.values("pk"))
+        tweets.update(deleted_at=user.deleted_at)
+        emit(Type.USER_DELETED, user_id=user.pk)
+        job = schedule(user)
+    # Their tweets and follow counts are spread over many keys; drop them all at once.
+    namespace("tweets").invalidate()
+    namespace("counts").invalidate()
+    return job
@@ -0,0 +1,259 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from accounts.exclusions import get_exclusions
+from core.cache import namespace
+from outbox.services import Type, emit_many
+
+from . import duplicates
+from .forms import TweetForm
+from .models import IdempotencyKey, Tweet
+
+
+class BulkCreateError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def validate_tweets(items):
+    """Run every item through ``TweetForm``; raise ``BulkCreateError`` with per-index errors."""
+    if not isinstance(items, list) or not items:
+        raise BulkCreateError({"tweets": ["ツイートを1件以上指定してください。"]})
+    if len(items) > settings.TWEET_BULK_CREATE_MAX:
+        raise BulkCreateError(
+            {"tweets": ["一度に投稿できるのは{}件までです。".format(settings.TWEET_BULK_CREATE_MAX)]}
+        )
+    errors = {}
+    cleaned = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[str(index)] = {"__all__": ["不正な形式です。"]}
+            continue
+        key = item.get("idempotency_key")
+        if key is not None and (not isinstance(key, str) or not 0 < len(key) <= 64):
+            errors[str(index)] = {"idempotency_key": ["64文字以内の文字列を指定してください。"]}
+            continue
+        form = TweetForm(data={"content": item.get("content")})
+        if not form.is_valid():
+            errors[str(index)] = form.errors.get_json_data()
+            continue
+        cleaned.append((form.cleaned_data["content"], key))
+    if errors:
+        raise BulkCreateError(errors)
+    return cleaned
+
+
+def bulk_create_tweets(user, items):
+    """Create a batch of tweets for ``user`` in one transaction and return their ids in input order.
+
+    Items carrying an ``idempotency_key`` that was already used by ``user``
+    within ``TWEET_IDEMPOTENCY_KEY_TTL`` are not created again; the id of the
+    tweet created the first time is returned instead.
+    """
+    cleaned = validate_tweets(items)
+    try:
+        return _bulk_create(user, cleaned)
+    except IntegrityError:
+        # A concurrent request claimed one of the keys; everything it created is now visible.
+        return _bulk_create(user, cleaned)
+
+
+def _bulk_create(user, cleaned):
+    keys = {key for _, key in cleaned if key is not None}
+    with transaction.atomic():
+        known = {}
+        if keys:
+            cutoff = timezone.now() - timedelta(seconds=settings.TWEET_IDEMPOTENCY_KEY_TTL)
+            IdempotencyKey.objects.filter(user=user, key__in=keys, created_at__lt=cutoff).delete()
+            known = dict(IdempotencyKey.objects.filter(user=user, key__in=keys).values_list("key", "tweet_id"))
+
+        pending = []
+        indexes = []
+        seen = set(known)
+        for index, (content, key) in enumerate(cleaned):
+            if key is None or key not in seen:
+                pending.append((Tweet(user=user, content=content), key))
+                indexes.append(index)
+                if key is not None:
+                    seen.add(key)
+        hashes = reject_near_duplicates(user, [tweet.content for tweet, _ in pending], indexes)
+        created = Tweet.objects.bulk_create([tweet for tweet, _ in pending])
+        duplicates.sign(created, hashes)
+        emit_many(
+            Type.TWEET_CREATED,
+            [{"tweet_id": tweet.pk, "user_id": user.pk, "content": tweet.content} for tweet in created],
+        )
+        IdempotencyKey.objects.bulk_create(
+            [IdempotencyKey(user=user, key=key, tweet=tweet) for tweet, key in pending if key is not None]
+        )
+        known.update({key: tweet.pk for tweet, key in pending if key is not None})
+
+    if created:
+        forget_high_water_mark()
+    ids = []
+    fresh = iter(tweet.pk for tweet, key in pending if key is None)
+    for _, key in cleaned:
+        ids.append(known[key] if key is not None else next(fresh))
+    return ids, created
+
+
+def reject_near_duplicates(user, contents, indexes):
+    """Raise ``BulkCreateError`` for any of ``contents`` that is spam; otherwise return their SimHashes."""
+    hashes = duplicates.simhashes(contents)
+    errors = {}
+    accepted = []
+    for index, content, simhash in zip(indexes, contents, hashes):
+        if duplicates.is_spam(content, simhash, user.pk, accepted):
+            errors[str(index)] = {"content": [duplicates.MESSAGE]}
+        else:
+            accepted.append((simhash, user.pk))
+    if errors:
+        raise BulkCreateError(errors)
+    return hashes
+
+
+def purge_idempotency_keys():
+    cutoff = timezone.now() - timedelta(seconds=settings.TWEET_IDEMPOTENCY_KEY_TTL)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def get_tweet(pk):
+    """Visible tweet ``pk`` with its author's username, or ``None``, from the cache when possible.
+
+    Only the username of the author is loaded, so no password hash or email
+    ends up in the shared cache; renaming a user invalidates the namespace.
+    """
+    tweets = namespace("tweets")
+    tweet = tweets.get_or_set(
+        pk,
+        lambda: Tweet.objects.select_related("user")
+        .only(*[field.name for field in Tweet._meta.concrete_fields], "user__username")
+        .filter(pk=pk)
+        .first(),
+    )
+    if tweet is None:
+        # Don't remember misses: the pk may belong to a tweet that is about to be created.
+        tweets.delete(pk)
+    return tweet
+
+
+def forget_tweet(pk):
+    namespace("tweets").delete(pk)
+
+
+def link_reply(tweet):
+    """Give a just-inserted reply its path and count it on its parent; call inside the creating transaction."""
+    tweet.path = "{}{:010d}/".format(tweet.parent.thread_path, tweet.pk)
+    Tweet.all_objects.filter(pk=tweet.pk).update(path=tweet.path)
+    bump_count(tweet.parent_id, "reply_count", 1)
+
+
+def unlink_reply(tweet):
+    """Stop counting a deleted reply on its parent."""
+    if tweet.parent_id:
+        bump_count(tweet.parent_id, "reply_count", -1)
+
+
+def thread(tweet, after=None, limit=None):
+    """``(replies, next_cursor)``: a page of the replies below ``tweet``, depth first, in one query.
+
+    Every path in the conversation starts with ``tweet.thread_path`` and sorts
+    depth first, so the page is one range scan of the path index (a range, not
+    LIKE, which not every backend can run on an index). ``after`` is the path
+    of the last reply of the previous page.
+    """
+    limit = limit or settings.TWEET_THREAD_PAGE_SIZE
+    prefix = tweet.thread_path
+    start = after if after and after.startswith(prefix) else prefix
+    replies = list(
+        Tweet.objects.filter(path__gt=start, path__lt=prefix + "~")
+        .select_related("user")
+        .order_by("path")[: limit + 1]
+    )
+    next_cursor = replies[limit - 1].path if len(replies) > limit else None
+    return replies[:limit], next_cursor
+
+
+def ancestors(tweet):
+    """The tweets ``tweet`` replies to, from the start of the conversation down, in one query."""
+    ids = tweet.ancestor_ids
+    if not ids:
+        return []
+    found = Tweet.objects.select_related("user").in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
+
+
+def bump_count(tweet_id, field, delta):
+    """Move one of the tweet's denormalized counters; call in the transaction that adds or removes what it counts."""
+    tweets = Tweet.all_objects.filter(pk=tweet_id)
+    if delta < 0:
+        tweets = tweets.filter(**{field + "__gte": -delta})
+    tweets.update(**{field: F(field) + delta})
+
+
+def release_counts(field, counts):
+    """Take ``{tweet id: n}`` off one of the denormalized counters, one UPDATE per distinct ``n``.
+
+    For rows removed in bulk (an account purge) rather than one at a time by
+    the views; counters never go below zero.
+    """
+    by_amount = defaultdict(list)
+    for tweet_id, amount in counts.items():
+        by_amount[amount].append(tweet_id)
+    for amount, tweet_ids in by_amount.items():
+        Tweet.all_objects.filter(pk__in=tweet_ids).update(**{field: Greatest(F(field) - amount, 0)})
+    namespace("tweets").delete_many(counts)
+    if field == "like_count":
+        namespace("counts").delete_many(["likes:{}".format(tweet_id) for tweet_id in counts])
+
+
+def _like_count(tweet_id):
+    return Tweet.all_objects.filter(pk=tweet_id).values_list("like_count", flat=True).first() or 0
+
+
+def like_count(tweet_id):
+    return namespace("counts").get_or_set("likes:{}".format(tweet_id), lambda: _like_count(tweet_id))
+
+
+def refresh_like_count(tweet_id):
+    """Re-read the count after a like or unlike and store the result for readers."""
+    count = _like_count(tweet_id)
+    namespace("counts").set("likes:{}".format(tweet_id), count)
+    return count
+
+
+HIGH_WATER_KEY = "tweets:high_water"
+
+
+def high_water_mark():
+    """Largest tweet id so far; cached until the next tweet is created."""
+    return cache.get_or_set(HIGH_WATER_KEY, lambda: Tweet.all_objects.aggregate(top=Max("pk"))["top"] or 0, None)
+
+
+def forget_high_water_mark():
+    cache.delete(HIGH_WATER_KEY)
+
+
+def new_tweets_since(user, since):
+    """``(high_water, count, ids)`` of tweets newer than ``since`` shown to ``user``; no rows read when nothing is new.
+
+    Tweets by accounts ``user`` muted or blocked, or that blocked them, are left
+    out of both the ids and the count, as they are from the timeline.
+    """
+    high_water = high_water_mark()
+    if since >= high_water:
+        return high_water, 0, []
+    hidden = get_exclusions(user.pk).hidden_ids()
+    newer = Tweet.objects.filter(pk__gt=since).exclude(user_id__in=hidden).order_by("-pk")
+    ids = list(newer.values_list("pk", flat=True)[: settings.NEW_TWEETS_MAX_IDS])
+    count = len(ids) if len(ids) < settings.NEW_TWEETS_MAX_IDS else newer.count()
+    return high_water, count, ids
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.utils import timezone
+
+from taskqueue.registry import task
+
+from . import purge, trending
+from .models import PurgeJob
+
+
+def schedule_trending_refresh(delay=0):
+    slot = int(timezone.now().timestamp() + delay) // settings.TRENDING_REFRESH_SECONDS
+    return refresh_trending.enqueue(idempotency_key="tweets.refresh_trending:{}".format(slot), delay=delay)
+
+
+@task(name="tweets.refresh_trending")
+def refresh_trending():
+    trending.refresh()
+    schedule_trending_refresh(delay=settings.TRENDING_REFRESH_SECONDS)
+
+
+@task(name="tweets.purge")
+def run_purge(job_id):
+    job = PurgeJob.objects.select_related("content_type").get(pk=job_id)
+    if job.status == PurgeJob.Status.DONE:
+        return
+    if not purge.run_batch(job):
+        run_purge.enqueue(job_id=job_id)
@@ -0,0 +1,82 @@
+from urllib.parse import quote
+
+from django import template
+from django.template.base import render_value_in_context
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.http import RFC3986_SUBDELIMS
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+_PK = 918273645
+_USERNAME = "__username__"
+
+
+class _URLTemplates:
+    """Reverse each route once per render and fill in the argument with string concatenation afterwards."""
+
+    def __init__(self):
+        self.detail = reverse("tweets:detail", args=[_PK]).split(str(_PK))
+        self.like = reverse("tweets:like", args=[_PK]).split(str(_PK))
+        self.unlike = reverse("tweets:unlike", args=[_PK]).split(str(_PK))
+        self.profile = reverse("accounts:user_profile", args=[_USERNAME]).split(_USERNAME)
+
+    @staticmethod
+    def fill(parts, value):
+        return "{}{}{}".format(parts[0], value, parts[1])
+
+    def user_profile(self, username):
+        # Same quoting reverse() applies to path arguments.
+        return self.fill(self.profile, quote(username, safe=RFC3986_SUBDELIMS + "/~:@"))
+
+
+def _render_state(context):
+    state = context.render_context.get("tweet_card")
+    if state is None:
+        liked = context.get("liked_list") or ()
+        state = context.render_context["tweet_card"] = (_URLTemplates(), set(liked))
+    return state
+
+
+@register.simple_tag(takes_context=True)
+def tweet_card(context, tweet):
+    """Render one timeline card; equivalent to the markup of ``tweets/like.html`` plus the tweet body.
+
+    URLs are reversed once per render and ``liked_list`` is turned into a set once,
+    so the per-tweet cost is string formatting only.
+    """
+    urls, liked = _render_state(context)
+    if tweet.id in liked:
+        button = format_html(
+            '<button id="tweet-{}" onclick="changeLike(id)" data-url="{}">いいね解除</button>',
+            tweet.id,
+            urls.fill(urls.unlike, tweet.id),
+        )
+    else:
+        button = format_html(
+            '<button id="tweet-{}" onclick="changeLike(id)" data-url="{}">いいね</button>',
+            tweet.id,
+            urls.fill(urls.like, tweet.id),
+        )
+    return format_html(
+        '<div class="alert alert-success" role="alert">\n'
+        '<p>作成者：<a href="{}">{}</a></p>\n'
+        "<p>作成日：{}</p>\n"
+        "<p>内容：{}</p>\n"
+        '<a href="{}">詳細</a>\n'
+        "{}\n"
+        '<span class="count_{}">{}</span><a>いいね</a>\n'
+        '<span class="retweets_{}">{}</span><a>リツイート</a>\n'
+        "</div>",
+        urls.user_profile(tweet.user.username),
+        tweet.user.username,
+        mark_safe(render_value_in_context(tweet.created_at, context)),
+        tweet.content,
+        urls.fill(urls.detail, tweet.pk),
+        button,
+        tweet.id,
+        tweet.like_count,
+        tweet.id,
+        tweet.retweet_count,
+    )
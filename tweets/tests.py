@@ -1,9 +1,35 @@
+import json
+import pickle
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import numpy as np
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Block, FriendShip, Mute
+from core.cache import namespace
+from core.querybudget import QueryBudgetMixin
+from taskqueue.models import Task
+from taskqueue.worker import run_pending
 
-from .models import Like, Tweet
+from . import duplicates, ranking, trending
+from .admin import LikeAdmin
+from .models import IdempotencyKey, Like, LikeBucket, PurgeJob, Retweet, TrendingTweet, Tweet, TweetSignature
+from .purge import run_batch, soft_delete_user
+from .services import link_reply, purge_idempotency_keys, thread
+from .tasks import schedule_trending_refresh
 
 User = get_user_model()
 
@@ -23,6 +49,12 @@ class TestHomeView(TestCase):
             response.context["tweet_list"], Tweet.objects.order_by("-created_at"), Tweet.objects.all()
         )
 
+    def test_num_queries(self):
+        Tweet.objects.create(user=self.user, content="test")
+        # session, user, mutes and blocks, tweets, retweets, liked tweet ids
+        with self.assertNumQueries(6):
+            self.client.get(self.url)
+
 
 class TestTweetCreateView(TestCase):
     def setUp(self):
@@ -45,6 +77,13 @@ class TestTweetCreateView(TestCase):
         )
         self.assertTrue(Tweet.objects.filter(content=data["content"]).exists())
 
+    def test_num_queries(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+        # session, user, savepoint, insert, signature, outbox event, release
+        with self.assertNumQueries(7):
+            self.client.post(self.url, {"content": "test"})
+
     def test_failure_post_with_empty_content(self):
         empty_data = {"content": ""}
         response = self.client.post(self.url, empty_data)
@@ -65,6 +104,197 @@ class TestTweetCreateView(TestCase):
         self.assertFalse(Tweet.objects.exists())
 
 
+class TestNewTweetsView(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.tweets = [Tweet.objects.create(user=self.user, content=str(i)) for i in range(3)]
+        self.url = reverse("tweets:new")
+
+    def test_newer_ids_and_count(self):
+        response = self.client.get(self.url, {"since": self.tweets[0].pk})
+        self.assertEqual(response.json()["count"], 2)
+        self.assertEqual(response.json()["ids"], [self.tweets[2].pk, self.tweets[1].pk])
+        self.assertEqual(response.json()["high_water"], self.tweets[2].pk)
+
+    def test_idle_poll_reads_no_rows(self):
+        self.client.get(self.url, {"since": self.tweets[2].pk})
+        # session and user only; the high-water mark comes from the cache
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"since": self.tweets[2].pk})
+        self.assertEqual(response.json()["count"], 0)
+
+    def test_new_tweet_moves_the_high_water_mark(self):
+        self.client.get(self.url, {"since": self.tweets[2].pk})
+        self.client.post(reverse("tweets:create"), {"content": "new"})
+        self.client.post(
+            reverse("tweets:bulk_create"),
+            json.dumps({"tweets": [{"content": "bulk"}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(self.client.get(self.url, {"since": self.tweets[2].pk}).json()["count"], 2)
+
+    def test_muted_and_blocked_accounts_are_left_out(self):
+        muted = User.objects.create_user(username="muted", password="testpassword")
+        blocker = User.objects.create_user(username="blocker", password="testpassword")
+        Mute.objects.create(user=self.user, target=muted)
+        Block.objects.create(user=blocker, target=self.user)
+        Tweet.objects.create(user=muted, content="muted")
+        Tweet.objects.create(user=blocker, content="blocker")
+        latest = Tweet.objects.create(user=self.user, content="mine")
+        response = self.client.get(self.url, {"since": self.tweets[2].pk})
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(response.json()["ids"], [latest.pk])
+
+    def test_long_poll_times_out(self):
+        with self.settings(NEW_TWEETS_LONG_POLL_TIMEOUT=0.05, NEW_TWEETS_POLL_INTERVAL=0.01):
+            response = self.client.get(self.url, {"since": self.tweets[2].pk, "wait": 10})
+        self.assertEqual(response.json()["count"], 0)
+
+    def test_login_required_and_bad_cursor(self):
+        self.assertEqual(self.client.get(self.url, {"since": "x"}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class TestTweetBulkCreateView(TestCase):
+    def setUp(self):
+        self.url = reverse("tweets:bulk_create")
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+
+    def post(self, tweets):
+        return self.client.post(self.url, json.dumps({"tweets": tweets}), content_type="application/json")
+
+    def test_success_post(self):
+        response = self.post([{"content": "first"}, {"content": "second", "idempotency_key": "k1"}])
+        self.assertEqual(response.status_code, 201)
+        ids = response.json()["ids"]
+        self.assertEqual(
+            list(Tweet.objects.filter(pk__in=ids).order_by("pk").values_list("content", flat=True)),
+            ["first", "second"],
+        )
+
+    def test_retry_with_same_key_does_not_duplicate(self):
+        first = self.post([{"content": "hello", "idempotency_key": "k1"}]).json()
+        second = self.post(
+            [{"content": "hello", "idempotency_key": "k1"}, {"content": "new", "idempotency_key": "k2"}]
+        )
+        self.assertEqual(second.json()["ids"][0], first["ids"][0])
+        self.assertEqual(second.json()["created"], 1)
+        self.assertEqual(Tweet.objects.count(), 2)
+
+    def test_duplicate_key_in_one_batch(self):
+        response = self.post([{"content": "a", "idempotency_key": "k1"}, {"content": "a", "idempotency_key": "k1"}])
+        ids = response.json()["ids"]
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(Tweet.objects.count(), 1)
+
+    def test_num_queries_do_not_grow_with_batch_size(self):
+        # session, user, savepoint, expired key purge, key lookup, tweet insert, signatures, outbox events,
+        # key insert, release
+        with self.assertNumQueries(10):
+            self.post([{"content": str(i), "idempotency_key": str(i)} for i in range(50)])
+
+    def test_failure_post_with_invalid_item(self):
+        response = self.post([{"content": "ok"}, {"content": "a" * 151}, {"content": ""}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()["errors"]), {"1", "2"})
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_failure_post_with_broken_json(self):
+        response = self.client.post(self.url, "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_purge_expired_keys(self):
+        self.post([{"content": "hello", "idempotency_key": "k1"}])
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(purge_idempotency_keys(), 1)
+        self.post([{"content": "hello", "idempotency_key": "k1"}])
+        self.assertEqual(Tweet.objects.count(), 2)
+
+
+class TestNearDuplicates(TestCase):
+    SPAM = "今だけ限定セール!フォロワー全員にプレゼント実施中、詳しくはプロフィールのリンクから https://a.example/1"
+    VARIANT = (
+        "今だけ限定セール!!フォロワー全員にプレゼント実施中、詳しくはプロフィールのリンクから https://b.example/2"
+    )
+    OTHER = "今日は天気が良いので近所の公園まで散歩に行ってきました。桜がきれいでした"
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+
+    def post(self, content):
+        return self.client.post(reverse("tweets:create"), {"content": content})
+
+    def test_signatures(self):
+        spam, variant, other = duplicates.simhashes([self.SPAM, self.VARIANT, self.OTHER])
+        self.assertLessEqual(duplicates.distance(spam, variant), settings.NEAR_DUPLICATE_MAX_DISTANCE)
+        self.assertGreater(duplicates.distance(spam, other), settings.NEAR_DUPLICATE_MAX_DISTANCE)
+        self.assertEqual(duplicates.simhashes([self.OTHER])[0], other)
+        self.assertEqual(len(duplicates.simhashes([])), 0)
+
+    def test_signature_memory_stays_linear(self):
+        texts = [self.OTHER * 2] * 1000
+        tracemalloc.start()
+        try:
+            hashes = duplicates.simhashes(texts)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(int(hashes[0]), 0x48690612B32FCF20)
+        # a shingles x 64 vote matrix took about 1 KiB per character
+        self.assertLess(peak, 100 * sum(len(text) for text in texts))
+
+    def test_same_user_repost_is_rejected(self):
+        self.assertEqual(self.post(self.SPAM).status_code, 302)
+        response = self.post(self.VARIANT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["form"].errors["content"], [duplicates.MESSAGE])
+        self.assertEqual(self.post(self.OTHER).status_code, 302)
+        self.assertEqual(Tweet.objects.count(), 2)
+
+    def test_copies_across_accounts_are_capped(self):
+        for i in range(settings.NEAR_DUPLICATE_MAX_COPIES):
+            bot = User.objects.create_user(username="bot{}".format(i))
+            self.client.force_login(bot)
+            self.assertEqual(self.post(self.SPAM).status_code, 302)
+        self.client.force_login(self.user)
+        self.assertEqual(self.post(self.VARIANT).status_code, 200)
+
+    def test_old_and_short_tweets_do_not_count(self):
+        self.post(self.SPAM)
+        self.assertEqual(self.post("おはよう").status_code, 302)
+        self.assertEqual(self.post("おはよう").status_code, 302)
+        TweetSignature.objects.update(created_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.post(self.VARIANT).status_code, 302)
+
+    def test_lookup_reads_one_query(self):
+        (simhash,) = duplicates.simhashes([self.SPAM])
+        with self.assertNumQueries(1):
+            duplicates.is_spam(self.SPAM, simhash, self.user.pk)
+
+    def test_bulk_create_rejects_copies_in_one_batch(self):
+        response = self.client.post(
+            reverse("tweets:bulk_create"),
+            json.dumps({"tweets": [{"content": self.SPAM}, {"content": self.OTHER}, {"content": self.VARIANT}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], {"2": {"content": [duplicates.MESSAGE]}})
+        self.assertFalse(Tweet.objects.exists())
+
+    def test_backfill(self):
+        tweets = Tweet.objects.bulk_create([Tweet(user=self.user, content=self.OTHER + str(i)) for i in range(5)])
+        self.post(self.SPAM)
+        call_command("backfill_signatures", batch_size=2, stdout=StringIO())
+        self.assertEqual(TweetSignature.objects.count(), 6)
+        signature = TweetSignature.objects.get(tweet=tweets[0])
+        (simhash,) = duplicates.simhashes([tweets[0].content])
+        self.assertEqual(signature.simhash, duplicates.to_signed(simhash))
+
+
 class TestTweetDetailView(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -80,6 +310,418 @@ class TestTweetDetailView(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.context["tweet"], self.tweet)
 
+    def test_num_queries(self):
+        # session, user, tweet (its author is the request user), like count, retweeted, replies, liked tweet ids
+        with self.assertNumQueries(7):
+            self.client.get(reverse("tweets:detail", kwargs={"pk": self.tweet.pk}))
+        # the tweet and its like count now come from the cache
+        with self.assertNumQueries(5):
+            self.client.get(reverse("tweets:detail", kwargs={"pk": self.tweet.pk}))
+
+    def test_cached_like_count_follows_likes(self):
+        url = reverse("tweets:detail", kwargs={"pk": self.tweet.pk})
+        self.assertEqual(self.client.get(url).context["like_count"], 0)
+        self.client.post(reverse("tweets:like", kwargs={"pk": self.tweet.pk}))
+        self.assertEqual(self.client.get(url).context["like_count"], 1)
+        self.client.post(reverse("tweets:unlike", kwargs={"pk": self.tweet.pk}))
+        self.assertEqual(self.client.get(url).context["like_count"], 0)
+
+    def test_cached_tweet_holds_no_credentials(self):
+        self.client.get(reverse("tweets:detail", kwargs={"pk": self.tweet.pk}))
+        cache = caches["default"]
+        key = cache.make_and_validate_key(namespace("tweets").key(self.tweet.pk))
+        _, local = cache.local.entries[key]
+        for pickled in (local, pickle.dumps(cache.shared.get(key))):
+            self.assertNotIn(b"password", pickled)
+            self.assertNotIn(b"pbkdf2", pickled)
+            self.assertNotIn(b"test@example.com", pickled)
+
+    def test_cached_tweet_follows_renames(self):
+        url = reverse("tweets:detail", kwargs={"pk": self.tweet.pk})
+        self.client.get(url)
+        self.user.username = "renamed"
+        self.user.save()
+        self.assertEqual(self.client.get(url).context["tweet"].user.username, "renamed")
+
+    def test_deleted_tweet_is_not_served_from_cache(self):
+        url = reverse("tweets:detail", kwargs={"pk": self.tweet.pk})
+        self.client.get(url)
+        self.client.post(reverse("tweets:delete", kwargs={"pk": self.tweet.pk}))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class TestReplies(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.root = Tweet.objects.create(user=self.user, content="root")
+
+    def reply(self, parent, content):
+        self.client.post(reverse("tweets:reply", kwargs={"pk": parent.pk}), {"content": content})
+        return Tweet.objects.get(content=content)
+
+    def test_reply_path_and_count(self):
+        first = self.reply(self.root, "first")
+        nested = self.reply(first, "nested")
+        self.assertEqual(first.path, "{:010d}/{:010d}/".format(self.root.pk, first.pk))
+        self.assertEqual(nested.path, first.path + "{:010d}/".format(nested.pk))
+        self.assertEqual(nested.ancestor_ids, [self.root.pk, first.pk])
+        self.root.refresh_from_db()
+        self.assertEqual(self.root.reply_count, 1)
+
+    def test_thread_is_depth_first_in_one_query(self):
+        first = self.reply(self.root, "first")
+        second = self.reply(self.root, "second")
+        nested = self.reply(first, "nested")
+        with self.assertNumQueries(1):
+            replies, next_cursor = thread(self.root)
+        self.assertEqual(replies, [first, nested, second])
+        self.assertIsNone(next_cursor)
+        self.assertEqual(thread(first)[0], [nested])
+
+        replies, next_cursor = thread(self.root, limit=2)
+        self.assertEqual(replies, [first, nested])
+        self.assertEqual(thread(self.root, after=next_cursor, limit=2), ([second], None))
+
+    def test_detail_shows_conversation(self):
+        first = self.reply(self.root, "first")
+        nested = self.reply(first, "nested")
+        response = self.client.get(reverse("tweets:detail", kwargs={"pk": self.root.pk}))
+        self.assertEqual(response.context["reply_list"], [first, nested])
+        self.assertEqual([reply.indent for reply in response.context["reply_list"]], [0, 1])
+        response = self.client.get(reverse("tweets:detail", kwargs={"pk": nested.pk}))
+        self.assertEqual(response.context["ancestor_list"], [self.root, first])
+
+    def test_deleted_reply_is_uncounted(self):
+        first = self.reply(self.root, "first")
+        self.client.post(reverse("tweets:delete", kwargs={"pk": first.pk}))
+        self.root.refresh_from_db()
+        self.assertEqual(self.root.reply_count, 0)
+        self.assertEqual(thread(self.root)[0], [])
+
+    def test_detail_shows_replies_below_a_deleted_reply(self):
+        first = self.reply(self.root, "first")
+        nested = self.reply(first, "nested")
+        self.client.post(reverse("tweets:delete", kwargs={"pk": first.pk}))
+        self.root.refresh_from_db()
+        self.assertEqual(self.root.reply_count, 0)
+        response = self.client.get(reverse("tweets:detail", kwargs={"pk": self.root.pk}))
+        self.assertEqual(response.context["reply_list"], [nested])
+
+    def test_purged_parent_keeps_replies(self):
+        first = self.reply(self.root, "first")
+        self.client.post(reverse("tweets:delete", kwargs={"pk": self.root.pk}))
+        run_batch(PurgeJob.objects.get())
+        first.refresh_from_db()
+        self.assertIsNone(first.parent_id)
+
+    def test_max_depth(self):
+        parent = self.root
+        with self.settings(TWEET_REPLY_MAX_DEPTH=2):
+            parent = self.reply(parent, "1")
+            parent = self.reply(parent, "2")
+            response = self.client.post(reverse("tweets:reply", kwargs={"pk": parent.pk}), {"content": "3"})
+        self.assertEqual(response.context["form"].non_field_errors(), ["これ以上深い返信はできません。"])
+
+
+class TestRetweets(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.author = User.objects.create_user(username="author")
+        self.tweet = Tweet.objects.create(user=self.author, content="popular")
+        Tweet.objects.filter(pk=self.tweet.pk).update(created_at=timezone.now() - timedelta(hours=1))
+
+    def retweet_as(self, *usernames):
+        for username in usernames:
+            user = User.objects.create_user(username=username)
+            self.client.force_login(user)
+            self.client.post(reverse("tweets:retweet", kwargs={"pk": self.tweet.pk}))
+        self.client.force_login(self.user)
+
+    def test_retweet_and_undo(self):
+        url = reverse("tweets:retweet", kwargs={"pk": self.tweet.pk})
+        self.assertRedirects(self.client.post(url), reverse("tweets:detail", kwargs={"pk": self.tweet.pk}))
+        self.client.post(url)
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.retweet_count, 1)
+        response = self.client.get(reverse("tweets:detail", kwargs={"pk": self.tweet.pk}))
+        self.assertTrue(response.context["is_retweeted"])
+        self.assertContains(response, "リツイート：1")
+
+        self.client.post(reverse("tweets:unretweet", kwargs={"pk": self.tweet.pk}))
+        self.client.post(reverse("tweets:unretweet", kwargs={"pk": self.tweet.pk}))
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.retweet_count, 0)
+        self.assertFalse(Retweet.objects.exists())
+
+    def test_timeline_collapses_retweets(self):
+        self.retweet_as("a", "b", "c")
+        fresh = Tweet.objects.create(user=self.author, content="fresh")
+        response = self.client.get(reverse("tweets:home"))
+        entries = response.context["entry_list"]
+        self.assertEqual([entry.tweet for entry in entries], [fresh, self.tweet])
+        self.assertEqual(entries[1].retweeted_by, ["c", "b", "a"])
+        self.assertContains(response, "c、b、aがリツイート")
+
+    def test_timeline_queries_do_not_grow_with_retweets(self):
+        self.retweet_as("a")
+        # session, user, mutes and blocks, tweets, retweets, retweeters, liked tweet ids
+        with self.assertNumQueries(7):
+            self.client.get(reverse("tweets:home"))
+        self.retweet_as("b", "c", "d", "e")
+        # the mutes and blocks are cached now
+        with self.assertNumQueries(6):
+            self.client.get(reverse("tweets:home"))
+
+    def test_timeline_pages(self):
+        self.retweet_as("a", "b")
+        with self.settings(TIMELINE_PAGE_SIZE=2):
+            response = self.client.get(reverse("tweets:home"))
+            self.assertEqual([entry.retweeted_by for entry in response.context["entry_list"]], [["b", "a"]])
+            response = self.client.get(reverse("tweets:home"), {"cursor": response.context["next_cursor"]})
+        self.assertEqual(response.context["tweet_list"], [self.tweet])
+        self.assertEqual(response.context["entry_list"][0].retweeted_by, [])
+
+    def test_unparsable_cursor_starts_from_the_first_page(self):
+        first = self.client.get(reverse("tweets:home")).context["entry_list"]
+        for cursor in ("2024-02-30T00:00:00", "garbage"):
+            response = self.client.get(reverse("tweets:home"), {"cursor": cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [entry.tweet for entry in response.context["entry_list"]], [entry.tweet for entry in first]
+            )
+
+
+class TestRankedTimeline(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.friend = User.objects.create_user(username="friend")
+        self.stranger = User.objects.create_user(username="stranger")
+        FriendShip.objects.create(follower=self.user, following=self.friend)
+
+    def tweet(self, user, hours_ago=0, likes=0):
+        tweet = Tweet.objects.create(user=user, content="tweet")
+        Tweet.objects.filter(pk=tweet.pk).update(
+            created_at=timezone.now() - timedelta(hours=hours_ago), like_count=likes
+        )
+        return tweet
+
+    def test_score(self):
+        scores = ranking.score(
+            ages=np.array([0.0, 0.0, settings.RANKING_HALF_LIFE_SECONDS, 0.0]),
+            likes=np.array([0.0, 10.0, 0.0, 10.0]),
+            retweets=np.zeros(4),
+            affinity=np.zeros(4),
+            followed=np.zeros(4, dtype=bool),
+            muted=np.array([False, False, False, True]),
+        )
+        self.assertGreater(scores[1], scores[0])
+        self.assertAlmostEqual(scores[2], scores[0] / 2)
+        self.assertEqual(scores[3], -np.inf)
+
+    def test_ranks_followed_and_popular_tweets(self):
+        old = self.tweet(self.friend, hours_ago=3)
+        liked = self.tweet(self.friend, hours_ago=3, likes=50)
+        new = self.tweet(self.friend)
+        popular = self.tweet(self.stranger, likes=5)
+        ignored = self.tweet(self.stranger)
+        TrendingTweet.objects.create(rank=1, tweet=popular, score=1, refreshed_at=timezone.now())
+        ids = [pk for pk, _ in ranking.rank(self.user)]
+        self.assertEqual(set(ids), {old.pk, liked.pk, new.pk, popular.pk})
+        self.assertNotIn(ignored.pk, ids)
+        self.assertLess(ids.index(liked.pk), ids.index(old.pk))
+        self.assertLess(ids.index(new.pk), ids.index(old.pk))
+
+    def test_affinity_lifts_liked_authors(self):
+        other = User.objects.create_user(username="other")
+        FriendShip.objects.create(follower=self.user, following=other)
+        from_friend = self.tweet(self.friend, hours_ago=1)
+        from_other = self.tweet(other)
+        for _ in range(3):
+            Like.objects.create(user=self.user, tweet=self.tweet(self.friend, hours_ago=40))
+        with self.settings(RANKING_AFFINITY_WEIGHT=10):
+            ids = [pk for pk, _ in ranking.rank(self.user)]
+        self.assertLess(ids.index(from_friend.pk), ids.index(from_other.pk))
+
+    def test_muted_authors_are_left_out(self):
+        self.tweet(self.friend)
+        with patch.object(ranking, "muted_author_ids", return_value={self.friend.pk}):
+            self.assertEqual(ranking.rank(self.user), [])
+
+    def test_home_ranked_mode_pages_and_caches(self):
+        tweets = [self.tweet(self.friend, hours_ago=hours) for hours in range(3)]
+        with self.settings(TIMELINE_PAGE_SIZE=2):
+            response = self.client.get(reverse("tweets:home"), {"mode": "ranked"})
+            self.assertTrue(response.context["ranked"])
+            self.assertEqual(response.context["tweet_list"], tweets[:2])
+            self.assertContains(response, "mode=ranked&amp;cursor=2")
+            # The ranking is cached, so a tweet posted since does not shift the next page.
+            self.tweet(self.friend)
+            response = self.client.get(reverse("tweets:home"), {"mode": "ranked", "cursor": 2})
+        self.assertEqual(response.context["tweet_list"], tweets[2:])
+        self.assertIsNone(response.context["next_cursor"])
+
+    def test_follows_mutes_and_blocks_refresh_the_ranking(self):
+        tweet = self.tweet(self.stranger)
+        self.assertEqual(ranking.ranked(self.user), [])
+        self.client.post(reverse("accounts:follow", kwargs={"username": "stranger"}))
+        self.assertEqual(ranking.ranked(self.user), [(tweet.pk, self.stranger.pk)])
+        self.client.post(reverse("accounts:mute", kwargs={"username": "stranger"}))
+        self.assertEqual(ranking.ranked(self.user), [])
+        self.client.post(reverse("accounts:unmute", kwargs={"username": "stranger"}))
+        self.assertEqual(ranking.ranked(self.user), [(tweet.pk, self.stranger.pk)])
+        self.client.post(reverse("accounts:unfollow", kwargs={"username": "stranger"}))
+        self.assertEqual(ranking.ranked(self.user), [])
+        self.client.post(reverse("accounts:follow", kwargs={"username": "stranger"}))
+        self.client.post(reverse("accounts:block", kwargs={"username": "stranger"}))
+        self.assertEqual(ranking.ranked(self.user), [])
+
+    def test_home_ranked_mode_queries(self):
+        self.tweet(self.friend)
+        self.client.get(reverse("tweets:home"), {"mode": "ranked"})
+        # session, user, page of tweets, liked tweet ids
+        with self.assertNumQueries(4):
+            self.client.get(reverse("tweets:home"), {"mode": "ranked"})
+
+    def test_bench_ranking_command(self):
+        out = StringIO()
+        call_command("bench_ranking", "--candidates", "100", "--repeat", "1", stdout=out)
+        self.assertIn("100 candidates", out.getvalue())
+
+
+class TestTimelineExclusions(QueryBudgetMixin, TestCase):
+    sizes = (10, 2000)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.friend = User.objects.create_user(username="friend")
+        self.muted = User.objects.create_user(username="muted")
+        self.blocker = User.objects.create_user(username="blocker")
+        Mute.objects.create(user=self.user, target=self.muted)
+        Block.objects.create(user=self.blocker, target=self.user)
+        self.now = timezone.now()
+
+    def tweet(self, user, minutes_ago):
+        tweet = Tweet.objects.create(user=user, content="tweet")
+        Tweet.objects.filter(pk=tweet.pk).update(created_at=self.now - timedelta(minutes=minutes_ago))
+        return tweet
+
+    def home(self, **params):
+        return self.client.get(reverse("tweets:home"), params).context
+
+    def test_hidden_authors_and_retweets_are_skipped(self):
+        visible = self.tweet(self.friend, 10)
+        hidden = self.tweet(self.muted, 5)
+        Retweet.objects.create(user=self.friend, tweet=hidden)
+        Retweet.objects.create(user=self.blocker, tweet=visible)
+        context = self.home()
+        self.assertEqual(context["tweet_list"], [visible])
+        self.assertEqual(context["entry_list"][0].retweeted_by, [])
+
+    def test_page_is_refilled_past_hidden_tweets(self):
+        visible = [self.tweet(self.friend, minutes) for minutes in (10, 11)]
+        for minutes in range(4):
+            self.tweet(self.muted, minutes)
+        with self.settings(TIMELINE_PAGE_SIZE=2):
+            self.assertEqual(self.home()["tweet_list"], visible)
+
+    def test_refills_are_bounded(self):
+        visible = self.tweet(self.friend, 10)
+        for minutes in range(4):
+            self.tweet(self.muted, minutes)
+        with self.settings(TIMELINE_PAGE_SIZE=2, TIMELINE_MAX_REFILLS=0):
+            response = self.client.get(reverse("tweets:home"))
+            self.assertContains(response, "表示できる投稿がありませんでした")
+            context = response.context
+            self.assertEqual(context["tweet_list"], [])
+            # the next page picks up where the scan stopped
+            context = self.home(cursor=context["next_cursor"])
+            self.assertEqual(context["tweet_list"], [])
+            context = self.home(cursor=context["next_cursor"])
+        self.assertEqual(context["tweet_list"], [visible])
+        self.assertIsNone(context["next_cursor"])
+
+    def test_ranked_page_drops_newly_muted_authors(self):
+        FriendShip.objects.create(follower=self.user, following=self.friend)
+        kept = self.tweet(self.friend, 10)
+        self.assertEqual(self.home(mode="ranked")["tweet_list"], [kept])
+        self.tweet(self.muted, 1)
+        FriendShip.objects.create(follower=self.user, following=self.muted)
+        ranking.forget(self.user.pk)
+        self.assertEqual(self.home(mode="ranked")["tweet_list"], [kept])
+        # muting takes effect at once, even though the ranking itself is cached
+        self.client.post(reverse("accounts:mute", kwargs={"username": "friend"}))
+        self.assertEqual(self.home(mode="ranked")["tweet_list"], [])
+
+    def seed_mutes(self, size):
+        """A fixed page of tweets, half of them by muted accounts, and a mute list grown to ``size``."""
+        if not Tweet.objects.exists():
+            for minutes in range(10):
+                self.tweet(self.muted if minutes % 2 else self.friend, minutes)
+        count = Mute.objects.filter(user=self.user).count()
+        users = User.objects.bulk_create(
+            [User(username="mutee{}".format(i)) for i in range(count, size)], batch_size=500
+        )
+        Mute.objects.bulk_create([Mute(user=self.user, target=user) for user in users], batch_size=500)
+
+    def test_queries_do_not_grow_with_the_mute_list(self):
+        self.assertQueriesDoNotScale("tweets:home", reverse("tweets:home"), self.seed_mutes)
+
+    def test_ranked_queries_do_not_grow_with_the_mute_list(self):
+        FriendShip.objects.create(follower=self.user, following=self.friend)
+        self.assertQueriesDoNotScale(
+            "tweets:home?mode=ranked", reverse("tweets:home"), self.seed_mutes, {"mode": "ranked"}
+        )
+
+
+class TestQueryBudgets(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.authors = []
+
+    def author(self, i):
+        while len(self.authors) <= i:
+            author = User.objects.create_user(username="author{}".format(len(self.authors)))
+            FriendShip.objects.create(follower=self.user, following=author)
+            self.authors.append(author)
+        return self.authors[i]
+
+    def seed_tweets(self, size):
+        """Tweets by ``size`` different authors, every other one liked and retweeted by the user."""
+        for i in range(Tweet.objects.filter(parent=None).count(), size):
+            tweet = Tweet.objects.create(user=self.author(i), content="tweet {}".format(i))
+            if i % 2:
+                Like.objects.create(user=self.user, tweet=tweet)
+                Retweet.objects.create(user=self.author(i - 1), tweet=tweet)
+            TrendingTweet.objects.create(rank=i + 1, tweet=tweet, score=1, refreshed_at=timezone.now())
+
+    def test_home(self):
+        self.assertQueriesDoNotScale("tweets:home", reverse("tweets:home"), self.seed_tweets)
+
+    def test_home_ranked(self):
+        self.assertQueriesDoNotScale(
+            "tweets:home?mode=ranked", reverse("tweets:home"), self.seed_tweets, {"mode": "ranked"}
+        )
+
+    def test_trending(self):
+        self.assertQueriesDoNotScale("tweets:trending", reverse("tweets:trending"), self.seed_tweets)
+
+    def test_detail(self):
+        tweet = Tweet.objects.create(user=self.user, content="thread")
+
+        def seed(size):
+            for i in range(tweet.reply_count, size):
+                reply = Tweet.objects.create(user=self.author(i), content="reply {}".format(i), parent=tweet)
+                link_reply(reply)
+                Like.objects.create(user=self.author(i), tweet=tweet)
+                tweet.reply_count += 1
+
+        self.assertQueriesDoNotScale("tweets:detail", reverse("tweets:detail", kwargs={"pk": tweet.pk}), seed)
+
 
 class TestTweetDeleteView(TestCase):
     def setUp(self):
@@ -107,15 +749,24 @@ class TestTweetDeleteView(TestCase):
         )
         self.assertFalse(Tweet.objects.filter(content="test1").exists())
 
-        def test_failure_post_with_not_exist_tweet(self):
-            response = self.client.pot(reverse("tweets:delete", kwargs={"pk": 500}))
-            self.assertEqual(response.status_code, 404)
-            self.assertEqual(Tweet.obsjects.count(), 2)
+    def test_num_queries(self):
+        # The tweet checked by test_func is the one rendered/deleted: it is fetched only once.
+        with self.assertNumQueries(3):
+            self.client.get(reverse("tweets:delete", kwargs={"pk": self.tweet1.pk}))
+        ContentType.objects.get_for_model(Tweet)
+        # session, user, tweet, savepoint, tombstone update, outbox event, purge job, purge task, release
+        with self.assertNumQueries(9):
+            self.client.post(reverse("tweets:delete", kwargs={"pk": self.tweet1.pk}))
 
-        def test_failure_post_with_incorrect_user(self):
-            response = self.client.post(reverse("tweets:delete", kwargs={"pk": self.tweet2.pk}))
-            self.assertEqual(response.status_code, 403)
-            self.assertEqual(Tweet.objects.count(), 2)
+    def test_failure_post_with_incorrect_user(self):
+        response = self.client.post(reverse("tweets:delete", kwargs={"pk": self.tweet2.pk}))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Tweet.objects.count(), 2)
+
+    def test_failure_post_with_not_exist_tweet(self):
+        response = self.client.post(reverse("tweets:delete", kwargs={"pk": 500}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Tweet.objects.count(), 2)
 
 
 class TestLikeView(TestCase):
@@ -134,6 +785,12 @@ class TestLikeView(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(Like.objects.filter(tweet=self.tweet, user=self.user).exists())
 
+    def test_num_queries(self):
+        # session, user, tweet, savepoint, get_or_create (select, savepoint, insert, release), like_count,
+        # outbox event, release, like bucket upsert (update, savepoint, insert, release), like count
+        with self.assertNumQueries(16):
+            self.client.post(self.url)
+
     def test_failure_post_with_not_exist_tweet(self):
         url = reverse("tweets:like", kwargs={"pk": "100"})
         response = self.client.post(url)
@@ -163,6 +820,12 @@ class TestUnLikeView(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertFalse(Like.objects.filter(tweet=self.tweet, user=self.user).exists())
 
+    def test_num_queries(self):
+        # session, user, tweet, savepoint, liked at, delete, like_count, outbox event, release,
+        # like bucket update, like count
+        with self.assertNumQueries(11):
+            self.client.post(reverse("tweets:unlike", kwargs={"pk": self.tweet.pk}))
+
     def test_failure_post_with_not_exist_tweet(self):
         response = self.client.post(reverse("tweets:unlike", kwargs={"pk": 100}))
         self.assertEqual(response.status_code, 404)
@@ -173,3 +836,207 @@ class TestUnLikeView(TestCase):
         response = self.client.post(reverse("tweets:unlike", kwargs={"pk": self.tweet.pk}))
         self.assertEqual(response.status_code, 200)
         self.assertFalse(Like.objects.filter(tweet=self.tweet, user=self.user).exists())
+
+
+class TestTrending(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.old = Tweet.objects.create(user=self.user, content="old")
+        self.new = Tweet.objects.create(user=self.user, content="new")
+        self.now = timezone.now()
+
+    def test_like_and_unlike_update_buckets(self):
+        self.client.post(reverse("tweets:like", kwargs={"pk": self.new.pk}))
+        self.assertEqual(LikeBucket.objects.get(tweet=self.new).count, 1)
+        self.client.post(reverse("tweets:unlike", kwargs={"pk": self.new.pk}))
+        self.assertEqual(LikeBucket.objects.get(tweet=self.new).count, 0)
+
+    def test_recent_velocity_beats_older_total(self):
+        trending.record_like(self.old.pk, 10, now=self.now - timedelta(minutes=50))
+        trending.record_like(self.new.pk, 5, now=self.now)
+        trending.refresh(now=self.now)
+        self.assertEqual(list(TrendingTweet.objects.values_list("tweet_id", flat=True)), [self.new.pk, self.old.pk])
+
+    def test_refresh_is_bounded_and_drops_expired_buckets(self):
+        trending.record_like(self.old.pk, 10, now=self.now - timedelta(hours=2))
+        trending.record_like(self.new.pk, 1, now=self.now)
+        with self.settings(TRENDING_SIZE=1):
+            trending.refresh(now=self.now)
+        self.assertEqual(list(TrendingTweet.objects.values_list("tweet_id", flat=True)), [self.new.pk])
+        self.assertFalse(LikeBucket.objects.filter(tweet=self.old).exists())
+
+    def test_unlike_comes_off_the_bucket_that_counted_the_like(self):
+        earlier = self.now - timedelta(minutes=30)
+        Like.objects.filter(pk=Like.objects.create(tweet=self.new, user=self.user).pk).update(created_at=earlier)
+        trending.record_like(self.new.pk, now=earlier)
+        self.client.post(reverse("tweets:unlike", kwargs={"pk": self.new.pk}))
+        self.assertEqual(
+            list(LikeBucket.objects.filter(tweet=self.new).values_list("bucket", "count")),
+            [(trending.bucket_start(earlier), 0)],
+        )
+        # a bucket that is gone, or already empty, is not taken below zero
+        trending.record_like(self.new.pk, -1, now=earlier)
+        trending.record_like(self.new.pk, -1)
+        self.assertEqual(list(LikeBucket.objects.filter(tweet=self.new).values_list("count", flat=True)), [0])
+
+    def test_success_get(self):
+        trending.record_like(self.new.pk, 3)
+        trending.refresh()
+        # session, user, trending entries with tweets and authors, liked tweet ids
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("tweets:trending"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["tweet_list"], [self.new])
+
+    def test_scheduled_refresh_reschedules_itself(self):
+        trending.record_like(self.new.pk, 1)
+        schedule_trending_refresh()
+        run_pending()
+        self.assertTrue(TrendingTweet.objects.filter(tweet=self.new).exists())
+        self.assertEqual(Task.objects.filter(name="tweets.refresh_trending", status=Task.Status.PENDING).count(), 1)
+
+
+class TestPurge(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="testpassword")
+        self.fans = [User.objects.create_user(username="fan{}".format(i)) for i in range(5)]
+        self.tweets = [Tweet.objects.create(user=self.author, content=str(i)) for i in range(4)]
+        Like.objects.bulk_create([Like(tweet=tweet, user=fan) for tweet in self.tweets for fan in self.fans])
+        Like.objects.create(tweet=Tweet.objects.create(user=self.fans[0], content="fan"), user=self.author)
+
+    def test_deleted_tweet_is_hidden_then_purged(self):
+        self.client.login(username="author", password="testpassword")
+        tweet = self.tweets[0]
+        self.client.post(reverse("tweets:delete", kwargs={"pk": tweet.pk}))
+        self.assertFalse(Tweet.objects.filter(pk=tweet.pk).exists())
+        self.assertTrue(Tweet.all_objects.filter(pk=tweet.pk).exists())
+        self.assertEqual(self.client.get(reverse("tweets:detail", kwargs={"pk": tweet.pk})).status_code, 404)
+
+        run_pending()
+        self.assertFalse(Tweet.all_objects.filter(pk=tweet.pk).exists())
+        self.assertFalse(Like.objects.filter(tweet_id=tweet.pk).exists())
+        self.assertEqual(PurgeJob.objects.get().status, PurgeJob.Status.DONE)
+
+    def test_user_purge_runs_in_bounded_batches(self):
+        job = soft_delete_user(self.author)
+        self.assertFalse(Tweet.objects.filter(user=self.author).exists())
+        batches = deleted = 0
+        while not run_batch(job, batch_size=3):
+            batches += 1
+            job.refresh_from_db()
+            self.assertLessEqual(job.deleted_rows - deleted, 3)
+            deleted = job.deleted_rows
+        self.assertGreater(batches, 5)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Tweet.all_objects.filter(user_id=self.author.pk).exists())
+        # the author's own like on someone else's tweet goes too, the fans stay
+        self.assertEqual(Like.objects.count(), 0)
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_user_deletion_tombstones_tweets(self):
+        fan = self.fans[0]
+        reply = Tweet.objects.create(user=fan, content="reply", parent=self.tweets[0])
+        link_reply(reply)
+        soft_delete_user(fan)
+        self.assertTrue(Tweet.all_objects.filter(user=fan).exists())
+        self.assertFalse(Tweet.all_objects.filter(user=fan, deleted_at__isnull=True).exists())
+        self.assertEqual(Tweet.all_objects.get(pk=self.tweets[0].pk).reply_count, 0)
+        # hiding them needs no join to the account
+        self.assertNotIn("JOIN", str(Tweet.objects.all().query))
+
+    def test_user_purge_releases_counters_on_other_tweets(self):
+        fan = self.fans[0]
+        tweet = self.tweets[0]
+        Retweet.objects.create(user=fan, tweet=tweet)
+        reply = Tweet.objects.create(user=fan, content="reply", parent=tweet)
+        link_reply(reply)
+        Tweet.objects.filter(pk=tweet.pk).update(like_count=5, retweet_count=1)
+        job = soft_delete_user(fan)
+        while not run_batch(job, batch_size=2):
+            job.refresh_from_db()
+        tweet.refresh_from_db()
+        self.assertEqual(Like.objects.filter(tweet=tweet).count(), 4)
+        self.assertEqual((tweet.like_count, tweet.retweet_count, tweet.reply_count), (4, 0, 0))
+        self.assertFalse(Retweet.objects.exists())
+
+
+class TestTweetCard(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="test.user@1", password="testpassword")
+        self.tweets = [Tweet.objects.create(user=self.user, content="<b>{}</b>".format(i)) for i in range(2)]
+        Like.objects.create(tweet=self.tweets[0], user=self.user)
+        self.tweets = list(Tweet.objects.select_related("user").prefetch_related("liked_tweet").order_by("pk"))
+        self.liked_list = [self.tweets[0].pk]
+
+    def render(self, source, tweet):
+        template = engines["django"].from_string(source)
+        return template.render({"tweet": tweet, "liked_list": self.liked_list})
+
+    def test_matches_like_include(self):
+        for tweet in self.tweets:
+            card = self.render("{% load tweet_tags %}{% tweet_card tweet %}", tweet)
+            like = self.render('{% include "tweets/like.html" %}', tweet)
+            for line in filter(None, (line.strip() for line in like.splitlines())):
+                self.assertIn(line, card)
+
+    def test_links_and_escaping(self):
+        tweet = self.tweets[1]
+        card = self.render("{% load tweet_tags %}{% tweet_card tweet %}", tweet)
+        self.assertIn('href="{}"'.format(reverse("accounts:user_profile", args=[self.user.username])), card)
+        self.assertIn('href="{}"'.format(reverse("tweets:detail", args=[tweet.pk])), card)
+        self.assertIn("&lt;b&gt;1&lt;/b&gt;", card)
+
+    def test_home_renders_cards_without_extra_queries(self):
+        self.client.login(username="test.user@1", password="testpassword")
+        Tweet.objects.bulk_create([Tweet(user=self.user, content=str(i)) for i in range(20)])
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse("tweets:home"))
+        self.assertContains(response, 'class="alert alert-success"', count=22)
+        self.assertContains(response, "const csrftoken", count=1)
+
+
+class TestAdmin(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="testpassword")
+        self.client.login(username="admin", password="testpassword")
+        self.tweets = [Tweet.objects.create(user=self.admin, content=str(i)) for i in range(3)]
+        self.likes = [Like.objects.create(tweet=tweet, user=self.admin) for tweet in self.tweets]
+
+    def test_like_changelist_pages_by_cursor_without_counting(self):
+        url = reverse("admin:tweets_like_changelist")
+        with patch.object(LikeAdmin, "list_per_page", 2), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse([q for q in queries if "COUNT(" in q["sql"]])
+        self.assertEqual(
+            [like.pk for like in response.context["cl"].result_list], [self.likes[2].pk, self.likes[1].pk]
+        )
+        self.assertContains(response, "約 3 件")
+        with patch.object(LikeAdmin, "list_per_page", 2):
+            response = self.client.get(url + response.context["cl"].next_url)
+        self.assertEqual([like.pk for like in response.context["cl"].result_list], [self.likes[0].pk])
+        self.assertIsNone(response.context["cl"].next_url)
+
+    def test_change_forms_use_raw_id_widgets(self):
+        response = self.client.get(reverse("admin:tweets_like_change", args=[self.likes[0].pk]))
+        self.assertContains(response, "vForeignKeyRawIdAdminField", count=2)
+        self.assertNotContains(response, "<select")
+
+    def test_search_and_filters(self):
+        url = reverse("admin:tweets_tweet_changelist")
+        response = self.client.get(url, {"q": "admin"})
+        self.assertEqual(len(response.context["cl"].result_list), 3)
+        response = self.client.get(url, {"q": "adm"})
+        self.assertEqual(len(response.context["cl"].result_list), 0)
+        response = self.client.get(url, {"created_at__gte": timezone.now().date().isoformat()})
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_action_soft_deletes(self):
+        response = self.client.post(
+            reverse("admin:tweets_tweet_changelist"),
+            {"action": "soft_delete_selected", "_selected_action": [self.tweets[0].pk]},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Tweet.objects.filter(pk=self.tweets[0].pk).exists())
+        self.assertTrue(PurgeJob.objects.filter(object_id=self.tweets[0].pk).exists())
+        self.assertEqual(Like.objects.count(), 3)
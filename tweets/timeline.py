@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.dateparse import parse_datetime
+
+from accounts.exclusions import get_exclusions
+from core.loaders import get_loader
+
+from .models import Retweet, Tweet
+
+User = get_user_model()
+
+
+class Entry:
+    """One tweet on a timeline page, with everyone whose retweet brought it there."""
+
+    def __init__(self, tweet_id, at):
+        self.tweet_id = tweet_id
+        self.at = at
+        self.tweet = None
+        self.retweeted_by = []
+
+
+def _scan(queryset, before, limit, visible, at):
+    """``(rows, reached)``: the newest ``limit`` rows of ``queryset`` that pass ``visible``.
+
+    Hidden rows are replaced by reading further back, one batch of ``limit``
+    at a time, for at most TIMELINE_MAX_REFILLS extra batches. If that runs out
+    first, ``reached`` is the time the scan stopped at; otherwise it is None.
+    """
+    rows = []
+    for _ in range(settings.TIMELINE_MAX_REFILLS + 1):
+        batch = list((queryset.filter(created_at__lt=before) if before else queryset)[:limit])
+        rows += [row for row in batch if visible(row)]
+        if len(rows) >= limit or len(batch) < limit:
+            return rows[:limit], None
+        before = at(batch[-1])
+    return rows, before
+
+
+def page(request, cursor=None, limit=None):
+    """``(entries, next_cursor)``: tweets and retweets merged newest first, each tweet at most once per page.
+
+    The page takes the newest ``limit`` events of both kinds together and folds
+    repeats of a tweet into its newest position, so a tweet retweeted by ten
+    accounts is one entry. Tweets and retweeters are then loaded in one batch
+    each. ``cursor`` is the time of the last event of the previous page.
+    Events involving accounts the viewer muted or blocked are skipped and the
+    page is refilled from older events (see ``_scan``). A cursor that is not a
+    valid time starts again from the first page.
+    """
+    limit = limit or settings.TIMELINE_PAGE_SIZE
+    try:
+        before = parse_datetime(cursor) if cursor else None
+    except ValueError:
+        before = None
+    exclusions = get_exclusions(request.user.pk)
+    tweets = Tweet.objects.select_related("user").order_by("-created_at")
+    retweets = (
+        Retweet.objects.filter(user__deleted_at__isnull=True)
+        .order_by("-created_at")
+        .values_list("tweet_id", "user_id", "created_at", "tweet__user_id")
+    )
+    originals, tweets_reached = _scan(
+        tweets, before, limit, lambda tweet: not exclusions.hides(tweet.user_id), lambda tweet: tweet.created_at
+    )
+    reposts, retweets_reached = _scan(
+        retweets,
+        before,
+        limit,
+        lambda row: not (exclusions.hides(row[1]) or exclusions.hides(row[3])),
+        lambda row: row[2],
+    )
+    # Where a scan gave up early, older events of the other kind have to wait for the next page.
+    floor = max((reached for reached in (tweets_reached, retweets_reached) if reached), default=None)
+
+    events = [(tweet.created_at, tweet.pk, None) for tweet in originals]
+    events += [(at, tweet_id, user_id) for tweet_id, user_id, at, _ in reposts]
+    if floor:
+        events = [event for event in events if event[0] >= floor]
+    events.sort(key=lambda event: event[0], reverse=True)
+    events = events[:limit]
+
+    entries = {}
+    for at, tweet_id, retweeter_id in events:
+        entry = entries.setdefault(tweet_id, Entry(tweet_id, at))
+        if retweeter_id is not None:
+            entry.retweeted_by.append(retweeter_id)
+
+    loader = get_loader(request)
+    loaded = {tweet.pk: loader.prime(tweet) for tweet in originals}
+    missing = [tweet_id for tweet_id in entries if tweet_id not in loaded]
+    if missing:
+        for tweet in Tweet.objects.select_related("user").filter(pk__in=missing):
+            loaded[tweet.pk] = loader.prime(tweet)
+    users = loader.load_many(User, {user_id for entry in entries.values() for user_id in entry.retweeted_by})
+
+    page = []
+    for entry in entries.values():
+        entry.tweet = loaded.get(entry.tweet_id)
+        if entry.tweet is None:
+            # Deleted since it was retweeted.
+            continue
+        entry.retweeted_by = [users[user_id].username for user_id in entry.retweeted_by if user_id in users]
+        page.append(entry)
+    if len(events) == limit:
+        next_cursor = events[-1][0].isoformat()
+    else:
+        next_cursor = floor.isoformat() if floor else None
+    return page, next_cursor
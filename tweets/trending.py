@@ -0,0 +1,69 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import LikeBucket, TrendingTweet
+
+
+def bucket_start(now=None):
+    now = now or timezone.now()
+    size = settings.TRENDING_BUCKET_SECONDS
+    return datetime.fromtimestamp(int(now.timestamp()) // size * size, tz=dt_timezone.utc)
+
+
+def record_like(tweet_id, delta=1, now=None):
+    """Add ``delta`` likes to the tweet's counter for the time bucket of ``now`` (default: the current one).
+
+    Unlikes pass ``delta=-1`` and the time of the like they undo, so it comes
+    off the bucket that counted it. Counters never go below zero, and a bucket
+    that has already been dropped is left alone.
+    """
+    bucket = bucket_start(now)
+    counters = LikeBucket.objects.filter(tweet_id=tweet_id, bucket=bucket)
+    if counters.update(count=Greatest(F("count") + delta, 0)) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            LikeBucket.objects.create(tweet_id=tweet_id, bucket=bucket, count=delta)
+    except IntegrityError:
+        counters.update(count=F("count") + delta)
+
+
+def scores(now=None):
+    """Decayed like velocity per tweet over the trending window.
+
+    Each bucket contributes ``count * 0.5 ** (age / half_life)``, so a burst of
+    likes a few minutes ago outranks a larger but older one.
+    """
+    now = now or timezone.now()
+    half_life = settings.TRENDING_HALF_LIFE_SECONDS
+    since = now - timedelta(seconds=settings.TRENDING_WINDOW_SECONDS)
+    totals = defaultdict(float)
+    rows = LikeBucket.objects.filter(bucket__gte=since).values_list("tweet_id", "bucket", "count")
+    for tweet_id, bucket, count in rows.iterator():
+        age = max((now - bucket).total_seconds(), 0)
+        totals[tweet_id] += count * 0.5 ** (age / half_life)
+    return totals
+
+
+def refresh(now=None):
+    """Recompute the top-K table and drop buckets that left the window."""
+    now = now or timezone.now()
+    top = heapq.nlargest(settings.TRENDING_SIZE, ((s, t) for t, s in scores(now).items() if s > 0))
+    with transaction.atomic():
+        TrendingTweet.objects.all().delete()
+        TrendingTweet.objects.bulk_create(
+            [
+                TrendingTweet(rank=rank, tweet_id=tweet_id, score=score, refreshed_at=now)
+                for rank, (score, tweet_id) in enumerate(top, start=1)
+            ]
+        )
+    LikeBucket.objects.filter(bucket__lt=now - timedelta(seconds=settings.TRENDING_WINDOW_SECONDS)).delete()
+    return top
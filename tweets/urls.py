@@ -6,9 +6,15 @@ app_name = "tweets"
 
 urlpatterns = [
     path("home/", views.HomeView.as_view(), name="home"),
+    path("trending/", views.TrendingView.as_view(), name="trending"),
+    path("new/", views.NewTweetsView.as_view(), name="new"),
     path("create/", views.TweetCreateView.as_view(), name="create"),
+    path("bulk_create/", views.TweetBulkCreateView.as_view(), name="bulk_create"),
     path("<int:pk>/", views.TweetDetailView.as_view(), name="detail"),
+    path("<int:pk>/reply/", views.ReplyCreateView.as_view(), name="reply"),
     path("<int:pk>/delete/", views.TweetDeleteView.as_view(), name="delete"),
     path("<int:pk>/like/", views.LikeView.as_view(), name="like"),
     path("<int:pk>/unlike/", views.UnlikeView.as_view(), name="unlike"),
+    path("<int:pk>/retweet/", views.RetweetView.as_view(), name="retweet"),
+    path("<int:pk>/unretweet/", views.UnretweetView.as_view(), name="unretweet"),
 ]
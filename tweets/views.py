@@ -1,13 +1,50 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from django.contrib.auth.views import redirect_to_login
+from django.db import transaction
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView, DeleteView, DetailView, TemplateView
 from django.views.generic.base import View
 
+from core.loaders import get_loader
+from core.mixins import LoaderObjectMixin
+from notifications.models import Notification
+from notifications.tasks import record_notification
+from outbox.services import Type, emit
+
+from . import duplicates, ranking, timeline, trending
 from .forms import TweetForm
-from .models import Like, Tweet
+from .models import Like, Retweet, TrendingTweet, Tweet
+from .purge import soft_delete_tweet
+from .services import (
+    BulkCreateError,
+    ancestors,
+    bulk_create_tweets,
+    bump_count,
+    forget_high_water_mark,
+    forget_tweet,
+    get_tweet,
+    high_water_mark,
+    like_count,
+    link_reply,
+    new_tweets_since,
+    refresh_like_count,
+    thread,
+)
+
+
+def get_tweet_or_404(request, pk):
+    tweet = get_tweet(pk)
+    if tweet is None:
+        raise Http404("No Tweet matches the given query.")
+    return get_loader(request).prime(tweet)
 
 
 class HomeView(LoginRequiredMixin, TemplateView):
@@ -16,20 +53,67 @@ class HomeView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["tweet_list"] = Tweet.objects.select_related("user").prefetch_related("liked_tweet")
+        ranked = self.request.GET.get("mode") == "ranked"
+        if ranked:
+            entry_list, next_cursor = self.ranked_page()
+        else:
+            entry_list, next_cursor = timeline.page(self.request, self.request.GET.get("cursor"))
+        context["ranked"] = ranked
+        context["entry_list"] = entry_list
+        context["tweet_list"] = [entry.tweet for entry in entry_list]
+        context["next_cursor"] = next_cursor
         liked_list = (
             Like.objects.filter(user=self.request.user).select_related("tweet").values_list("tweet_id", flat=True)
         )
         context["liked_list"] = liked_list
         return context
 
+    def ranked_page(self):
+        """Like ``timeline.page`` but in ``ranking`` order; the cursor is an offset into the cached ranking."""
+        try:
+            offset = max(int(self.request.GET.get("cursor", 0)), 0)
+        except ValueError:
+            offset = 0
+        tweets, next_offset = ranking.page(self.request.user, offset)
+        loader = get_loader(self.request)
+        entries = []
+        for tweet in tweets:
+            entry = timeline.Entry(tweet.pk, tweet.created_at)
+            entry.tweet = loader.prime(tweet)
+            entries.append(entry)
+        return entries, next_offset
+
+
+class TrendingView(LoginRequiredMixin, TemplateView):
+    template_name = "tweets/trending.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        entries = TrendingTweet.objects.filter(tweet__deleted_at__isnull=True).select_related("tweet__user")
+        context["tweet_list"] = [entry.tweet for entry in entries]
+        context["liked_list"] = Like.objects.filter(user=self.request.user).values_list("tweet_id", flat=True)
+        return context
+
 
 class TweetDetailView(LoginRequiredMixin, DetailView):
     model = Tweet
     template_name = "tweets/detail.html"
 
+    def get_object(self, queryset=None):
+        return get_tweet_or_404(self.request, self.kwargs["pk"])
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context["like_count"] = like_count(self.object.pk)
+        context["is_retweeted"] = Retweet.objects.filter(tweet=self.object, user=self.request.user).exists()
+        context["ancestor_list"] = ancestors(self.object)
+        # Not gated on reply_count: that counts direct replies only, and a purged reply's own replies stay.
+        reply_list, next_cursor = thread(self.object, self.request.GET.get("cursor"))
+        for reply in reply_list:
+            reply.indent = reply.depth - self.object.depth - 1
+        context["reply_list"] = reply_list
+        context["next_cursor"] = next_cursor
+        context["reply_form"] = TweetForm()
         liked_list = (
             Like.objects.select_related("tweet").filter(user=self.request.user).values_list("tweet_id", flat=True)
         )
@@ -45,28 +129,120 @@ class TweetCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.user = self.request.user
+        content = form.cleaned_data["content"]
+        (simhash,) = duplicates.simhashes([content])
+        if duplicates.is_spam(content, simhash, self.request.user.pk):
+            form.add_error("content", duplicates.MESSAGE)
+            return self.form_invalid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            tweet = self.object
+            if tweet.parent_id:
+                link_reply(tweet)
+            duplicates.sign([tweet], [simhash])
+            emit(Type.TWEET_CREATED, tweet_id=tweet.pk, user_id=tweet.user_id, content=tweet.content)
+        if tweet.parent_id:
+            forget_tweet(tweet.parent_id)
+        forget_high_water_mark()
+        return response
+
+
+class ReplyCreateView(TweetCreateView):
+    def get_parent(self):
+        if not hasattr(self, "parent"):
+            self.parent = get_tweet_or_404(self.request, self.kwargs["pk"])
+        return self.parent
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["parent"] = self.get_parent()
+        return context
+
+    def form_valid(self, form):
+        parent = self.get_parent()
+        if parent.depth >= settings.TWEET_REPLY_MAX_DEPTH:
+            form.add_error(None, "これ以上深い返信はできません。")
+            return self.form_invalid(form)
+        form.instance.parent = parent
         return super().form_valid(form)
 
+    def get_success_url(self):
+        return reverse("tweets:detail", kwargs={"pk": self.object.parent_id})
+
+
+class NewTweetsView(View):
+    """Count and ids of tweets newer than ``?since=<tweet id>``.
+
+    An idle poll is answered from the cached high-water mark. With ``?wait=<seconds>``
+    (capped at NEW_TWEETS_LONG_POLL_TIMEOUT) the response is held until something
+    new arrives or the wait is over. Every middleware in the chain is async-capable,
+    so under ASGI a waiting poll holds no worker thread.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        # LoginRequiredMixin would touch the session from the event loop.
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        try:
+            since = int(request.GET.get("since", 0))
+            wait = min(float(request.GET.get("wait", 0)), settings.NEW_TWEETS_LONG_POLL_TIMEOUT)
+        except ValueError:
+            return JsonResponse({"error": "since と wait は数値で指定してください。"}, status=400)
+
+        deadline = time.monotonic() + wait
+        while since >= await sync_to_async(high_water_mark)() and time.monotonic() < deadline:
+            await asyncio.sleep(min(settings.NEW_TWEETS_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+        high_water, count, ids = await sync_to_async(new_tweets_since)(request.user, since)
+        return JsonResponse({"since": since, "high_water": high_water, "count": count, "ids": ids})
+
+
+class TweetBulkCreateView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        try:
+            items = json.loads(request.body).get("tweets")
+        except (ValueError, AttributeError):
+            return JsonResponse({"errors": {"__all__": ["JSONの形式が正しくありません。"]}}, status=400)
+        try:
+            ids, created = bulk_create_tweets(request.user, items)
+        except BulkCreateError as e:
+            return JsonResponse({"errors": e.errors}, status=400)
+        return JsonResponse({"ids": ids, "created": len(created)}, status=201)
+
 
-class TweetDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class TweetDeleteView(LoginRequiredMixin, UserPassesTestMixin, LoaderObjectMixin, DeleteView):
     model = Tweet
     template_name = "tweets/delete.html"
     success_url = reverse_lazy("tweets:home")
 
     def test_func(self, **kwargs):
-        pk = self.kwargs["pk"]
-        tweet = Tweet.objects.get(pk=pk)
-        return tweet.user == self.request.user
+        return self.get_object().user_id == self.request.user.pk
+
+    def form_valid(self, form):
+        soft_delete_tweet(self.object)
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class LikeView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         tweet_id = self.kwargs["pk"]
-        tweet = get_object_or_404(Tweet, id=tweet_id)
-        Like.objects.get_or_create(tweet=tweet, user=self.request.user)
+        tweet = get_tweet_or_404(request, tweet_id)
+        with transaction.atomic():
+            _, created = Like.objects.get_or_create(tweet=tweet, user=self.request.user)
+            if created:
+                bump_count(tweet.pk, "like_count", 1)
+                emit(Type.LIKE_CREATED, tweet_id=tweet.pk, user_id=request.user.pk, author_id=tweet.user_id)
+        if created:
+            trending.record_like(tweet.pk)
+        if created and tweet.user_id != request.user.pk:
+            record_notification.enqueue(
+                recipient_id=tweet.user_id,
+                verb=Notification.Verb.LIKE,
+                actor_id=request.user.pk,
+                actor_username=request.user.username,
+                tweet_id=tweet.pk,
+            )
         unlike_url = reverse("tweets:unlike", kwargs={"pk": tweet_id})
-        tweet = Tweet.objects.prefetch_related("liked_tweet").get(id=tweet_id)
-        like_count = tweet.liked_tweet.count()
+        like_count = refresh_like_count(tweet.pk)
         is_liked = True
         context = {
             "like_count": like_count,
@@ -80,13 +256,20 @@ class LikeView(LoginRequiredMixin, View):
 class UnlikeView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         tweet_id = self.kwargs["pk"]
-        tweet = get_object_or_404(Tweet, pk=tweet_id)
-        if like := Like.objects.filter(user=self.request.user, tweet=tweet):
-            like.delete()
+        tweet = get_tweet_or_404(request, tweet_id)
+        likes = Like.objects.filter(user=self.request.user, tweet=tweet)
+        with transaction.atomic():
+            # The trending bucket to take the like off is the one it was counted in.
+            liked_at = likes.values_list("created_at", flat=True).first()
+            deleted, _ = likes.delete() if liked_at else (0, {})
+            if deleted:
+                bump_count(tweet.pk, "like_count", -1)
+                emit(Type.LIKE_DELETED, tweet_id=tweet.pk, user_id=request.user.pk, author_id=tweet.user_id)
+        if deleted:
+            trending.record_like(tweet.pk, -1, now=liked_at)
         is_liked = False
         like_url = reverse("tweets:like", kwargs={"pk": tweet_id})
-        tweet = Tweet.objects.prefetch_related("liked_tweet").get(id=tweet_id)
-        like_count = tweet.liked_tweet.count()
+        like_count = refresh_like_count(tweet.pk)
         context = {
             "like_count": like_count,
             "tweet_id": tweet_id,
@@ -94,3 +277,27 @@ class UnlikeView(LoginRequiredMixin, View):
             "like_url": like_url,
         }
         return JsonResponse(context)
+
+
+class RetweetView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        tweet = get_tweet_or_404(request, self.kwargs["pk"])
+        with transaction.atomic():
+            _, created = Retweet.objects.get_or_create(tweet=tweet, user=request.user)
+            if created:
+                bump_count(tweet.pk, "retweet_count", 1)
+                emit(Type.RETWEET_CREATED, tweet_id=tweet.pk, user_id=request.user.pk, author_id=tweet.user_id)
+        forget_tweet(tweet.pk)
+        return redirect("tweets:detail", pk=tweet.pk)
+
+
+class UnretweetView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        tweet = get_tweet_or_404(request, self.kwargs["pk"])
+        with transaction.atomic():
+            deleted, _ = Retweet.objects.filter(tweet=tweet, user=request.user).delete()
+            if deleted:
+                bump_count(tweet.pk, "retweet_count", -1)
+                emit(Type.RETWEET_DELETED, tweet_id=tweet.pk, user_id=request.user.pk, author_id=tweet.user_id)
+        forget_tweet(tweet.pk)
+        return redirect("tweets:detail", pk=tweet.pk)
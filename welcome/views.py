@@ -1,5 +1,9 @@
+from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 
+from core.pagecache import anonymous_page_cache
 
+
+@method_decorator(anonymous_page_cache, name="dispatch")
 class WelcomeView(TemplateView):
     template_name = "welcome/welcome.html"